@@ -1,17 +1,43 @@
 #python generate_poem_audio_html.py
 #https://sunil-chakraborty.github.io/sunil-c.github.io/kobita/
 #https://tinyurl.com/kobitamala
+import argparse
 import re
-import os
+import sys
 from pathlib import Path
 
-# Read the poem file
-with open("Poem2.txt", "r", encoding="utf-8") as f:
-    raw_text = f.read()
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from sitegen.assets import precompress, write_asset
+from sitegen.audio import prepare_audio, source_tags
+from sitegen.corpus import Corpus, add_query_args, query
+from sitegen.manifest import BuildManifest, digest
+from sitegen.media import media_index
+from sitegen.offline import REGISTER_JS, write_service_worker
+from sitegen.related import cache_file, related
+from sitegen.render import Template, write_page
+from sitegen.stages import add_profile_args, count, report, stage, start_profile
 
-# Function to check if audio file exists
-def audio_exists(audio_path):
-    return os.path.exists(audio_path)
+# Options
+parser = argparse.ArgumentParser(description="Builds bengali_poems_collection.html from Poem2.txt")
+parser.add_argument("--input", default="Poem2.txt", help="poem collection to read")
+parser.add_argument("--output", default="bengali_poems_collection.html", help="page to write")
+add_query_args(parser)
+add_profile_args(parser)
+args = parser.parse_args()
+input_file, output_file = Path(args.input), Path(args.output)
+site_dir = output_file.parent   # assets and sw.js go next to the page
+start_profile(args, output_file)
+
+# Incremental build: skip everything when no input changed
+stage("read")
+manifest = BuildManifest.for_script(__file__)
+TEMPLATE_HASH = manifest.code_hash(__file__)
+build_key = digest(manifest.file_hash(input_file), TEMPLATE_HASH, manifest.dir_hash("audio"), query(args))
+if manifest.is_fresh(output_file, build_key):
+    manifest.save()
+    print(f"✅ {output_file.name} is up to date (no input changed), nothing rebuilt.")
+    report()
+    sys.exit(0)
 
 # Updated pattern to match Bengali poem structure with audio line
 # Matches: "কবিতা : title \n কবি : poet \n audio:filename.mp3 \n\n poem_body"
@@ -19,132 +45,178 @@ pattern = re.compile(
     r"কবিতা\s*:\s*(.*?)\s*\nকবি\s*:\s*(.*?)\s*\naudio\s*:\s*(.*?)\s*\n\n(.*?)(?=কবিতা\s*:|$)",
     re.DOTALL
 )
-matches = pattern.findall(raw_text)
 
-# Start HTML content
-html = """<!DOCTYPE html>
+# Read the poem file through the corpus database (parsed again only when it changed)
+stage("parse")
+corpus = Corpus()
+poems = corpus.sync_pattern(input_file, "collection", pattern, ("title", "author", "media_file", "body"))
+matches = corpus.records(poems.source, **query(args))
+print(f"📥 {input_file.name}: {poems.mode} parse, {len(matches)} of {poems.count} poems")
+
+# "Related poems" under each card: the nearest ones by TF-IDF similarity, cached per poem
+stage("related")
+neighbours = related(
+    [(digest(idx, title, poet, body), f"{title}\n{body}") for idx, (title, poet, _, body) in matches],
+    cache_file(output_file, query(args)),
+)
+
+# Audio files are looked up in one scan of the audio folder and served
+# as Opus + MP3 (transcoded in parallel, cached by input hash)
+stage("media")
+AUDIO_INDEX = media_index("audio")
+audio_web = prepare_audio(manifest, "audio", AUDIO_INDEX.names)
+
+# ---------- Stylesheet and script, served from assets/ (minified, content-hashed) ----------
+STYLE = """
+body {
+  font-family: 'Noto Serif Bengali', serif;
+  margin: 0;
+  padding: 0;
+  display: flex;
+  height: 100vh;
+  overflow: hidden;
+  background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+}
+aside {
+  width: 30%;
+  background: rgba(255, 255, 255, 0.95);
+  padding: 2em;
+  overflow-y: auto;
+  border-right: 1px solid #ccc;
+  backdrop-filter: blur(10px);
+  box-shadow: 2px 0 10px rgba(0,0,0,0.1);
+}
+main {
+  width: 70%;
+  padding: 2em;
+  overflow-y: auto;
+  background: rgba(255, 255, 255, 0.9);
+  backdrop-filter: blur(5px);
+}
+h1 {
+  color: #003366;
+  margin-top: 0;
+  text-align: center;
+  font-size: 1.5em;
+  border-bottom: 2px solid #003366;
+  padding-bottom: 0.5em;
+}
+.index a {
+  color: #0066cc;
+  text-decoration: none;
+  font-weight: 500;
+}
+.index a:hover {
+  text-decoration: underline;
+  color: #004499;
+}
+.poem {
+  margin-bottom: 4em;
+  padding: 2em;
+  background: white;
+  border-radius: 10px;
+  box-shadow: 0 4px 15px rgba(0,0,0,0.1);
+}
+.related {
+  margin-top: 1.5em;
+  padding-top: 0.8em;
+  border-top: 1px solid #eee;
+  font-size: 0.9em;
+  color: #666;
+}
+.related a {
+  margin-right: 0.8em;
+  color: #0066cc;
+  text-decoration: none;
+}
+.poem h2 {
+  color: #003366;
+  border-bottom: 1px solid #ddd;
+  padding-bottom: 0.5em;
+  margin-bottom: 0.5em;
+}
+.poet-name {
+  color: #666;
+  font-style: italic;
+  margin-bottom: 1.5em;
+  font-size: 0.9em;
+}
+.poem-content {
+  white-space: pre-line;
+  line-height: 1.8;
+  color: #333;
+}
+.download-btn {
+  background: linear-gradient(45deg, #0066cc, #004499);
+  color: white;
+  border: none;
+  padding: 10px 15px;
+  margin-bottom: 15px;
+  cursor: pointer;
+  border-radius: 5px;
+  font-size: 14px;
+  width: 100%;
+  transition: all 0.3s ease;
+}
+.download-btn:hover {
+  transform: translateY(-2px);
+  box-shadow: 0 4px 10px rgba(0,0,0,0.2);
+}
+.index-item {
+  display: flex;
+  flex-direction: column;
+  margin: 1em 0;
+  padding: 0.8em;
+  background: rgba(0, 102, 204, 0.05);
+  border-radius: 5px;
+  transition: background 0.3s ease;
+}
+.index-item:hover {
+  background: rgba(0, 102, 204, 0.1);
+}
+.index-item audio {
+  width: 100%;
+  height: 30px;
+  margin-top: 0.5em;
+}
+.poem-title-link {
+  font-size: 1em;
+  margin-bottom: 0.3em;
+}
+.stats {
+  margin-bottom: 1em;
+  padding: 1em;
+  background: rgba(0, 102, 204, 0.1);
+  border-radius: 5px;
+  text-align: center;
+}
+"""
+
+SCRIPT = """
+// Smooth scrolling for internal links
+document.querySelectorAll('a[href^="#"]').forEach(anchor => {
+  anchor.addEventListener('click', function (e) {
+    e.preventDefault();
+    const target = document.querySelector(this.getAttribute('href'));
+    if (target) {
+      target.scrollIntoView({
+        behavior: 'smooth',
+        block: 'start'
+      });
+    }
+  });
+});
+"""
+
+# ---------- Templates (compiled once) ----------
+PAGE = Template("""<!DOCTYPE html>
 <html lang="bn">
 <head>
   <meta charset="UTF-8">
   <title>বাংলা কবিতা সংকলন</title>
   <meta name="viewport" content="width=device-width, initial-scale=1">
 
-  <!-- PDF libraries -->
-  <script src="https://cdnjs.cloudflare.com/ajax/libs/jspdf/2.5.1/jspdf.umd.min.js"></script>
-  <script src="https://cdnjs.cloudflare.com/ajax/libs/html2canvas/1.4.1/html2canvas.min.js"></script>
-
-  <style>
-    body { 
-      font-family: 'Noto Serif Bengali', serif; 
-      margin: 0; 
-      padding: 0; 
-      display: flex; 
-      height: 100vh; 
-      overflow: hidden; 
-      background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-    }
-    aside { 
-      width: 30%; 
-      background: rgba(255, 255, 255, 0.95); 
-      padding: 2em; 
-      overflow-y: auto; 
-      border-right: 1px solid #ccc;
-      backdrop-filter: blur(10px);
-      box-shadow: 2px 0 10px rgba(0,0,0,0.1);
-    }
-    main { 
-      width: 70%; 
-      padding: 2em; 
-      overflow-y: auto; 
-      background: rgba(255, 255, 255, 0.9);
-      backdrop-filter: blur(5px);
-    }
-    h1 { 
-      color: #003366; 
-      margin-top: 0; 
-      text-align: center;
-      font-size: 1.5em;
-      border-bottom: 2px solid #003366;
-      padding-bottom: 0.5em;
-    }
-    .index a { 
-      color: #0066cc; 
-      text-decoration: none; 
-      font-weight: 500;
-    }
-    .index a:hover { 
-      text-decoration: underline; 
-      color: #004499;
-    }
-    .poem { 
-      margin-bottom: 4em; 
-      padding: 2em;
-      background: white;
-      border-radius: 10px;
-      box-shadow: 0 4px 15px rgba(0,0,0,0.1);
-    }
-    .poem h2 {
-      color: #003366;
-      border-bottom: 1px solid #ddd;
-      padding-bottom: 0.5em;
-      margin-bottom: 0.5em;
-    }
-    .poet-name {
-      color: #666;
-      font-style: italic;
-      margin-bottom: 1.5em;
-      font-size: 0.9em;
-    }
-    .poem-content { 
-      white-space: pre-line; 
-      line-height: 1.8;
-      color: #333;
-    }
-    .download-btn {
-      background: linear-gradient(45deg, #0066cc, #004499);
-      color: white;
-      border: none;
-      padding: 10px 15px;
-      margin-bottom: 15px;
-      cursor: pointer;
-      border-radius: 5px;
-      font-size: 14px;
-      width: 100%;
-      transition: all 0.3s ease;
-    }
-    .download-btn:hover {
-      transform: translateY(-2px);
-      box-shadow: 0 4px 10px rgba(0,0,0,0.2);
-    }
-    .index-item {
-      display: flex;
-      flex-direction: column;
-      margin: 1em 0;
-      padding: 0.8em;
-      background: rgba(0, 102, 204, 0.05);
-      border-radius: 5px;
-      transition: background 0.3s ease;
-    }
-    .index-item:hover {
-      background: rgba(0, 102, 204, 0.1);
-    }
-    .index-item audio {
-      width: 100%;
-      height: 30px;
-      margin-top: 0.5em;
-    }
-    .poem-title-link {
-      font-size: 1em;
-      margin-bottom: 0.3em;
-    }
-    .stats {
-      margin-bottom: 1em;
-      padding: 1em;
-      background: rgba(0, 102, 204, 0.1);
-      border-radius: 5px;
-      text-align: center;
-    }
-  </style>
+  <link rel="stylesheet" href="{style}">
   <link href="https://fonts.googleapis.com/css2?family=Noto+Serif+Bengali:wght@400;500;600&display=swap" rel="stylesheet">
 </head>
 <body>
@@ -152,94 +224,113 @@ html = """<!DOCTYPE html>
     <h1>📚 বাংলা কবিতা সংকলন</h1>
     
     <div class="stats">
-      <strong>মোট কবিতা: """ + str(len(matches)) + """</strong><br>
-      <span style="font-size: 0.9em; color: #666;">🔊 অডিও সহ: """ + """<span id="audioCount"></span></span>
+      <strong>মোট কবিতা: {total}</strong><br>
+      <span style="font-size: 0.9em; color: #666;">🔊 অডিও সহ: <span id="audioCount">{audio_count}</span></span>
     </div>
     
      
     <div class="index">
-"""
+{index}    </div>
+  </aside>
+  <main id="poemContainer">
+{main}
+  </main>
 
-# Add index links with audio players (only if audio exists)
-main_content = ""
-audio_count = 0
-for idx, (title, poet, audio_filename, body) in enumerate(matches, start=1):
-    # Create anchor from title (cleaned up)
-    anchor = f"poem_{title.strip().replace(' ', '_').replace(':', '_')}"
-    audio_file = f"audio/{audio_filename.strip()}"  # Use the audio filename from the text
-    
-    # Clean up title and poet names
-    title = title.strip()
-    poet = poet.strip()
-    
-    # Check if audio file exists
-    has_audio = audio_exists(audio_file)
-    if has_audio:
-        audio_count += 1
-    
-    html += f'''
+<script src="{script}"></script>
+<script>{register}</script>
+
+</body>
+</html>
+""")
+
+INDEX_ITEM = Template("""
       <div class="index-item">
         <div class="poem-title-link">
           <a href="#{anchor}">{title} - {poet}</a>
-        </div>'''
-        
-    # Only add audio player if file exists
-    if has_audio:
-        html += f'''
+        </div>{player}
+      </div>
+    """)
+
+AUDIO_PLAYER = Template("""
         <audio controls preload="none">
-          <source src="{audio_file}" type="audio/mpeg">
+          {sources_html}
           আপনার ব্রাউজার অডিও সাপোর্ট করে না।
-        </audio>'''
-    
-    html += '''
-      </div>
-    '''
-    
-    main_content += f"""
+        </audio>""")
+
+POEM_CARD = Template("""
     <div class="poem" id="{anchor}">
       <h2>{title}</h2>
       <div class="poet-name">✍ কবি: {poet}</div>
-      <div class="poem-content">{body.strip()}</div>
+      <div class="poem-content">{body}</div>
+      {related_html}
     </div>
-"""
+""")
 
-# Close aside and add main content
-html += f"""    </div>
-  </aside>
-  <main id="poemContainer">
-{main_content}
-  </main>
+RELATED = Template('<nav class="related">সম্পর্কিত কবিতা: {links}</nav>')
+RELATED_LINK = Template('<a href="#{anchor}">{title}</a>')
 
-<script>
-// Update audio count
-document.getElementById('audioCount').textContent = '{audio_count}';
 
-// Smooth scrolling for internal links
-document.querySelectorAll('a[href^="#"]').forEach(anchor => {{
-  anchor.addEventListener('click', function (e) {{
-    e.preventDefault();
-    const target = document.querySelector(this.getAttribute('href'));
-    if (target) {{
-      target.scrollIntoView({{
-        behavior: 'smooth',
-        block: 'start'
-      }});
-    }}
-  }});
-}});
-</script>
+# Add index links with audio players (only if audio exists)
+stage("render")
+index_items, poem_cards = [], []
+audio_count = 0
+# Create anchors from titles (cleaned up)
+anchors = [f"poem_{title.strip().replace(' ', '_').replace(':', '_')}" for _, (title, *_) in matches]
+for n, (idx, (title, poet, audio_filename, body)) in enumerate(matches):
+    anchor = anchors[n]
+    audio_name = AUDIO_INDEX.find(audio_filename.strip())  # Use the audio filename from the text
+    audio_file = f"audio/{audio_name or audio_filename.strip()}"
+    
+    # Clean up title and poet names
+    title = title.strip()
+    poet = poet.strip()
+    
+    # Check if audio file exists
+    has_audio = audio_name is not None
+    if has_audio:
+        audio_count += 1
+        count("with_audio")
 
-</body>
-</html>
-"""
+    # Links to the related poems
+    related_html = ""
+    if neighbours[n]:
+        related_html = RELATED.render(links=[
+            RELATED_LINK.render(anchor=anchors[j], title=matches[j][1][0].strip()) for j in neighbours[n]
+        ])
+
+    # Reuse the poem's HTML if neither it, its audio nor its related poems changed
+    key = digest(
+        TEMPLATE_HASH, anchor, title, poet, body,
+        has_audio and manifest.file_hash(audio_file), audio_web.sources.get(audio_name), related_html,
+    )
+    cached = manifest.fragment(key)
+    if cached is None:
+        # Only add audio player if file exists
+        player = ""
+        if has_audio:
+            sources_html = source_tags(audio_web, audio_name, "audio/", "\n          ")
+            player = AUDIO_PLAYER.render(sources_html=sources_html)
 
-# Save HTML file
-output_file = Path("bengali_poems_collection.html")
-output_file.write_text(html, encoding="utf-8")
+        cached = manifest.store(key, [
+            INDEX_ITEM.render(anchor=anchor, title=title, poet=poet, player=player),
+            POEM_CARD.render(anchor=anchor, title=title, poet=poet, body=body.strip(), related_html=related_html),
+        ])
+    index_items.append(cached[0])
+    poem_cards.append(cached[1])
+
+# Close aside and add main content, streamed straight into the file
+stage("write")
+style = write_asset(site_dir, output_file.name, "style.css", STYLE)
+script = write_asset(site_dir, output_file.name, "script.js", SCRIPT)
+write_page(
+    output_file, PAGE, total=len(matches), index=index_items, main=poem_cards, audio_count=audio_count,
+    style=style, script=script, register=REGISTER_JS,
+)
+precompress(output_file, manifest)
+offline = write_service_worker(site_dir, output_file.name, [style, script], manifest)
+print(f"📴 offline: sw.js precaches {offline} files")
+manifest.mark_built(output_file, build_key)
+manifest.save()
 print(f"✅ {output_file.name} generated successfully!")
-print(f"📊 Found {len(matches)} poems in the collection")
-print(f"🔊 Audio files available: {audio_count}/{len(matches)}")
-print("\n📝 Extracted poems:")
-for idx, (title, poet, audio_filename, body) in enumerate(matches, start=1):
-    print(f"{idx}. {title.strip()} - {poet.strip()} (Audio: {audio_filename.strip()})")
+report()
     
\ No newline at end of file
@@ -14,72 +14,189 @@ Free Usage: It offers a generous amount of free daily usage.
 
 
 
-import re
+import argparse
+import sys
 from pathlib import Path
 import os
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from sitegen.manifest import BUILD_DIR, BuildManifest, digest
+from sitegen.assets import precompress, write_asset
+from sitegen.audio import prepare_audio, source_tags
+from sitegen.chunks import CHUNK_SIZE, LOADER_JS, chunk_index, write_chunks
+from sitegen.corpus import Corpus, add_query_args, query
+from sitegen.dedup import KEPT, add_dedup_args, dedup, write_report
+from sitegen.images import picture_tag, prepare_images
+from sitegen.media import media_index
+from sitegen.offline import REGISTER_JS, write_service_worker
+from sitegen.related import cache_file, related
+from sitegen.render import Template, write_page
+from sitegen.search import SEARCH_JS, write_search_index
+from sitegen.stages import add_profile_args, count, report, stage, start_profile
+from sitegen.whatsapp import ADHIR
+
+# Options
+parser = argparse.ArgumentParser(description="Builds index.html from Poem.txt")
+parser.add_argument("--input", default="Poem.txt", help="WhatsApp export to read")
+parser.add_argument("--output", default="index.html", help="page to write")
+parser.add_argument("--chunked", action="store_true",
+                    help="only the index in index.html; poem bodies in JSON chunks loaded on demand")
+parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                    help="poems per JSON chunk (with --chunked)")
+add_query_args(parser)
+add_dedup_args(parser)
+add_profile_args(parser)
+args = parser.parse_args()
+input_file, output_file = Path(args.input), Path(args.output)
+site_dir = output_file.parent   # assets, search index, chunks and sw.js go next to the page
+start_profile(args, output_file)
+
 # Paths
+stage("media")
 audio_dir = Path("audio")
 image_dir = Path("image")
 audio_dir.mkdir(exist_ok=True)
 image_dir.mkdir(exist_ok=True)
+audio_index = media_index(audio_dir)   # one directory scan instead of a stat() per candidate
+image_index = media_index(image_dir)
+
+# Incremental build: skip everything when no input changed
+stage("read")
+manifest = BuildManifest.for_script(__file__)
+TEMPLATE_HASH = manifest.code_hash(__file__)
+build_key = digest(
+    manifest.file_hash(input_file), TEMPLATE_HASH,
+    manifest.dir_hash(audio_dir), manifest.dir_hash(image_dir),
+    args.chunked and args.chunk_size, query(args), args.duplicates, args.duplicate_similarity,
+)
+if manifest.is_fresh(output_file, build_key):
+    manifest.save()
+    print(f"✅ {output_file.name} is up to date (no input changed), nothing rebuilt.")
+    report()
+    sys.exit(0)
+
+# Read poems from the corpus database (only the tail appended to Poem.txt
+# since the last build is parsed; same records as ADHIR.pattern.findall)
+stage("parse")
+corpus = Corpus()
+poems = corpus.sync(input_file, ADHIR)
+matches = corpus.records(poems.source, **query(args))
+print(f"📥 {input_file.name}: {poems.mode} parse, {len(matches)} of {poems.count} poems")
+
+# Reposted poems (near-identical bodies): one copy rendered, the rest reported
+stage("dedup")
+posted = matches
+matches, reposts = dedup(posted, args.duplicates, args.duplicate_similarity)
+duplicates_path = BUILD_DIR / f"{output_file.stem}.duplicates.json"
+write_report(duplicates_path, posted, reposts, title=lambda fields: fields[2])
+count("duplicates", len(posted) - len(matches))
+print(f"🧬 {len(reposts)} poems posted more than once, {KEPT[args.duplicates]} (report: {duplicates_path})")
 
-# Read poems
-with open("Poem.txt", "r", encoding="utf-8") as f:
-    raw_text = f.read()
-
-# Regex: optional audio + optional image
-pattern = re.compile(
-    r"(\d{2}/\d{2}/\d{4}, \d{2}:\d{2}) - .*?: ?[\"']?(.*?)[\"']?\n"
-    r"(?:(?:audio):(.*?)\n)?"
-    r"(?:(?:image):(.*?)\n)?"
-    r"\n?(.*?)(?=\n\d{2}/\d{2}/\d{4}, \d{2}:\d{2} - |\Z)",
-    re.DOTALL
+# "Related poems" under each card: the nearest ones by TF-IDF similarity, cached per poem
+stage("related")
+neighbours = related(
+    [(digest(idx, title, body), f"{title}\n{body}") for idx, (_, _, title, _, _, body) in matches],
+    cache_file(output_file, query(args)),
 )
-matches = pattern.findall(raw_text)
 
-# Start HTML
-html = """<!DOCTYPE html>
+# Stylesheet, served from assets/ (minified, content-hashed)
+STYLE = """
+body { font-family: 'Noto Serif Bengali', serif; margin: 0; padding: 0; display: flex; height: 100vh; overflow: hidden; }
+aside { width: 40%; background: #f4f4f4; padding: 2em; overflow-y: auto; border-right: 1px solid #ccc; }
+main { width: 60%; padding: 2em; overflow-y: auto; }
+h1 { color: #003366; margin-top: 0; }
+.index a { display: block; margin: 0.5em 0; color: #0066cc; text-decoration: none; }
+.index a:hover { text-decoration: underline; }
+.poem { margin-bottom: 4em; }
+.related { margin-top: 1em; font-size: 0.9em; color: #555; }
+.related a { margin-right: 0.8em; color: #0066cc; text-decoration: none; }
+p { white-space: pre-line; }
+audio { margin-top: 10px; display: block; max-width: 100%; }
+img {
+  margin: 10px 0;       /* space above/below */
+  display: block;
+  max-width: 50%;       /* reduce size to 50% */
+  height: auto;
+  float: left;          /* left-align image */
+  margin-right: 15px;   /* add gap between image and text */
+}
+picture { display: contents; }
+#searchBox { width: 100%; padding: 8px; margin-bottom: 15px; border: 1px solid #ccc; border-radius: 4px; font-size: 14px; }
+"""
+
+# Page shell, index entry and poem card (compiled once, streamed to the file)
+PAGE_HEAD = """<!DOCTYPE html>
 <html lang="bn">
 <head>
   <meta charset="UTF-8">
   <title>বাংলা কবিতা সংকলন</title>
   <meta name="viewport" content="width=device-width, initial-scale=1">
-  <style>
-    body { font-family: 'Noto Serif Bengali', serif; margin: 0; padding: 0; display: flex; height: 100vh; overflow: hidden; }
-    aside { width: 40%; background: #f4f4f4; padding: 2em; overflow-y: auto; border-right: 1px solid #ccc; }
-    main { width: 60%; padding: 2em; overflow-y: auto; }
-    h1 { color: #003366; margin-top: 0; }
-    .index a { display: block; margin: 0.5em 0; color: #0066cc; text-decoration: none; }
-    .index a:hover { text-decoration: underline; }
-    .poem { margin-bottom: 4em; }
-    p { white-space: pre-line; }
-    audio { margin-top: 10px; display: block; max-width: 100%; }
-    img { 
-      margin: 10px 0;       /* space above/below */
-      display: block; 
-      max-width: 50%;       /* reduce size to 50% */
-      height: auto; 
-      float: left;          /* left-align image */
-      margin-right: 15px;   /* add gap between image and text */
-    }
-    #searchBox { width: 100%; padding: 8px; margin-bottom: 15px; border: 1px solid #ccc; border-radius: 4px; font-size: 14px; }
-  </style>
+  <link rel="stylesheet" href="{style}">
   <link href="https://fonts.googleapis.com/css2?family=Noto+Serif+Bengali&display=swap" rel="stylesheet">
 </head>
 <body>
   <aside>
     <h1>📚 বাংলা কবিতা সংকলন</h1>
     <p><strong>✍ কবি : অধীর মন্ডল (+91 79809 33948)</strong></p>
-    <input type="text" id="searchBox" placeholder="🔍 কবিতা খুঁজুন..." onkeyup="filterPoems()">
+    <input type="text" id="searchBox" placeholder="🔍 কবিতা খুঁজুন..." onkeyup="filterPoems()" data-index="{search_index}">
     <div class="index">
+{index}    </div>
+  </aside>
+"""
+
+# filterPoems(): prebuilt full-text index (titles + bodies), prefix search
+SEARCH_SCRIPT = """
+<script src="{search}"></script>
 """
 
+PAGE = Template(PAGE_HEAD + """  <main id="poemContainer">
+{main}
+  </main>
+""" + SEARCH_SCRIPT + """<script>{register}</script>
+</body>
+</html>
+""")
+
+# --chunked: empty main pane, filled from the JSON chunks by the loader
+CHUNKED_PAGE = Template(PAGE_HEAD + """  <main id="poemContainer"></main>
+  <script type="application/json" id="poemChunks">{chunks}</script>
+""" + SEARCH_SCRIPT + """
+<script src="{loader}"></script>
+<script>{register}</script>
+
+</body>
+</html>
+""")
+
+INDEX_ENTRY = Template('      <a href="#{anchor}" class="poem-link">{title_display}</a>\n')
+
+POEM_CARD = Template("""
+    <div class="poem" id="{anchor}">
+      <h2>{title}</h2>
+      {image_html}
+      {audio_html}
+      <p>{body}</p>
+      {related_html}
+    </div>
+""")
+
+RELATED = Template('<nav class="related">সম্পর্কিত কবিতা: {links}</nav>')
+RELATED_LINK = Template('<a href="#{anchor}">{title}</a>')
+
 # Build content
-main_content = ""
+index_entries, poem_cards, poem_ids = [], [], []
+search_docs = []   # (anchor, searchable text)
 AUDIO_EXTS = [".mp3", ".aac", ".m4a", ".wav"]
+
+# Web audio: Opus + MP3 fallback, transcoded in parallel, cached by input hash
+stage("media")
+audio_web = prepare_audio(manifest, audio_dir, audio_index.names)
+
+# Responsive images: WebP/JPEG at several widths, resized in parallel, cached by source hash
+images_web = prepare_images(manifest, image_dir, image_index.names)
  
-for idx, (_, title, audio_file, image_file, body) in enumerate(matches, start=1):
+stage("render")
+for n, (idx, (_, _, title, audio_file, image_file, body)) in enumerate(matches):
     anchor = f"poem{idx}"
     title_display = title
 
@@ -104,55 +221,70 @@ for idx, (_, title, audio_file, image_file, body) in enumerate(matches, start=1)
     candidates.append(numbered_name)
     candidates.extend(title_candidates)
 
-    found_audio = None
-    for cand in candidates:
-        if (audio_dir / cand).exists():
-            found_audio = cand
-            break
+    found_audio = audio_index.first(candidates, AUDIO_EXTS)
     if found_audio:
-        audio_html = f'<audio controls><source src="audio/{found_audio}" type="audio/mpeg"></audio>'
+        audio_html = f'<audio controls>{source_tags(audio_web, found_audio, "audio/")}</audio>'
         title_display += " 🎵"
 
     # ==== IMAGE handling ====
     image_html = ""
-    if image_file and (image_dir / image_file.strip()).exists():
-        image_html = f'<img src="image/{image_file.strip()}" alt="{title} illustration">'
+    found_image = image_index.find(image_file.strip()) if image_file else None
+    if found_image:
+        image_html = picture_tag(images_web, found_image, "image/", f"{title} illustration", "30vw")
 
-    # ==== INDEX ====
-    html += f'      <a href="#{anchor}" class="poem-link">{title_display}</a>\n'
+    # ==== RELATED poems ====
+    related_html = ""
+    if neighbours[n]:
+        related_html = RELATED.render(links=[
+            RELATED_LINK.render(anchor=f"poem{matches[j][0]}", title=matches[j][1][2].strip()) for j in neighbours[n]
+        ])
 
-    # ==== MAIN CONTENT ====
-    main_content += f"""
-    <div class="poem" id="{anchor}">
-      <h2>{title}</h2>
-      {image_html}
-      {audio_html}
-      <p>{body.strip()}</p>
-    </div>
-"""
-
-# Finish HTML
-html += f"""    </div>
-  </aside>
-  <main id="poemContainer">
-{main_content}
-  </main>
+    # ==== Reuse the poem's HTML if neither it, its media nor its related poems changed ====
+    key = digest(
+        TEMPLATE_HASH, idx, title, body,
+        found_audio, found_audio and manifest.file_hash(audio_dir / found_audio), audio_html,
+        image_html, found_image and manifest.file_hash(image_dir / found_image), related_html,
+    )
+    cached = manifest.fragment(key)
+    if cached is None:
+        cached = manifest.store(key, [
+            # ==== INDEX ====
+            INDEX_ENTRY.render(anchor=anchor, title_display=title_display),
 
-<script>
-function filterPoems() {{
-  const query = document.getElementById("searchBox").value.toLowerCase();
-  const links = document.querySelectorAll(".index .poem-link");
-  links.forEach(link => {{
-    const text = link.textContent.toLowerCase();
-    link.style.display = text.includes(query) ? "block" : "none";
-  }});
-}}
-</script>
+            # ==== MAIN CONTENT ====
+            POEM_CARD.render(anchor=anchor, title=title, image_html=image_html, audio_html=audio_html, body=body.strip(),
+                             related_html=related_html),
+        ])
+    index_entries.append(cached[0])
+    poem_cards.append(cached[1])
+    poem_ids.append(anchor)
+    search_docs.append((anchor, f"{title}\n{body}"))
 
-</body>
-</html>
-"""
+# Search index for the sidebar search box
+stage("search")
+search_index = write_search_index(site_dir, output_file.name, search_docs)
+print(f"🔍 search index: {search_index}")
 
-# Save
-Path("index.html").write_text(html, encoding="utf-8")
-print("✅ index.html generated with audio + image support!")
+# Save (streamed straight into the file)
+stage("write")
+page = dict(
+    index=index_entries, search_index=search_index,
+    style=write_asset(site_dir, output_file.name, "style.css", STYLE),
+    search=write_asset(site_dir, output_file.name, "search.js", SEARCH_JS, shared=True),
+    register=REGISTER_JS,
+)
+offline = [page["style"], page["search"], search_index + ".gz"]   # the text the page needs
+if args.chunked:
+    chunks = write_chunks(site_dir, list(zip(poem_ids, poem_cards)), args.chunk_size)
+    loader = write_asset(site_dir, output_file.name, "loader.js", LOADER_JS, shared=True)
+    write_page(output_file, CHUNKED_PAGE, chunks=chunk_index(chunks), loader=loader, **page)
+    offline += [loader, *(chunk.file + ".gz" for chunk in chunks)]
+    print(f"📦 {len(poem_cards)} poem bodies in {len(chunks)} chunks, loaded on demand")
+else:
+    write_page(output_file, PAGE, main=poem_cards, **page)
+precompress(output_file, manifest)
+print(f"📴 offline: sw.js precaches {write_service_worker(site_dir, output_file.name, offline, manifest)} files")
+manifest.mark_built(output_file, build_key)
+manifest.save()
+print(f"✅ {output_file.name} generated with audio + image support!")
+report()
@@ -1,50 +1,112 @@
 # file:///D:/JU/index.html
 # python generate_poem_html_adhir.py
-import re
+import argparse
+import sys
 from pathlib import Path
 from weasyprint import HTML
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from sitegen.assets import precompress, write_asset
+from sitegen.audio import prepare_audio, source_tags
+from sitegen.corpus import Corpus, add_query_args, query
+from sitegen.dedup import KEPT, add_dedup_args, dedup, write_report
+from sitegen.fonts import BENGALI_SERIF, font_face, subset_font
+from sitegen.manifest import BUILD_DIR, BuildManifest, digest
+from sitegen.media import media_index
+from sitegen.offline import REGISTER_JS, write_service_worker
+from sitegen.pdfbook import PdfWriter, write_book
+from sitegen.render import Template, write_page
+from sitegen.search import SEARCH_JS, write_search_index
+from sitegen.stages import add_profile_args, count, report, stage, start_profile
+from sitegen.whatsapp import ADHIR_PDF
+
 # ---------- Paths ----------
 ROOT = Path(".")
+
+# ---------- Options ----------
+parser = argparse.ArgumentParser(description="Builds index5.html and poems.pdf from Poem5.txt")
+parser.add_argument("--input", default="Poem5.txt", help="WhatsApp export to read")
+parser.add_argument("--output", default="index5.html", help="page to write")
+parser.add_argument("--pdf", default="poems.pdf", help="PDF book to write")
+parser.add_argument("--pdf-section-size", type=int, default=25,
+                    help="poems per PDF section laid out in parallel, each starting on a new page "
+                         "(0 = whole book in one WeasyPrint pass, poems run on)")
+parser.add_argument("--pdf-workers", type=int, default=None,
+                    help="WeasyPrint processes run at once (default: number of CPUs)")
+add_query_args(parser)
+add_dedup_args(parser)
+add_profile_args(parser)
+args = parser.parse_args()
+TXT_PATH = ROOT / args.input
+HTML_PATH = ROOT / args.output
+PDF_PATH = ROOT / args.pdf
+SITE_DIR = HTML_PATH.parent   # assets, search index and sw.js go next to the page
+start_profile(args, HTML_PATH)
+if args.pdf_section_size and PdfWriter is None:
+    print(f"⚠️ pypdf is not installed, {PDF_PATH.name} is rendered in one WeasyPrint pass.")
+    args.pdf_section_size = 0
+
+# ---------- Media (after the options: --help scans nothing) ----------
+stage("media")
 AUDIO_DIR = ROOT / "audio"
 AUDIO_DIR.mkdir(exist_ok=True)
-TXT_PATH = ROOT / "Poem5.txt"
-HTML_PATH = ROOT / "index5.html"
-PDF_PATH = ROOT / "poems.pdf"
-
-# ---------- Read Poems ----------
-raw_text = TXT_PATH.read_text(encoding="utf-8")
-
-pattern = re.compile(
-    r"(\d{2}/\d{2}/\d{4}, \d{2}:\d{2}) - \+91 79809 33948:\s*[\"']?(.*?)[\"']?\s*\n"
-    r"(?:audio:(.*?)\n)?"
-    r"\n?(.*?)(?=\n\d{2}/\d{2}/\d{4}, \d{2}:\d{2} - |\Z)",
-    re.DOTALL
+AUDIO_INDEX = media_index(AUDIO_DIR)
+
+# ---------- Incremental build ----------
+stage("read")
+manifest = BuildManifest.for_script(__file__)
+TEMPLATE_HASH = manifest.code_hash(__file__)
+build_key = digest(
+    manifest.file_hash(TXT_PATH), TEMPLATE_HASH, manifest.dir_hash(AUDIO_DIR), args.pdf_section_size, query(args),
+    args.duplicates, args.duplicate_similarity,
 )
-matches = pattern.findall(raw_text)
+if manifest.is_fresh(HTML_PATH, build_key) and PDF_PATH.exists():
+    manifest.save()
+    print(f"✅ {HTML_PATH.name} and {PDF_PATH.name} are up to date (no input changed), nothing rebuilt.")
+    report()
+    sys.exit(0)
 
-# ---------- Build HTML for browser ----------
-html = """<!DOCTYPE html>
+# ---------- Read Poems (corpus database; only the newly appended tail is parsed) ----------
+stage("parse")
+corpus = Corpus()
+poems = corpus.sync(TXT_PATH, ADHIR_PDF)
+matches = corpus.records(poems.source, **query(args))
+print(f"📥 {TXT_PATH.name}: {poems.mode} parse, {len(matches)} of {poems.count} poems")
+
+# ---------- Reposted poems: one copy in the page and the book ----------
+stage("dedup")
+posted = matches
+matches, reposts = dedup(posted, args.duplicates, args.duplicate_similarity)
+DUPLICATES_PATH = BUILD_DIR / f"{HTML_PATH.stem}.duplicates.json"
+write_report(DUPLICATES_PATH, posted, reposts)
+count("duplicates", len(posted) - len(matches))
+print(f"🧬 {len(reposts)} poems posted more than once, {KEPT[args.duplicates]} (report: {DUPLICATES_PATH})")
+
+# ---------- Templates for browser HTML (compiled once) ----------
+# Stylesheet, served from assets/ (minified, content-hashed)
+STYLE = """
+body { font-family: 'Noto Serif Bengali', serif; margin: 0; padding: 0; display: flex; height: 100vh; overflow: hidden; }
+aside { width: 40%; background: #f4f4f4; padding: 2em; overflow-y: auto; border-right: 1px solid #ccc; }
+main { width: 60%; padding: 2em; overflow-y: auto; }
+h1 { color: #003366; margin-top: 0; }
+.index a { display: block; margin: 0.5em 0; color: #0066cc; text-decoration: none; }
+.index a:hover { text-decoration: underline; }
+.poem { margin-bottom: 4em; }
+p { white-space: pre-line; }
+audio { margin-top: 10px; display: block; }
+#searchBox { width: 100%; padding: 8px; margin-bottom: 15px; border: 1px solid #ccc; border-radius: 4px; font-size: 14px; }
+.download-link { display: inline-block; margin: 1em 0; padding: 8px 12px; background: #0066cc; color: white; text-decoration: none; border-radius: 4px; }
+.download-link:hover { background: #004c99; }
+h2 { color: #222; margin-bottom: 0.3em; }
+"""
+
+PAGE = Template("""<!DOCTYPE html>
 <html lang="bn">
 <head>
   <meta charset="UTF-8">
   <title>বাংলা কবিতা সংকলন</title>
   <meta name="viewport" content="width=device-width, initial-scale=1">
-  <style>
-    body { font-family: 'Noto Serif Bengali', serif; margin: 0; padding: 0; display: flex; height: 100vh; overflow: hidden; }
-    aside { width: 40%; background: #f4f4f4; padding: 2em; overflow-y: auto; border-right: 1px solid #ccc; }
-    main { width: 60%; padding: 2em; overflow-y: auto; }
-    h1 { color: #003366; margin-top: 0; }
-    .index a { display: block; margin: 0.5em 0; color: #0066cc; text-decoration: none; }
-    .index a:hover { text-decoration: underline; }
-    .poem { margin-bottom: 4em; }
-    p { white-space: pre-line; }
-    audio { margin-top: 10px; display: block; }
-    #searchBox { width: 100%; padding: 8px; margin-bottom: 15px; border: 1px solid #ccc; border-radius: 4px; font-size: 14px; }
-    .download-link { display: inline-block; margin: 1em 0; padding: 8px 12px; background: #0066cc; color: white; text-decoration: none; border-radius: 4px; }
-    .download-link:hover { background: #004c99; }
-    h2 { color: #222; margin-bottom: 0.3em; }
-  </style>
+  <link rel="stylesheet" href="{style}">
   <link href="https://fonts.googleapis.com/css2?family=Noto+Serif+Bengali&display=swap" rel="stylesheet">
 </head>
 <body>
@@ -53,20 +115,53 @@ html = """<!DOCTYPE html>
     <p><strong>✍ কবি : অধীর মন্ডল (+91 79809 33948)</strong></p>
 
     <!-- 🔍 Search Box -->
-    <input type="text" id="searchBox" placeholder="🔍 কবিতা খুঁজুন..." onkeyup="filterPoems()">
+    <input type="text" id="searchBox" placeholder="🔍 কবিতা খুঁজুন..." onkeyup="filterPoems()" data-index="{search_index}">
 
     <!-- 📄 Download PDF -->
-    <a href="poems.pdf" class="download-link" download>📥 Download PDF</a>
+    <a href="{pdf}" class="download-link" download>📥 Download PDF</a>
 
     <div class="index">
-"""
+{index}    </div>
+  </aside>
+  <main id="poemContainer">
+{main}
+  </main>
+
+<script src="{search}"></script>
+<script>{register}</script>
+
+</body>
+</html>
+""")
+
+INDEX_ENTRY = Template('      <a href="#{anchor}" class="poem-link">{title_display}</a>\n')
 
-main_content = ""
-index_links = ""   # for HTML sidebar
-pdf_index = ""     # for PDF index
+POEM_CARD = Template("""
+    <div class="poem" id="{anchor}">
+      <h2 id="pdf-{anchor}">{idx}. {title}</h2>
+      {audio_html}
+      <p>{body}</p>
+    </div>
+""")
+
+# PDF index entry (with target-counter for page number)
+PDF_INDEX_ENTRY = Template('<p>{idx}. {title} ...... <span class="page-num" target="#pdf-{anchor}" target-counter(page)></span></p>\n')
+
+
+# ---------- Build HTML for browser ----------
+index_links = []        # for HTML sidebar
+pdf_index_entries = []  # for PDF index
+pdf_cards = []          # poem cards (main content), also grouped into PDF sections
+pdf_toc = []            # (number, title, anchor) for the sectioned PDF index
+search_docs = []        # (anchor, searchable text) for the sidebar search
 AUDIO_EXTS = [".mp3", ".aac", ".m4a"]
 
-for idx, (_, title, audio_file, body) in enumerate(matches, start=1):
+# Web audio: Opus + MP3 fallback, transcoded in parallel, cached by input hash
+stage("media")
+audio_web = prepare_audio(manifest, AUDIO_DIR, AUDIO_INDEX.names)
+
+stage("render")
+for idx, (_, title, audio_file, body) in matches:
     title = (title or "").strip()
     body = (body or "").strip()
     anchor = f"poem{idx}"
@@ -81,59 +176,89 @@ for idx, (_, title, audio_file, body) in enumerate(matches, start=1):
     candidates.append(numbered_name)
     candidates.extend([safe_title + ext for ext in AUDIO_EXTS])
 
-    found_audio = None
-    for cand in candidates:
-        if (AUDIO_DIR / cand).exists():
-            found_audio = cand
-            break
+    found_audio = AUDIO_INDEX.first(candidates, AUDIO_EXTS)
 
-    audio_html = ""
-    title_display = title
-    if found_audio:
-        audio_html = f'<audio controls><source src="audio/{found_audio}" type="audio/mpeg"></audio>'
-        title_display += " 🎵"
+    # Reuse the poem's fragments if neither it nor its audio changed
+    key = digest(
+        TEMPLATE_HASH, idx, title, body,
+        found_audio, found_audio and manifest.file_hash(AUDIO_DIR / found_audio),
+        audio_web.sources.get(found_audio),
+    )
+    cached = manifest.fragment(key)
+    if cached is None:
+        audio_html = ""
+        title_display = title
+        if found_audio:
+            audio_html = f'<audio controls>{source_tags(audio_web, found_audio, "audio/")}</audio>'
+            title_display += " 🎵"
 
-    # HTML aside index
-    index_links += f'      <a href="#{anchor}" class="poem-link">{title_display}</a>\n'
+        cached = manifest.store(key, [
+            # HTML aside index
+            INDEX_ENTRY.render(anchor=anchor, title_display=title_display),
 
-    # HTML main content
-    main_content += f"""
-    <div class="poem" id="{anchor}">
-      <h2 id="pdf-{anchor}">{idx}. {title}</h2>
-      {audio_html}
-      <p>{body}</p>
-    </div>
-"""
+            # HTML main content
+            POEM_CARD.render(anchor=anchor, idx=idx, title=title, audio_html=audio_html, body=body),
 
-    # PDF index page (with target-counter for page number)
-    pdf_index += f'<p>{idx}. {title} ...... <span class="page-num" target="#pdf-{anchor}" target-counter(page)></span></p>\n'
+            # PDF index page
+            PDF_INDEX_ENTRY.render(idx=idx, title=title, anchor=anchor),
+        ])
+    index_links.append(cached[0])
+    pdf_cards.append(cached[1])
+    pdf_index_entries.append(cached[2])
+    pdf_toc.append((idx, title, anchor))
+    search_docs.append((anchor, f"{title}\n{body}"))
 
-# Finish HTML for browser
-html += index_links
-html += f"""    </div>
-  </aside>
-  <main id="poemContainer">
-{main_content}
-  </main>
+# Finish HTML for browser (streamed straight into the file)
+stage("search")
+search_index = write_search_index(SITE_DIR, HTML_PATH.name, search_docs)
+stage("write")
+style = write_asset(SITE_DIR, HTML_PATH.name, "style.css", STYLE)
+search = write_asset(SITE_DIR, HTML_PATH.name, "search.js", SEARCH_JS, shared=True)
+write_page(
+    HTML_PATH, PAGE, index=index_links, main=pdf_cards, search_index=search_index,
+    style=style, search=search, register=REGISTER_JS, pdf=PDF_PATH.name,
+)
+precompress(HTML_PATH, manifest)
+offline = write_service_worker(SITE_DIR, HTML_PATH.name, [style, search, search_index + ".gz"], manifest)
+print(f"📴 offline: sw.js precaches {offline} files")
+main_content = "".join(pdf_cards)
+pdf_index = "".join(pdf_index_entries)
 
-<script>
-function filterPoems() {{
-  const query = document.getElementById("searchBox").value.toLowerCase();
-  const links = document.querySelectorAll(".index .poem-link");
-  links.forEach(link => {{
-    const text = link.textContent.toLowerCase();
-    link.style.display = text.includes(query) ? "block" : "none";
-  }});
-}}
-</script>
+# ---------- Build PDF ----------
+stage("pdf")
+def pdf_front(index_html):
+    """Title page + index, followed by a page break."""
+    return f"""
+<h1>📚 বাংলা কবিতা সংকলন</h1>
+<p style="text-align:center"><strong>✍ কবি : অধীর মন্ডল (+91 79809 33948)</strong></p>
 
-</body>
-</html>
+<div class="index">
+  <h2>সূচীপত্র</h2>
+  {index_html}
+</div>
+
+<div style="page-break-after: always;"></div>
 """
-HTML_PATH.write_text(html, encoding="utf-8")
 
-# ---------- Build PDF ----------
-pdf_html = f"""
+
+def pdf_poems(cards_html):
+    return f"""
+<div class="poems">
+{cards_html}
+</div>
+"""
+
+
+# Font: the vendored Noto Serif Bengali, cut down to the characters the
+# book uses (no network needed); Google Fonts only if it is missing
+pdf_font = '<link href="https://fonts.googleapis.com/css2?family=Noto+Serif+Bengali&display=swap" rel="stylesheet">'
+font_path = subset_font(BENGALI_SERIF, pdf_front(pdf_index) + main_content)
+if font_path:
+    pdf_font = font_face("Noto Serif Bengali", font_path)
+else:
+    print(f"⚠️ {BENGALI_SERIF} not found, {PDF_PATH.name} falls back to Google Fonts.")
+
+PDF_HEAD = f"""
 <!DOCTYPE html>
 <html lang="bn">
 <head>
@@ -146,29 +271,56 @@ pdf_html = f"""
   .index p {{ margin: 0.3em 0; }}
   .page-num::before {{ content: "পৃষ্ঠা " target-counter(attr(target), page); }}
 </style>
-<link href="https://fonts.googleapis.com/css2?family=Noto+Serif+Bengali&display=swap" rel="stylesheet">
+{pdf_font}
 </head>
 <body>
+"""
+PDF_FOOT = """
+</body>
+</html>
+"""
 
-<h1>📚 বাংলা কবিতা সংকলন</h1>
-<p style="text-align:center"><strong>✍ কবি : অধীর মন্ডল (+91 79809 33948)</strong></p>
-
-<div class="index">
-  <h2>সূচীপত্র</h2>
-  {pdf_index}
-</div>
 
-<div style="page-break-after: always;"></div>
+def pdf_front_with_pages(page_of):
+    """Index with literal page numbers from the section page-count pass."""
+    index_html = "".join(
+        f'<p>{idx}. {title} ...... <span class="page-no">পৃষ্ঠা {page_of.get(f"pdf-{anchor}", "")}</span></p>\n'
+        for idx, title, anchor in pdf_toc
+    )
+    return PDF_HEAD + pdf_front(index_html) + PDF_FOOT
 
-<div class="poems">
-{main_content}
-</div>
 
-</body>
-</html>
-"""
+pdf_html = PDF_HEAD + pdf_front(pdf_index) + pdf_poems(main_content) + PDF_FOOT
 
-HTML(string=pdf_html).write_pdf(str(PDF_PATH))
+# Only re-run WeasyPrint when the document feeding it changed
+pdf_key = digest(pdf_html, args.pdf_section_size)
+size = args.pdf_section_size
+if manifest.is_fresh(PDF_PATH, pdf_key):
+    print(f"⏭️ {PDF_PATH.name} unchanged, WeasyPrint skipped.")
+else:
+    book = None
+    if size:
+        # Sections of `size` poems are laid out in parallel (unchanged ones
+        # come from .build/pdf/), then merged behind the front matter
+        sections = [
+            PDF_HEAD + pdf_poems("".join(pdf_cards[i:i + size])) + PDF_FOOT
+            for i in range(0, len(pdf_cards), size)
+        ]
+        book = write_book(pdf_front_with_pages, sections, PDF_PATH, workers=args.pdf_workers)
+        if book is None:
+            print(f"⚠️ the index page count of {PDF_PATH.name} did not settle, laid out in one WeasyPrint pass instead.")
+    if book:
+        count("pdf_pages", book.pages)
+        print(f"📄 {PDF_PATH.name}: {book.rendered} of {book.sections} sections laid out, the rest reused")
+    else:
+        document = HTML(string=pdf_html).render()
+        document.write_pdf(str(PDF_PATH))
+        count("pdf_pages", len(document.pages))
+        count("bytes_written", PDF_PATH.stat().st_size)
+    manifest.mark_built(PDF_PATH, pdf_key)
 
-print("✅ index5.html and poems.pdf generated successfully (WeasyPrint with index + page numbers).")
+manifest.mark_built(HTML_PATH, build_key)
+manifest.save()
+print(f"✅ {HTML_PATH.name} and {PDF_PATH.name} generated successfully (WeasyPrint with index + page numbers).")
+report()
 
@@ -0,0 +1,260 @@
+# python benchmarks/bench_generators.py [--sizes 1000 10000 ...] [--generators adhir golpo ...] [--compare OLD.json]
+# Synthetic exports (1k-1M messages) run through the four generators: wall time and peak RSS per stage, saved as JSON
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from sitegen.stages import ENV_VAR
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+MEDIA_POOL = 50      # distinct files per media kind
+APPEND = 10          # messages appended for the incremental run
+PDF_MAX_SIZE = 10_000
+
+WORDS = (
+    "আমার সোনার বাংলা আমি তোমায় ভালোবাসি চিরদিন আকাশ বাতাস প্রাণে বাজায় বাঁশি নদী পাখি "
+    "মেঘ বৃষ্টি আলো ছায়া ফুল গান মন স্বপ্ন ভোর সন্ধ্যা রাত চাঁদ তারা মাটি জল হাওয়া পথ "
+    "ঘর মা বাবা শিশু খেলা হাসি কান্না স্মৃতি উড়ছে মনের সুখে নীল বুকে সূর্য উদয় কিরণ"
+).split()
+POETS = ["অধীর মন্ডল", "রবি", "সুনীল", "অমিতাভ দাশগুপ্ত", "কেউ"]
+
+
+# ---------- Synthetic text ----------
+def timestamp(i):
+    return (datetime(2020, 1, 1) + timedelta(minutes=17 * i)).strftime("%d/%m/%Y, %H:%M")
+
+
+def title(rng):
+    return " ".join(rng.choices(WORDS, k=rng.randint(2, 4)))
+
+
+def body(rng):
+    stanzas = []
+    for _ in range(rng.randint(1, 3)):
+        lines = [" ".join(rng.choices(WORDS, k=rng.randint(3, 6))) + rng.choice(",।") for _ in range(4)]
+        stanzas.append("\n".join(lines))
+    return "\n\n".join(stanzas)
+
+
+def media_name(rng, stem, ext, missing=0.1):
+    """A file of the media pool, or (sometimes) one that does not exist."""
+    if rng.random() < missing:
+        return f"missing_{rng.randrange(10**6)}{ext}"
+    return f"{stem}_{rng.randrange(MEDIA_POOL)}{ext}"
+
+
+def adhir_message(rng, i):
+    lines = [f"{timestamp(i)} - +91 79809 33948: {title(rng)}"]
+    if rng.random() < 0.2:
+        lines.append("audio: " + media_name(rng, "audio", rng.choice([".mp3", ".aac", ".m4a"])))
+    if rng.random() < 0.1:
+        lines.append("image: " + media_name(rng, "image", ".jpg"))
+    return "\n".join(lines) + "\n\n" + body(rng) + "\n\n"
+
+
+def adhir_pdf_message(rng, i):
+    lines = [f"{timestamp(i)} - +91 79809 33948: {title(rng)}"]
+    if rng.random() < 0.2:
+        lines.append("audio: " + media_name(rng, "audio", rng.choice([".mp3", ".aac", ".m4a"])))
+    return "\n".join(lines) + "\n\n" + body(rng) + "\n\n"
+
+
+def golpo_message(rng, i):
+    lines = [f"{timestamp(i)} - {rng.choice(POETS)} : {title(rng)}"]
+    kind = rng.choice(["audio", "video", "image", "pdf", None, None, None])
+    if kind == "audio":
+        lines.append("audio:" + media_name(rng, "audio", ".mp3") + "|" + media_name(rng, "cover", ".png", 0))
+    elif kind == "video":
+        lines.append("video: https://drive.google.com/file/d/synthetic/preview" if rng.random() < 0.5
+                     else "video:" + media_name(rng, "video", ".mp4"))
+    elif kind == "image":
+        lines.append("image:" + media_name(rng, "image", ".jpg"))
+    elif kind == "pdf":
+        lines.append("pdf:" + media_name(rng, "doc", ".pdf"))
+    if rng.random() < 0.1:
+        lines.append(rng.choice(["dance:", "painter:"]))
+    return "\n".join(lines) + "\n\n" + body(rng) + "\n\n"
+
+
+def collection_message(rng, i):
+    return (f"কবিতা : {title(rng)}\nকবি : {rng.choice(POETS)}\n"
+            f"audio : {media_name(rng, 'audio', '.mp3')}\n\n{body(rng)}\n\n")
+
+
+# ---------- Fake media folders ----------
+def fake_image(path, rng):
+    try:
+        from PIL import Image
+    except ImportError:
+        path.write_bytes(b"not an image")
+        return
+    Image.new("RGB", (64, 48), tuple(rng.randrange(256) for _ in range(3))).save(path)
+
+
+def fake_media(folder, kinds, rng):
+    """kinds: [(stem, ext), ...]; MEDIA_POOL files each."""
+    folder.mkdir(parents=True, exist_ok=True)
+    for stem, ext in kinds:
+        for k in range(MEDIA_POOL):
+            path = folder / f"{stem}_{k}{ext}"
+            if ext in (".jpg", ".png"):
+                fake_image(path, rng)
+            else:
+                path.write_bytes(b"ID3" + bytes(rng.randrange(256) for _ in range(64)))
+
+
+AUDIO_KINDS = [("audio", ".mp3"), ("audio", ".aac"), ("audio", ".m4a")]
+
+# name: (script, export file, message writer, {media folder: kinds}, extra arguments)
+GENERATORS = {
+    "adhir": ("76_Batch_DVAS/generate_poem_html_adhir.py", "Poem.txt", adhir_message,
+              {"audio": AUDIO_KINDS, "image": [("image", ".jpg")]}, []),
+    "adhir_pdf": ("76_Batch_DVAS/generate_poem_html_adhir_audio_pdf.py", "Poem5.txt", adhir_pdf_message,
+                  {"audio": AUDIO_KINDS}, []),
+    "collection": ("76_Batch_DVAS/generate_poem_audio_html.py", "Poem2.txt", collection_message,
+                   {"audio": [("audio", ".mp3")]}, []),
+    "golpo": ("family/generate_golpo_html_gen.py", "Poem3.txt", golpo_message,
+              {"media": [("audio", ".mp3"), ("cover", ".png"), ("image", ".jpg"), ("video", ".mp4"), ("doc", ".pdf")]}, []),
+}
+
+
+def write_export(path, writer, start, count, rng, mode="w"):
+    with open(path, mode, encoding="utf-8", newline="\n") as f:
+        for i in range(start, start + count):
+            f.write(writer(rng, i))
+
+
+# ---------- Running ----------
+def run(script, workdir, args):
+    """Runs one generator; returns (seconds, peak RSS MiB, exit code, stages, output tail)."""
+    stages_path = workdir / "stages.json"
+    stages_path.unlink(missing_ok=True)
+    env = dict(os.environ, **{ENV_VAR: str(stages_path)})
+    log_path = workdir / "run.log"
+    t0 = time.perf_counter()
+    with open(log_path, "wb") as log:
+        proc = subprocess.Popen([sys.executable, str(ROOT / script), *args], cwd=workdir, env=env,
+                                stdout=log, stderr=subprocess.STDOUT)
+        if hasattr(os, "wait4"):
+            _, status, usage = os.wait4(proc.pid, 0)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            peak = round(usage.ru_maxrss / (2**20 if sys.platform == "darwin" else 1024), 1)
+        else:
+            proc.wait()
+            peak = None
+    seconds = round(time.perf_counter() - t0, 3)
+    stages = json.loads(stages_path.read_text(encoding="utf-8")) if stages_path.exists() else {}
+    tail = log_path.read_text(encoding="utf-8", errors="replace").strip().splitlines()[-3:]
+    return seconds, peak, proc.returncode, stages, tail
+
+
+def bench(name, size, tmp, pdf_max_size):
+    script, export, writer, media, extra = GENERATORS[name]
+    entry = {"generator": name, "messages": size}
+    if name == "adhir_pdf":
+        if importlib.util.find_spec("weasyprint") is None:
+            return [dict(entry, skipped="weasyprint is not installed")]
+        if size > pdf_max_size:
+            return [dict(entry, skipped=f"more than --pdf-max-size {pdf_max_size} messages")]
+
+    workdir = Path(tmp) / f"{name}-{size}"
+    rng = random.Random(size)
+    for folder, kinds in media.items():
+        fake_media(workdir / folder, kinds, rng)
+    write_export(workdir / export, writer, 0, size, rng)
+
+    results = []
+    for label in ("cold", "append"):
+        if label == "append":
+            write_export(workdir / export, writer, size, APPEND, rng, mode="a")
+        seconds, peak, code, stages, tail = run(script, workdir, extra)
+        results.append(dict(entry, run=label, export_mib=round((workdir / export).stat().st_size / 2**20, 1),
+                            seconds=seconds, peak_rss_mib=peak, exit=code, stages=stages,
+                            **({"output": tail} if code else {})))
+    shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                                    capture_output=True, text=True).stdout.strip())
+    except OSError:
+        return None, None
+    return commit or None, dirty
+
+
+def compare(old_path, runs):
+    old = {(r["generator"], r["messages"], r.get("run")): r for r in json.loads(Path(old_path).read_text(encoding="utf-8"))["runs"]}
+    print(f"\nvs {old_path}")
+    print(f"{'generator':<11} {'messages':>9} {'run':<7} {'old s':>8} {'new s':>8} {'ratio':>6} {'old MiB':>8} {'new MiB':>8}")
+    for r in runs:
+        o = old.get((r["generator"], r["messages"], r.get("run")))
+        if not o or "seconds" not in o or "seconds" not in r:
+            continue
+        ratio = r["seconds"] / o["seconds"] if o["seconds"] else float("nan")
+        print(f"{r['generator']:<11} {r['messages']:9d} {r['run']:<7} {o['seconds']:8.2f} {r['seconds']:8.2f} {ratio:6.2f}"
+              f" {o['peak_rss_mib'] or 0:8.1f} {r['peak_rss_mib'] or 0:8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the generators on synthetic exports")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="messages per export")
+    parser.add_argument("--generators", nargs="+", choices=sorted(GENERATORS), default=list(GENERATORS))
+    parser.add_argument("--pdf-max-size", type=int, default=PDF_MAX_SIZE,
+                        help="largest export also laid out as PDF (WeasyPrint)")
+    parser.add_argument("--out", type=Path, help="results file (default: benchmarks/results/<date>-<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare with")
+    args = parser.parse_args()
+
+    commit, dirty = git_commit()
+    report = {
+        "commit": commit,
+        "dirty": dirty,
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "runs": [],
+    }
+
+    print(f"{'generator':<11} {'messages':>9} {'run':<7} {'MiB':>7} {'total s':>8} {'peak MiB':>9}  stages (s)")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            for name in args.generators:
+                for r in bench(name, size, tmp, args.pdf_max_size):
+                    report["runs"].append(r)
+                    if "skipped" in r:
+                        print(f"{name:<11} {size:9d} ⏭️ {r['skipped']}")
+                        continue
+                    stages = " ".join(f"{s}={m['seconds']:.2f}" for s, m in r["stages"].items())
+                    status = "" if r["exit"] == 0 else f"  ⚠️ exit {r['exit']}: {' | '.join(r['output'])}"
+                    print(f"{name:<11} {size:9d} {r['run']:<7} {r['export_mib']:7.1f} {r['seconds']:8.2f}"
+                          f" {r['peak_rss_mib'] or 0:9.1f}  {stages}{status}")
+
+    out = args.out or RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}-{(commit or 'nogit')[:10]}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"✅ Results saved to {out}")
+    if args.compare:
+        compare(args.compare, report["runs"])
+
+
+if __name__ == "__main__":
+    main()
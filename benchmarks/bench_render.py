@@ -0,0 +1,103 @@
+# python benchmarks/bench_render.py
+# `html +=` string building vs streamed Template pages on 1k, 10k and 100k synthetic poems
+
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from sitegen.render import Template, write_page
+
+SIZES = [1_000, 10_000, 100_000]
+
+HEAD = """<!DOCTYPE html>
+<html lang="bn">
+<head><meta charset="UTF-8"><style> body { margin: 0; } </style></head>
+<body>
+  <aside>
+    <div class="index">
+"""
+TAIL = """    </div>
+  </aside>
+  <main id="poemContainer">
+{main}
+  </main>
+</body>
+</html>
+"""
+
+PAGE = Template(HEAD.replace("{", "{{").replace("}", "}}") + "{index}" + TAIL)
+INDEX_ENTRY = Template('      <a href="#{anchor}" class="poem-link">{title}</a>\n')
+POEM_CARD = Template("""
+    <div class="poem" id="{anchor}">
+      <h2>{idx}. {title}</h2>
+      <p>{body}</p>
+    </div>
+""")
+
+BODY = "আমার সোনার বাংলা, আমি তোমায় ভালোবাসি।<br>\n" * 12
+
+
+def poems(count):
+    for idx in range(1, count + 1):
+        yield idx, f"poem_{idx}", f"কবিতা {idx}"
+
+
+def run_concat(path, count):
+    """The old way: grow the page with += and write it at the end."""
+    html = HEAD
+    main_content = ""
+    for idx, anchor, title in poems(count):
+        html += f'      <a href="#{anchor}" class="poem-link">{title}</a>\n'
+        main_content += f"""
+    <div class="poem" id="{anchor}">
+      <h2>{idx}. {title}</h2>
+      <p>{BODY}</p>
+    </div>
+"""
+    html += TAIL.format(main=main_content)
+    path.write_text(html, encoding="utf-8")
+
+
+def run_stream(path, count):
+    index, cards = [], []
+    for idx, anchor, title in poems(count):
+        index.append(INDEX_ENTRY.render(anchor=anchor, title=title))
+        cards.append(POEM_CARD.render(anchor=anchor, idx=idx, title=title, body=BODY))
+    write_page(path, PAGE, index=index, main=cards)
+
+
+def measure(fn, path, count):
+    """Returns (seconds, peak MiB); timing and tracing are separate runs."""
+    t0 = time.perf_counter()
+    fn(path, count)
+    elapsed = time.perf_counter() - t0
+
+    tracemalloc.start()
+    fn(path, count)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20
+
+
+def main():
+    print(f"{'poems':>7} {'MiB':>7} {'concat s':>9} {'stream s':>9} {'concat MiB':>11} {'stream MiB':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in SIZES:
+            old, new = Path(tmp) / "concat.html", Path(tmp) / "stream.html"
+            t_concat, m_concat = measure(run_concat, old, count)
+            t_stream, m_stream = measure(run_stream, new, count)
+            assert old.read_bytes() == new.read_bytes(), f"streamed page differs at {count} poems"
+
+            size = new.stat().st_size / 2**20
+            print(f"{count:7d} {size:7.1f} {t_concat:9.3f} {t_stream:9.3f} {m_concat:11.1f} {m_stream:11.1f}")
+
+    print("✅ Streamed pages identical to string concatenation at every size")
+
+
+if __name__ == "__main__":
+    main()
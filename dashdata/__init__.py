@@ -0,0 +1 @@
+"""Shared data helpers for the Streamlit intake / student dashboards."""
@@ -0,0 +1,96 @@
+# ----------------------------------------------------
+# Columnar on-disk cache of a prepared CSV (Arrow IPC, memory-mapped)
+# ----------------------------------------------------
+# The dashboards parsed their CSV with pd.read_csv and reshaped it on
+# every cold start: each Streamlit Cloud container and each restart paid
+# for it again, and each process held its own copy.  cached_frame() does
+# the preparation once and writes the resulting DataFrame next to the
+# source as an uncompressed Arrow IPC file (categoricals as dictionaries,
+# integers already downcast).  Later loads memory-map that file instead
+# of parsing: the columns come straight from the page cache, shared by
+# every process on the machine.  (Parquet would be smaller on disk, but
+# it has to be decoded into private memory on every load.)
+#
+# The file records the source's size, mtime and content hash.  An
+# unchanged size and mtime trust the cache as is; otherwise the source is
+# hashed, and only a different hash prepares it again.
+# ----------------------------------------------------
+
+import hashlib
+import os
+from pathlib import Path
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+CACHE_DIR = ".build"   # next to the source (git-ignored like the site build state)
+
+
+def cached_frame(source, prepare, version=""):
+    """prepare(source) as a DataFrame, loaded from its Arrow cache while `source` is unchanged.
+
+    version: changes with the preparation (column names, types), so older
+    cache files are not taken for it.
+    """
+    source = Path(source)
+    st = source.stat()   # FileNotFoundError for a missing source, as pd.read_csv raises
+    if pa is None:
+        return prepare(source)
+    cache = source.parent / CACHE_DIR / f"{source.name}.arrow"
+    stamp = {"version": version, "size": str(st.st_size), "mtime_ns": str(st.st_mtime_ns)}
+
+    table = _open(cache)
+    if table is not None:
+        meta = {k.decode(): v.decode() for k, v in (table.schema.metadata or {}).items()}
+        if meta.get("version") == version:
+            if all(meta.get(k) == v for k, v in stamp.items()):
+                return _frame(table)
+            if meta.get("sha") == _hash(source):
+                # Touched but not changed: keep the data, record the new mtime
+                _write(cache, table, {**meta, **stamp})
+                return _frame(table)
+
+    stamp["sha"] = _hash(source)
+    frame = prepare(source)
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    if not _write(cache, table, stamp):
+        return frame
+    return _frame(_open(cache))
+
+
+def _open(path):
+    """The Arrow table in `path`, memory-mapped (None if missing or unreadable)."""
+    try:
+        return pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+    except (OSError, pa.ArrowInvalid):
+        return None
+
+
+def _frame(table):
+    # split_blocks: one block per column, so numeric columns stay views of the map
+    return table.to_pandas(split_blocks=True)
+
+
+def _write(path, table, meta):
+    """Writes `table` with `meta` atomically; False where the folder is read-only."""
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), **{k: str(v) for k, v in meta.items()}})
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with pa.OSFile(str(tmp), "wb") as f, pa.ipc.new_file(f, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp, path)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+        return False
+    return True
+
+
+def _hash(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
@@ -0,0 +1,76 @@
+# ----------------------------------------------------
+# Aggregation cube: chart data for every drill-down selection
+# ----------------------------------------------------
+# The intake dashboards filtered the melted data with up to five masks
+# and ran groupby(['Program Tag', 'Year']).sum() on every rerun, i.e. on
+# every widget change.  The selections only ever fix some of Program
+# Tag / Department / Faculty / Program Name to one value (or leave them
+# at 'All'), so GapCube sums the gaps once, at load time, for every
+# subset of those filters (the 'All' roll-ups included) and keeps each
+# combination of values as a slice of one sorted table.  A selection is
+# then a dict lookup and a slice; only the chosen years are picked out
+# of the few rows it returns.
+#
+# Program names have thousands of values, and each program falls in one
+# tag, department and faculty, so subsets fixing the program would copy
+# the data eight times over.  Instead the programme-level sums are kept
+# once, sliced by program, and the other selections are applied to the
+# handful of rows of that slice.
+# ----------------------------------------------------
+
+from itertools import combinations
+
+ALL = "All"
+FILTERS = ("Program Tag", "Department", "Faculty")   # rolled up to 'All' in every combination
+PROGRAM = "Program Name"                             # sliced directly (one row per tag/year)
+BY = ("Program Tag", "Year")                         # chart grain
+VALUE = "Gap"
+
+
+class GapCube:
+    """Gap sums by Program Tag and Year for every Program Tag / Department / Faculty / Program Name selection."""
+
+    def __init__(self, data):
+        self.years = list(data["Year"].cat.categories)
+        self.cells = {}   # fixed filters -> (sums table, {values: (start, stop)})
+        for r in range(len(FILTERS) + 1):
+            for fixed in combinations(FILTERS, r):
+                self.cells[fixed] = _slices(data, fixed, [c for c in BY if c not in fixed])
+        self.programs = _slices(data, (PROGRAM,), [c for c in FILTERS if c not in BY] + list(BY))
+
+    def chart_data(self, selections, years=None):
+        """Program Tag / Year / Gap rows for `selections` ({filter: value or 'All'}) and `years` (None: all).
+
+        Same rows, order and types as groupby(['Program Tag', 'Year'],
+        observed=True)['Gap'].sum().reset_index() of the filtered data;
+        empty when nothing matches.
+        """
+        program = selections.get(PROGRAM, ALL)
+        fixed = tuple(f for f in FILTERS if selections.get(f, ALL) != ALL)
+        if program != ALL:
+            part = _lookup(self.programs, (program,))
+            for f in fixed:
+                part = part[part[f] == selections[f]]
+            if len(part) and fixed != FILTERS:
+                part = part.groupby(list(BY), observed=True)[VALUE].sum().reset_index()
+        else:
+            part = _lookup(self.cells[fixed], tuple(selections[f] for f in fixed))
+        if years is not None and len(years) < len(self.years):
+            part = part[part["Year"].isin(years)]
+        return part[[*BY, VALUE]].reset_index(drop=True)
+
+
+def _slices(data, fixed, by):
+    """(sums by fixed + by, {values of fixed: (start, stop) of their rows})."""
+    sums = data.groupby([*fixed, *by], observed=True)[VALUE].sum().reset_index()
+    if not fixed:
+        return sums, {(): (0, len(sums))}
+    groups = sums.groupby(list(fixed), observed=True, sort=False).indices
+    # groupby sorted the sums by `fixed` first, so each combination is one run of rows
+    return sums, {(k if isinstance(k, tuple) else (k,)): (rows[0], rows[-1] + 1) for k, rows in groups.items()}
+
+
+def _lookup(cell, values):
+    sums, slices = cell
+    start, stop = slices.get(values, (0, 0))
+    return sums.iloc[start:stop]
@@ -0,0 +1,107 @@
+# ----------------------------------------------------
+# The intake dashboards' shared flow: load, filter, show
+# ----------------------------------------------------
+# intake/Student_DB.py, intake/student_intake.py and
+# student_dashboard/Student_DB.py are the same dashboard deployed as
+# separate apps, each with its own look.  The steps they share live here,
+# so a fix reaches all three.  load_data() melts and types the CSV once
+# into its memory-mapped Arrow cache (dashdata.intake); cache_resource
+# shares the frame between sessions instead of unpickling a copy for
+# each of them.  load_cube() sums its gaps for every drill-down selection
+# (dashdata.cube), load_filters() indexes the rows of every filter value
+# (dashdata.filters), load_hierarchy() lists which filter values occur
+# together (dashdata.hierarchy), each once per data file.
+# sidebar_filters() draws the cascading selectboxes and the year picker;
+# show_results() shows the chart of the selection (from the cube) and its
+# rows (paged table).  The apps keep their page setup, headings and chart
+# styling.
+# ----------------------------------------------------
+
+import streamlit as st
+
+from dashdata.cube import GapCube
+from dashdata.filters import ALL, FilterIndex
+from dashdata.hierarchy import Hierarchy
+from dashdata.intake import load_intake
+from dashdata.table import paged_table
+
+# (sidebar label, column), in cascade order
+FILTER_WIDGETS = [
+    ('Select Program Tag (Col A)', 'Program Tag'),
+    ('Select Department (Col C)', 'Department'),
+    ('Select Faculty (Col D)', 'Faculty'),
+    ('Select Program Name (Col B)', 'Program Name'),
+]
+FILTER_COLUMNS = [column for _, column in FILTER_WIDGETS]
+
+
+@st.cache_resource
+def load_data(file_path):
+    """Loads the melted intake gap data from its columnar cache."""
+    try:
+        return load_intake(file_path)
+    except FileNotFoundError:
+        st.error(f"Error: The file '{file_path}' was not found.")
+        st.stop()
+    except Exception as e:
+        st.error(f"An error occurred while loading the data: {e}")
+        st.stop()
+
+
+@st.cache_resource
+def load_cube(file_path):
+    """Precomputes the chart data of every drill-down selection."""
+    return GapCube(load_data(file_path))
+
+
+@st.cache_resource
+def load_filters(file_path):
+    """Indexes the filter columns for selections without copying or scanning the data."""
+    return FilterIndex(load_data(file_path), [*FILTER_COLUMNS, 'Year'])
+
+
+@st.cache_resource
+def load_hierarchy(file_path):
+    """Builds the cascading filters' option lists, once per data file."""
+    return Hierarchy(load_data(file_path), FILTER_COLUMNS)
+
+
+def sidebar_filters(hierarchy, filters):
+    """Cascading drill-down selectboxes and the Gap Years picker; returns {column: selection}.
+
+    Each list only offers the values that occur with the other
+    selections, served from the cached hierarchy (nothing rebuilt per
+    rerun); a selection left without data falls back to 'All'.
+    """
+    current = {column: st.session_state.get(column, ALL) for column in FILTER_COLUMNS}
+    for label, column in FILTER_WIDGETS:
+        options = hierarchy.options(column, current)
+        if current[column] not in options:
+            current[column] = st.session_state[column] = ALL
+        current[column] = st.sidebar.selectbox(label, options, key=column)
+
+    all_gap_years = filters.present('Year')
+    current['Year'] = st.sidebar.multiselect(
+        'Select Gap Years (Cols K-M)',
+        options=all_gap_years,
+        default=all_gap_years
+    )
+    if not current['Year']:
+        st.warning("Please select at least one Gap Year to display data.")
+    return current
+
+
+def show_results(data, cube, filters, selections, chart, key='intake', file_name='intake_gaps_filtered.csv'):
+    """The chart (`chart`(Program Tag / Year / Gap rows) -> Altair chart) and the rows of `selections`."""
+    # The selection's rows come from the filter index: no copy, no scan per filter
+    selection = filters.select(selections)
+    if len(selection) == 0:
+        if selections['Year']:
+            st.warning("No data matches the current filter selections.")
+        return
+
+    # Chart data of this selection, looked up in the precomputed cube
+    st.altair_chart(chart(cube.chart_data(selections, selections['Year'])), width="stretch")
+
+    st.subheader('Filtered Data Table')
+    paged_table(data, selection, key=key, file_name=file_name)
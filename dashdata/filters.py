@@ -0,0 +1,172 @@
+# ----------------------------------------------------
+# Row filtering engine for the dashboards' drill-down filters
+# ----------------------------------------------------
+# The dashboards copied the whole DataFrame and scanned it once per
+# filter (== / isin), on every rerun.  FilterIndex looks at each filter
+# column once, at load time: its values become integer codes and one
+# stable argsort of those codes lists the rows of every value as a
+# sorted slice of that one array.  Values on more than DENSE of the rows
+# also get a packed bitmap (one bit per row).
+#
+# A selection starts from the restricted column with the fewest matching
+# rows.  If those are few, their row ids are checked against the other
+# columns' codes (a gather of that many codes, not a scan of the
+# frame); if every restriction is broad, the columns' bitmaps are
+# combined instead (OR within a column, AND across), 1/8 byte per row.
+# Either way the result is a Selection: its size is known without
+# building a frame, and only the rows actually shown are taken from the
+# data (all rows selected: a plain slice, no copy).
+# ----------------------------------------------------
+
+import numpy as np
+import pandas as pd
+
+ALL = "All"
+DENSE = 1 / 32   # share of the rows from which a value gets a precomputed bitmap
+
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+class FilterIndex:
+    """Row ids per value of each filter column of `frame`, for select()."""
+
+    def __init__(self, frame, columns):
+        self.n = len(frame)
+        self.columns = {c: _Column(frame[c], self.n) for c in columns if c in frame.columns}
+
+    def select(self, selections):
+        """The rows matching every selection ({column: value, list of values, 'All' or None}).
+
+        A list keeps the rows holding any of its values (an empty one
+        keeps none); 'All' and None leave the column unrestricted.
+        """
+        restricted = []
+        for column, wanted in selections.items():
+            if wanted is None or (isinstance(wanted, str) and wanted == ALL) or column not in self.columns:
+                continue
+            index = self.columns[column]
+            codes = index.codes_of(wanted if isinstance(wanted, (list, tuple, set, np.ndarray, pd.Index)) else [wanted])
+            size = int(index.counts[codes].sum())
+            if size == self.n:
+                continue   # every row has one of the values: no restriction
+            restricted.append((size, index, codes))
+        if not restricted:
+            return Selection(self.n)
+        restricted.sort(key=lambda r: r[0])
+
+        size, index, codes = restricted[0]
+        if size <= DENSE * self.n:
+            rows = index.rows(codes)
+            for _, other, other_codes in restricted[1:]:
+                rows = rows[other.member(other_codes)[other.codes[rows]]]
+            return Selection(self.n, rows=rows)
+        bits = index.bitmap(codes)
+        for _, other, other_codes in restricted[1:]:
+            bits = bits & other.bitmap(other_codes)
+        return Selection(self.n, bits=bits)
+
+    def present(self, column, selection=None):
+        """Sorted values of `column` on the rows of `selection` (None: all rows), missing values left out."""
+        index = self.columns[column]
+        if selection is None or selection.everything:
+            found = np.flatnonzero(index.counts)
+        else:
+            found = np.unique(index.codes[selection.rows()])
+            found = found[found >= 0]
+        return sorted(index.values[i] for i in found)
+
+
+class Selection:
+    """Rows matching a filter: sorted row ids, a packed bitmap, or every row."""
+
+    def __init__(self, n, rows=None, bits=None):
+        self.n = n
+        self.bits = bits
+        self._rows = rows
+        self.everything = rows is None and bits is None
+
+    def __len__(self):
+        if self._rows is not None:
+            return len(self._rows)
+        if self.bits is not None:
+            return int(POPCOUNT[self.bits].sum(dtype=np.int64))
+        return self.n
+
+    def rows(self):
+        """Sorted row positions (computed once)."""
+        if self._rows is None:
+            if self.bits is not None:
+                self._rows = np.flatnonzero(np.unpackbits(self.bits, count=self.n))
+            else:
+                self._rows = np.arange(self.n)
+        return self._rows
+
+    def page(self, start, stop):
+        """Row positions of the matches start..stop-1 (in row order), without listing the others."""
+        if self._rows is not None:
+            return self._rows[start:stop]
+        if self.bits is None:
+            return np.arange(start, min(stop, self.n))
+        stop = min(stop, len(self))
+        if start >= stop:
+            return np.arange(0)
+        seen = np.cumsum(POPCOUNT[self.bits], dtype=np.int64)    # matches up to and including each byte
+        first, last = np.searchsorted(seen, [start, stop - 1], side="right")
+        window = np.flatnonzero(np.unpackbits(self.bits[first:last + 1])) + 8 * first
+        skip = start - (int(seen[first - 1]) if first else 0)
+        return window[skip:skip + stop - start]
+
+    def take(self, frame, start=0, stop=None):
+        """The matching rows of `frame` (start..stop-1 of them); a slice, not a copy, when every row matches."""
+        stop = len(self) if stop is None else stop
+        if self.everything:
+            return frame.iloc[start:stop]
+        return frame.iloc[self.page(start, stop)]
+
+
+class _Column:
+    """Codes, per-value row slices and dense-value bitmaps of one column."""
+
+    def __init__(self, series, n):
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes, values = series.cat.codes.to_numpy(), series.cat.categories
+        else:
+            codes, values = pd.factorize(series, sort=True)
+        self.n = n
+        self.codes = codes
+        self.values = list(values)
+        self.code = {v: i for i, v in enumerate(self.values)}
+        self.order = np.argsort(codes, kind="stable")                              # rows by value, in row order
+        self.starts = np.searchsorted(codes[self.order], np.arange(len(self.values) + 1))
+        self.missing = int(self.starts[0])                                       # -1 codes sort first
+        self.counts = np.diff(self.starts)
+        self.bitmaps = {i: self._pack(self.rows([i])) for i in np.flatnonzero(self.counts > DENSE * n)}
+
+    def codes_of(self, values):
+        return np.array(sorted({self.code[v] for v in values if v in self.code}), dtype=np.int64)
+
+    def rows(self, codes):
+        """Sorted row ids of the values `codes` (one value: a view, no copy)."""
+        parts = [self.order[self.starts[i]:self.starts[i + 1]] for i in codes]
+        if len(parts) == 1:
+            return parts[0]
+        return np.sort(np.concatenate(parts)) if parts else self.order[:0]
+
+    def member(self, codes):
+        """Lookup table: code -> selected (the extra last entry answers for missing values, -1)."""
+        table = np.zeros(len(self.values) + 1, dtype=bool)
+        table[codes] = True
+        return table
+
+    def bitmap(self, codes):
+        bits = None
+        for i in codes:
+            if i not in self.bitmaps:
+                self.bitmaps[i] = self._pack(self.rows([i]))   # kept: the same values tend to be picked again
+            bits = self.bitmaps[i] if bits is None else bits | self.bitmaps[i]
+        return bits if bits is not None else np.zeros((self.n + 7) // 8, dtype=np.uint8)
+
+    def _pack(self, rows):
+        mask = np.zeros(self.n, dtype=bool)
+        mask[rows] = True
+        return np.packbits(mask)
@@ -0,0 +1,38 @@
+# ----------------------------------------------------
+# Cascading drill-down filters: option lists from the data's hierarchy
+# ----------------------------------------------------
+# Every selectbox used to list every value of its column, rebuilt with
+# sorted(data[...].unique()) on each rerun, so users could pick a
+# Faculty and a Department that never occur together and get an empty
+# page.  A Hierarchy keeps the distinct combinations of the filter
+# columns (one row per programme: a few thousand rows, not one per
+# programme and year) with a FilterIndex over them.  The options of a
+# column are its values found in the combinations matching the other
+# columns' selections, so any choice offered still has data behind it.
+# Each option list is computed once per set of other selections and
+# then served from memory.
+# ----------------------------------------------------
+
+from functools import lru_cache
+
+from dashdata.filters import ALL, FilterIndex
+
+OPTION_LISTS = 4096   # option lists kept (per column and selections of the others)
+
+
+class Hierarchy:
+    """Option lists for cascading selectboxes over `columns` of `frame`."""
+
+    def __init__(self, frame, columns):
+        self.columns = list(columns)
+        self.combinations = frame[self.columns].drop_duplicates(ignore_index=True)
+        self.index = FilterIndex(self.combinations, self.columns)
+        self._options = lru_cache(maxsize=OPTION_LISTS)(self._compute)
+
+    def options(self, column, selections):
+        """['All'] + the sorted values of `column` that occur with the other columns' selections."""
+        others = tuple((c, selections.get(c, ALL)) for c in self.columns if c != column)
+        return self._options(column, others)
+
+    def _compute(self, column, others):
+        return [ALL] + self.index.present(column, self.index.select(dict(others)))
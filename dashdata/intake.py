@@ -0,0 +1,43 @@
+# ----------------------------------------------------
+# Intake gap data: the CSV in long form, typed for the dashboards
+# ----------------------------------------------------
+# intake_gaps.csv has one row per programme with a "Gap <year>" column
+# per academic year.  The dashboards chart it in long form (one row per
+# programme and year); load_intake() melts it once into the columnar
+# cache and memory-maps it from there afterwards.
+# ----------------------------------------------------
+
+import pandas as pd
+
+from dashdata.columnar import cached_frame
+
+FORMAT = "intake-1"   # bump when the prepared columns change
+
+# CSV column -> dashboard column
+COLUMNS = {
+    "Prog_Tag": "Program Tag",
+    "Programme Name": "Program Name",
+    "Department": "Department",
+    "Faculty": "Faculty",
+}
+GAP_PREFIX = "Gap "   # "Gap 2022-23", "Gap 2023-24", ...
+
+
+def load_intake(csv_path):
+    """Program Tag / Program Name / Department / Faculty / Year / Gap rows, from the cache when fresh."""
+    return cached_frame(csv_path, melt_intake, FORMAT)
+
+
+def melt_intake(csv_path):
+    """Reads intake_gaps.csv and melts its Gap columns into Year / Gap rows."""
+    df = pd.read_csv(csv_path, usecols=lambda c: c in COLUMNS or c.startswith(GAP_PREFIX))
+    years = [c for c in df.columns if c.startswith(GAP_PREFIX)]
+    melted = df.melt(id_vars=list(COLUMNS), value_vars=years, var_name="Year", value_name="Gap")
+    melted = melted.rename(columns=COLUMNS)
+
+    # Repeated labels as categories; 'Year' ordered as in the file for plotting
+    for column in COLUMNS.values():
+        melted[column] = melted[column].astype("category")
+    melted["Year"] = pd.Categorical(melted["Year"], categories=years, ordered=True)
+    melted["Gap"] = pd.to_numeric(melted["Gap"], downcast="integer")
+    return melted
@@ -0,0 +1,108 @@
+# ----------------------------------------------------
+# Paginated result table: only the visible page goes to the browser
+# ----------------------------------------------------
+# st.dataframe(filtered_data) serialised the whole filtered frame to
+# Arrow and sent it to the browser on every rerun; with a university-wide
+# intake or a large marks file that was the slowest part of the page and
+# froze phones.  paged_table() keeps the rows on the server: search and
+# sort work on the row ids of the Selection (one column at a time, never
+# a copy of the frame), and only the rows of the page shown are taken
+# from the data and sent, under a count of all of them.
+#
+# The full result is a CSV download, written only when the button is
+# clicked, CSV_CHUNK rows at a time into a temporary file that moves to
+# disk past SPOOL_BYTES, instead of one string built on every rerun.
+# ----------------------------------------------------
+
+import io
+import math
+import tempfile
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from dashdata.filters import Selection
+
+PAGE_SIZES = (25, 50, 100, 200)
+CSV_CHUNK = 50_000          # rows written to the CSV download at a time
+SPOOL_BYTES = 8 << 20       # CSV downloads larger than this are spooled to disk
+ROW_ORDER = "(row order)"
+
+
+def paged_table(frame, selection=None, key="table", file_name="data.csv", height="auto"):
+    """Shows the rows of `selection` (None: all) of `frame` a page at a time, with search, sort and CSV download."""
+    if selection is None:
+        selection = Selection(len(frame))
+
+    search_col, sort_col, order_col, size_col = st.columns([3, 2, 1, 1])
+    search = search_col.text_input("🔎 Search rows", key=f"{key}_search", placeholder="text in any column")
+    sort_by = sort_col.selectbox("Sort by", [ROW_ORDER, *frame.columns], key=f"{key}_sort")
+    descending = order_col.toggle("Descending", key=f"{key}_desc", disabled=sort_by == ROW_ORDER)
+    page_size = size_col.selectbox("Rows per page", PAGE_SIZES, index=1, key=f"{key}_size")
+
+    # Search and sort reorder row ids; the frame itself is only read for the page shown
+    if search.strip() or sort_by != ROW_ORDER:
+        rows = selection.rows()
+        if search.strip():
+            rows = rows[_matches(frame, rows, search.strip())]
+        if sort_by != ROW_ORDER:
+            rows = rows[_order(frame[sort_by], rows, descending)]
+        selection = Selection(len(frame), rows=rows)
+
+    total = len(selection)
+    pages = max(math.ceil(total / page_size), 1)
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = 1   # the result shrank under the page shown
+    page = st.session_state.get(f"{key}_page", 1)
+    start, stop = (page - 1) * page_size, min(page * page_size, total)
+
+    st.dataframe(selection.take(frame, start, stop), width="stretch", height=height)
+
+    page_col, count_col, download_col = st.columns([1, 2, 1])
+    page_col.number_input("Page", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+    count_col.caption(f"Page {page:,} of {pages:,} · rows {start + 1 if total else 0:,}–{stop:,} of {total:,}")
+    download_col.download_button(
+        "⬇️ Download CSV", data=lambda: _csv(frame, selection), file_name=file_name, mime="text/csv",
+        key=f"{key}_csv", on_click="ignore", disabled=total == 0,
+    )
+
+
+def _matches(frame, rows, text):
+    """Mask over `rows`: the text columns of the row contain `text` (case-insensitive)."""
+    text = text.casefold()
+    hit = np.zeros(len(rows), dtype=bool)
+    for column in frame.columns:
+        values = frame[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Each category on these rows is tested once; rows look up their code
+            codes = values.cat.codes.to_numpy()[rows]
+            present = np.unique(codes[codes >= 0])
+            found = np.zeros(len(values.cat.categories) + 1, dtype=bool)   # last entry: missing (-1)
+            labels = values.cat.categories[present].astype(str).str.casefold()
+            found[present] = labels.str.contains(text, regex=False)
+            hit |= found[codes]
+        elif pd.api.types.is_object_dtype(values.dtype) or pd.api.types.is_string_dtype(values.dtype):
+            part = values.iloc[rows].astype(str).str.casefold()
+            hit |= part.str.contains(text, regex=False).to_numpy()
+    return hit
+
+
+def _order(values, rows, descending):
+    """Positions that sort `rows` by `values` (stable, missing values last)."""
+    part = values.iloc[rows].reset_index(drop=True)
+    return part.sort_values(ascending=not descending, kind="stable", na_position="last").index.to_numpy()
+
+
+def _csv(frame, selection):
+    """The rows of `selection` as a CSV file object, written CSV_CHUNK rows at a time."""
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+    text = io.TextIOWrapper(out, encoding="utf-8", newline="")
+    total = len(selection)
+    frame.iloc[:0].to_csv(text, index=False)
+    for start in range(0, total, CSV_CHUNK):
+        selection.take(frame, start, min(start + CSV_CHUNK, total)).to_csv(text, header=False, index=False)
+    text.flush()
+    text.detach()
+    out.seek(0)
+    return out
@@ -1,116 +1,217 @@
 # python generate_golpo_html_gen.py
 # https://tinyurl.com/paribernama
 
-import re
+import argparse
+import sys
 from pathlib import Path
 
-# Read raw text file
-with open("Poem3.txt", "r", encoding="utf-8") as f:
-    raw_text = f.read()
-
-# Regex: poet, title, optional media, optional dance
-pattern = re.compile(
-    r"(\d{2}/\d{2}/\d{4}, \d{2}:\d{2}) - (.*?): ?[\"']?(.*?)[\"']?\n"
-    r"(?:(audio|video|image|pdf):(.*?)\n)?"
-    r"(?:(dance|painter):(.*?)\n)?"
-    r"\n?(.*?)(?=\n\d{2}/\d{2}/\d{4}, \d{2}:\d{2} - |\Z)",
-    re.DOTALL
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from sitegen.assets import precompress, write_asset
+from sitegen.audio import prepare_audio, source_tags
+from sitegen.corpus import Corpus, add_query_args, query
+from sitegen.images import image_url, picture_tag, prepare_images, read_gallery
+from sitegen.manifest import BuildManifest, digest
+from sitegen.media import media_index
+from sitegen.offline import REGISTER_JS, write_service_worker
+from sitegen.related import cache_file, related
+from sitegen.render import Template, write_page
+from sitegen.search import SEARCH_JS, write_search_index
+from sitegen.stages import add_profile_args, report, stage, start_profile
+from sitegen.whatsapp import GOLPO
+
+# Options
+parser = argparse.ArgumentParser(description="Builds index9.html from Poem3.txt")
+parser.add_argument("--input", default="Poem3.txt", help="WhatsApp export to read")
+parser.add_argument("--output", default="index9.html", help="page to write")
+add_query_args(parser)
+add_profile_args(parser)
+args = parser.parse_args()
+input_file, output_file = Path(args.input), Path(args.output)
+site_dir = output_file.parent   # assets, search index and sw.js go next to the page
+start_profile(args, output_file)
+
+# Media files are looked up in one scan of the media folder
+stage("media")
+MEDIA_INDEX = media_index("media")
+
+# Incremental build: skip everything when no input changed
+stage("read")
+manifest = BuildManifest.for_script(__file__)
+TEMPLATE_HASH = manifest.code_hash(__file__)
+build_key = digest(manifest.file_hash(input_file), TEMPLATE_HASH, manifest.dir_hash("media"), query(args))
+if manifest.is_fresh(output_file, build_key):
+    manifest.save()
+    print(f"✅ {output_file.name} is up to date (no input changed), nothing rebuilt.")
+    report()
+    sys.exit(0)
+
+# Read raw text file: poet, title, optional media, optional dance
+# (through the corpus database: only the tail appended since the last build is parsed)
+stage("parse")
+corpus = Corpus()
+entries = corpus.sync(input_file, GOLPO)
+matches = corpus.records(entries.source, **query(args))
+print(f"📥 {input_file.name}: {entries.mode} parse, {len(matches)} of {entries.count} entries")
+
+# "Related" links under each card: the nearest entries by TF-IDF similarity, cached per entry
+stage("related")
+neighbours = related(
+    [(digest(idx, record), f"{record[2]}\n{record[-1]}") for idx, record in matches],
+    cache_file(output_file, query(args)),
 )
 
-matches = pattern.findall(raw_text)
+# Web audio: Opus + MP3 fallback, transcoded in parallel, cached by input hash
+stage("media")
+MEDIA_AUDIO = prepare_audio(manifest, "media", MEDIA_INDEX.names)
+
+# Responsive images: WebP/JPEG at several widths, resized in parallel, cached by source hash
+MEDIA_IMAGES = prepare_images(manifest, "media", MEDIA_INDEX.names)
 
-# Start HTML
-html = """<!DOCTYPE html>
+# Stylesheet, served from assets/ (minified, content-hashed)
+STYLE = """
+body { font-family: 'Noto Serif Bengali', serif; margin: 0; padding: 0; display: flex; height: 100vh; overflow: hidden; }
+aside { width: 30%; background: #f4f4f4; padding: 2em; overflow-y: auto; border-right: 1px solid #ccc; }
+main { width: 70%; padding: 2em; overflow-y: auto; }
+h1 { color: #003366; margin-top: 0; }
+#searchBox { width: 100%; padding: 8px; margin: 10px 0; font-size: 1em; border: 1px solid #ccc; border-radius: 4px; }
+.index a { display: block; margin: 0.5em 0; color: #0066cc; text-decoration: none; }
+.index a:hover { text-decoration: underline; }
+.index a.has-media { color: green; font-weight: bold; }
+.poem { margin-bottom: 4em; }
+.related { margin-top: 1em; font-size: 0.9em; color: #555; }
+.related a { margin-right: 0.8em; color: #0066cc; text-decoration: none; }
+p { white-space: pre-line; }
+.media-card {
+  background: #fafafa;
+  border: 1px solid #ddd;
+  border-radius: 10px;
+  padding: 12px;
+  margin: 15px 0;
+  box-shadow: 0 2px 6px rgba(0,0,0,0.1);
+  text-align: center;
+}
+.media-card audio,
+.media-card video {
+  width: 80%;
+  outline: none;
+  margin: 8px auto 0 auto;
+  display: block;
+}
+.media-card img {
+  max-width: 80%;
+  height: auto;
+  border-radius: 10px;
+  box-shadow: 0 2px 8px rgba(0,0,0,0.2);
+  margin: 8px auto 0 auto;
+  display: block;
+}
+.media-caption {
+  font-size: 0.9em;
+  font-weight: bold;
+  color: #444;
+  margin: 0;
+}
+.audio-thumb {
+  width: 100px;
+  height: 100px;
+  border-radius: 50%;
+  object-fit: cover;
+  margin-bottom: 8px;
+  display: block;
+  margin-left: auto;
+  margin-right: auto;
+  box-shadow: 0 2px 6px rgba(0,0,0,0.2);
+}
+
+/* 🎨 Painting frame (6 images in flexbox) */
+.painting-frame {
+  display: flex;
+  flex-wrap: wrap;
+  justify-content: center;
+  gap: 10px;
+  margin: 20px 0;
+}
+.painting-frame img {
+  width: 150px;
+  height: 150px;
+  object-fit: cover;
+  border-radius: 10px;
+  box-shadow: 0 2px 6px rgba(0,0,0,0.3);
+  transition: transform 0.2s ease;
+}
+.painting-frame img:hover {
+  transform: scale(1.05);
+}
+picture { display: contents; }
+"""
+
+# Page skeleton and per-entry templates (compiled once)
+PAGE = Template("""<!DOCTYPE html>
 <html lang="bn">
 <head>
   <meta charset="UTF-8">
   <title>বাংলা গল্প সংকলন</title>
   <meta name="viewport" content="width=device-width, initial-scale=1">
 
-  <style>
-    body { font-family: 'Noto Serif Bengali', serif; margin: 0; padding: 0; display: flex; height: 100vh; overflow: hidden; }
-    aside { width: 30%; background: #f4f4f4; padding: 2em; overflow-y: auto; border-right: 1px solid #ccc; }
-    main { width: 70%; padding: 2em; overflow-y: auto; }
-    h1 { color: #003366; margin-top: 0; }
-    #searchBox { width: 100%; padding: 8px; margin: 10px 0; font-size: 1em; border: 1px solid #ccc; border-radius: 4px; }
-    .index a { display: block; margin: 0.5em 0; color: #0066cc; text-decoration: none; }
-    .index a:hover { text-decoration: underline; }
-    .index a.has-media { color: green; font-weight: bold; }
-    .poem { margin-bottom: 4em; }
-    p { white-space: pre-line; }
-    .media-card {
-      background: #fafafa;
-      border: 1px solid #ddd;
-      border-radius: 10px;
-      padding: 12px;
-      margin: 15px 0;
-      box-shadow: 0 2px 6px rgba(0,0,0,0.1);
-      text-align: center;
-    }
-    .media-card audio,
-    .media-card video {
-      width: 80%;
-      outline: none;
-      margin: 8px auto 0 auto;
-      display: block;
-    }
-    .media-card img {
-      max-width: 80%;
-      border-radius: 10px;
-      box-shadow: 0 2px 8px rgba(0,0,0,0.2);
-      margin: 8px auto 0 auto;
-      display: block;
-    }
-    .media-caption {
-      font-size: 0.9em;
-      font-weight: bold;
-      color: #444;
-      margin: 0;
-    }
-    .audio-thumb {
-      width: 100px;
-      height: 100px;
-      border-radius: 50%;
-      object-fit: cover;
-      margin-bottom: 8px;
-      display: block;
-      margin-left: auto;
-      margin-right: auto;
-      box-shadow: 0 2px 6px rgba(0,0,0,0.2);
-    }
-
-    /* 🎨 Painting frame (6 images in flexbox) */
-    .painting-frame {
-      display: flex;
-      flex-wrap: wrap;
-      justify-content: center;
-      gap: 10px;
-      margin: 20px 0;
-    }
-    .painting-frame img {
-      width: 150px;
-      height: 150px;
-      object-fit: cover;
-      border-radius: 10px;
-      box-shadow: 0 2px 6px rgba(0,0,0,0.3);
-      transition: transform 0.2s ease;
-    }
-    .painting-frame img:hover {
-      transform: scale(1.05);
-    }
-  </style>
+  <link rel="stylesheet" href="{style}">
   <link href="https://fonts.googleapis.com/css2?family=Noto+Serif+Bengali&display=swap" rel="stylesheet">
 </head>
 <body>
   <aside>
     <h1>👨‍👩‍👧‍👦 পারিবারিক কার্যক্রম</h1>
-    <input type="text" id="searchBox" placeholder="🔍 খুঁজে দেখুন ..." onkeyup="filterPoems()">
+    <input type="text" id="searchBox" placeholder="🔍 খুঁজে দেখুন ..." onkeyup="filterPoems()" data-index="{search_index}">
     <div class="index">
-"""
+{index}    </div>
+  </aside>
+  <main id="poemContainer">
+{main}
+  </main>
+
+<script src="{search}"></script>
+<script>{register}</script>
+
+</body>
+</html>
+""")
+
+INDEX_LINK = Template('      <a href="#{anchor}" class="{link_class}">{title} - {poet}</a>\n')
+
+CARD = Template("""
+    <div class="poem" id="{anchor}">
+      <h2>{title}</h2>
+      <p><strong><em>{label_text} {poet}</em></strong></p>
+      {media_html}
+      <p>{body}</p>
+      {related_html}
+    </div>
+""")
+
+RELATED = Template('<nav class="related">সম্পর্কিত লেখা: {links}</nav>')
+RELATED_LINK = Template('<a href="#{anchor}">{title}</a>')
+
 
 # Build index + main content
-main_content = ""
-for idx, (_, poet, title, media_type, media_file, dance_tag, dance_file, body) in enumerate(matches, start=1):
+def gallery_images(name):
+    """(file, alt) of the images listed in the gallery manifest media/<name>.txt, if any."""
+    manifest_name = MEDIA_INDEX.find(f"{name}.txt")
+    if not manifest_name:
+        return []
+    return [(MEDIA_INDEX.find(file) or file, alt) for file, alt in read_gallery(Path("media") / manifest_name)]
+
+
+def media_state(part):
+    """Everything an entry's HTML depends on for one media reference."""
+    name = MEDIA_INDEX.find(part)
+    gallery = gallery_images(part)
+    return [
+        name, name and manifest.file_hash(Path("media") / name),
+        MEDIA_AUDIO.sources.get(name), MEDIA_IMAGES.pictures.get(name),
+        gallery, [MEDIA_IMAGES.pictures.get(file) for file, _ in gallery],
+    ]
+
+
+def render_entry(idx, poet, title, media_type, media_file, dance_tag, dance_file, body, related_html=""):
+    """Returns the side-index link and the main card HTML of one entry."""
     anchor = f"poem{idx}"
 
     # Determine if it has media
@@ -118,7 +219,7 @@ for idx, (_, poet, title, media_type, media_file, dance_tag, dance_file, body) i
     link_class = "has-media" if has_media else ""
 
     # Add to side index
-    html += f'      <a href="#{anchor}" class="{link_class}">{title} - {poet}</a>\n'
+    link_html = INDEX_LINK.render(anchor=anchor, link_class=link_class, title=title, poet=poet)
 
     # Build media HTML
     media_html = ""
@@ -126,8 +227,8 @@ for idx, (_, poet, title, media_type, media_file, dance_tag, dance_file, body) i
         parts = media_file.strip().split("|")
         file_name = parts[0].strip()
         cover_img = parts[1].strip() if len(parts) > 1 else None
-        media_path = Path("media") / file_name
-        cover_path = Path("media") / cover_img if cover_img else None
+        media_name = MEDIA_INDEX.find(file_name)   # on-disk spelling, None if missing
+        cover_name = MEDIA_INDEX.find(cover_img) if cover_img else None
 
         if media_type == "audio":
             if media_file.strip().startswith("http") and "facebook.com/reel" in media_file:
@@ -140,14 +241,15 @@ for idx, (_, poet, title, media_type, media_file, dance_tag, dance_file, body) i
                           allow="autoplay; clipboard-write; encrypted-media; picture-in-picture; web-share"></iframe>
                 </div>'''
             else:
-                img_html = f'<img src="media/{cover_img}" alt="{title} cover" class="audio-thumb">' if cover_img and cover_path.exists() else ""
-                if media_path.exists():
+                img_html = picture_tag(MEDIA_IMAGES, cover_name, "media/", f"{title} cover", "100px", ' class="audio-thumb"') if cover_name else ""
+                if media_name:
+                    sources_html = source_tags(MEDIA_AUDIO, media_name, "media/", "\n                        ")
                     media_html = f'''
                     <div class="media-card">
                       {img_html}
                       <p class="media-caption">🎵 পাঠ</p>
                       <audio controls>
-                        <source src="media/{file_name}" type="audio/mpeg">
+                        {sources_html}
                       </audio>
                     </div>'''
 
@@ -159,39 +261,34 @@ for idx, (_, poet, title, media_type, media_file, dance_tag, dance_file, body) i
                   <iframe src="{media_file.strip()}" width="640" height="360" allow="autoplay" allowfullscreen></iframe>
                 </div>'''
             else:
-                poster_attr = f' poster="media/{cover_img}"' if cover_img and cover_path.exists() else ""
-                if media_path.exists():
+                poster_attr = f' poster="{image_url(MEDIA_IMAGES, cover_name, "media/")}"' if cover_name else ""
+                if media_name:
                     media_html = f'''
                     <div class="media-card">
                       <p class="media-caption">🎥 ভিডিও</p>
                       <video controls {poster_attr}>
-                        <source src="media/{file_name}" type="video/mp4">
+                        <source src="media/{media_name}" type="video/mp4">
                       </video>
                     </div>'''
 
         elif media_type == "image":
-            # 🖼️ If "painting" keyword found, use painting-frame
-            if "paintings-1" in file_name.lower():
+            # 🖼️ A gallery manifest (media/<name>.txt) lists the paintings of a painting-frame
+            gallery = gallery_images(file_name)
+            if gallery:
+                frame_html = "\n".join(
+                    "                  " + picture_tag(MEDIA_IMAGES, name, "media/", alt, "150px")
+                    for name, alt in gallery
+                )
                 media_html = f'''
                 <div class="painting-frame">
-                  <img src="media/paint1.jpg" alt="Painting 1">
-                  <img src="media/paint2.jpg" alt="Painting 2">
-                  <img src="media/paint3.jpg" alt="Painting 3">
-                  <img src="media/paint4.jpg" alt="Painting 4">
-                  <img src="media/paint5.jpg" alt="Painting 5">
-                  <img src="media/paint6.jpg" alt="Painting 6">
-                  <img src="media/paint7.jpg" alt="Painting 7">
-                  <img src="media/paint8.jpg" alt="Painting 8">
-                  <img src="media/paint9.jpg" alt="Painting 9">
-                  <img src="media/paint10.jpg" alt="Painting 10">
-                  <img src="media/paint11.jpg" alt="Painting 11">
-                  <img src="media/paint12.jpg" alt="Painting 12">
+{frame_html}
                 </div>'''
-            elif media_path.exists():
+            elif media_name:
+                image_html = picture_tag(MEDIA_IMAGES, media_name, "media/", title, "56vw")
                 media_html = f'''
                 <div class="media-card">
                   <p class="media-caption">🖼️ ছবি</p>
-                  <img src="media/{file_name}" alt="{title}">
+                  {image_html}
                 </div>'''
 
         elif media_type == "pdf":
@@ -202,12 +299,12 @@ for idx, (_, poet, title, media_type, media_file, dance_tag, dance_file, body) i
                   <iframe src="{media_file.strip()}" width="100%" height="500px"></iframe>
                   <p><a href="{media_file.strip()}" target="_blank">🔗 পূর্ণ পিডিএফ দেখুন</a></p>
                 </div>'''
-            elif media_path.exists():
+            elif media_name:
                 media_html = f'''
                 <div class="media-card">
                   <p class="media-caption">📄 পিডিএফ ফাইল</p>
-                  <iframe src="media/{file_name}" width="100%" height="500px"></iframe>
-                  <p><a href="media/{file_name}" target="_blank">🔗 পূর্ণ পিডিএফ দেখুন</a></p>
+                  <iframe src="media/{media_name}" width="100%" height="500px"></iframe>
+                  <p><a href="media/{media_name}" target="_blank">🔗 পূর্ণ পিডিএফ দেখুন</a></p>
                 </div>'''
 
     # ✅ Dynamic label
@@ -218,35 +315,52 @@ for idx, (_, poet, title, media_type, media_file, dance_tag, dance_file, body) i
     else:
         label_text = "লেখক :"
 
-    main_content += f"""
-    <div class="poem" id="{anchor}">
-      <h2>{title}</h2>
-      <p><strong><em>{label_text} {poet}</em></strong></p>
-      {media_html}
-      <p>{body.strip()}</p>
-    </div>
-"""
+    card_html = CARD.render(
+        anchor=anchor, title=title, label_text=label_text, poet=poet, media_html=media_html, body=body.strip(),
+        related_html=related_html,
+    )
+    return link_html, card_html
 
-# Close HTML
-html += f"""    </div>
-  </aside>
-  <main id="poemContainer">
-{main_content}
-  </main>
 
-<script>
-function filterPoems() {{
-  let input = document.getElementById("searchBox").value.toLowerCase();
-  let links = document.querySelectorAll(".index a");
-  links.forEach(link => {{
-    link.style.display = link.textContent.toLowerCase().includes(input) ? "block" : "none";
-  }});
-}}
-</script>
+stage("render")
+index_links, cards = [], []
+search_docs = []   # (anchor, searchable text) for the sidebar search
+for n, (idx, record) in enumerate(matches):
+    _, poet, title, media_type, media_file, dance_tag, dance_file, body = record
 
-</body>
-</html>
-"""
+    # Links to the related entries
+    related_html = ""
+    if neighbours[n]:
+        related_html = RELATED.render(links=[
+            RELATED_LINK.render(anchor=f"poem{matches[j][0]}", title=matches[j][1][2].strip()) for j in neighbours[n]
+        ])
 
-Path("index9.html").write_text(html, encoding="utf-8")
-print("✅ index9.html generated successfully with dynamic labels, 👨‍👩‍👧‍👦 heading, and 🎨 painting frame!")
+    # Reuse the entry's HTML if neither it, its media nor its related entries changed
+    media_hashes = []
+    if media_file.strip() and not media_file.strip().startswith("http"):
+        media_hashes = [media_state(part.strip()) for part in media_file.split("|")]
+    key = digest(TEMPLATE_HASH, idx, record, media_hashes, related_html)
+    cached = manifest.fragment(key)
+    if cached is None:
+        cached = manifest.store(key, list(render_entry(idx, *record[1:], related_html)))
+    index_links.append(cached[0])
+    cards.append(cached[1])
+    search_docs.append((f"poem{idx}", f"{title}\n{poet}\n{body}"))
+
+# Close HTML, streamed straight into the file
+stage("search")
+search_index = write_search_index(site_dir, output_file.name, search_docs)
+stage("write")
+style = write_asset(site_dir, output_file.name, "style.css", STYLE)
+search = write_asset(site_dir, output_file.name, "search.js", SEARCH_JS, shared=True)
+write_page(
+    output_file, PAGE, index=index_links, main=cards, search_index=search_index,
+    style=style, search=search, register=REGISTER_JS,
+)
+precompress(output_file, manifest)
+offline = write_service_worker(site_dir, output_file.name, [style, search, search_index + ".gz"], manifest)
+print(f"📴 offline: sw.js precaches {offline} files")
+manifest.mark_built(output_file, build_key)
+manifest.save()
+print(f"✅ {output_file.name} generated successfully with dynamic labels, 👨‍👩‍👧‍👦 heading, and 🎨 painting frame!")
+report()
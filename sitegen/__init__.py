@@ -0,0 +1 @@
+"""Shared build helpers for the poem / golpo site generators."""
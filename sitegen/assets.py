@@ -0,0 +1,141 @@
+# ----------------------------------------------------
+# Shared CSS/JS as hashed, minified, precompressed files
+# ----------------------------------------------------
+# Every page used to inline its whole stylesheet and the search script,
+# so each visit downloaded them again with the page.  write_asset() stores
+# them minified in <folder>/assets/ under a name that carries a hash of
+# the content (index.style.<hash>.css): the URL changes whenever the
+# content does, so a browser or CDN may cache it forever.  Every output
+# (assets, JSON chunks and indexes, the pages themselves) also gets a
+# gzip and, when the `brotli` package is installed, a brotli copy next to
+# it for servers that send precompressed files (nginx gzip_static /
+# brotli_static, the preview server).  Scripts that are the same on every
+# page (search, chunk loader) go to the site's own assets/ folder instead,
+# one copy for all collections.  Hashed files are only compressed when
+# first written; the copies of a page are recorded in the build manifest
+# under its content hash, so a rebuild that wrote the same page again
+# skips compressing it (brotli at quality 11 takes seconds per MiB).
+# ----------------------------------------------------
+
+import gzip
+import os
+import re
+from pathlib import Path
+
+from sitegen.manifest import digest
+from sitegen.stages import count
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ASSET_DIR = "assets"
+QUICK_ENV = "SITEGEN_QUICK"   # set by watch mode: fast compression levels, for a quick turnaround
+SITE_ASSETS = Path(__file__).resolve().parent.parent / ASSET_DIR
+
+
+def write_asset(directory, page, name, text, shared=False):
+    """Writes `text` (the .css / .js file `name` of `page`) to assets/; returns its URL relative to the page.
+
+    shared: the same file for every page, kept once in SITE_ASSETS; its
+    older versions stay until prune_shared(), other pages may still use them.
+    """
+    stem, ext = name.rsplit(".", 1)
+    data = MINIFY[ext](text).encode("utf-8")
+    out_dir = SITE_ASSETS if shared else Path(directory) / ASSET_DIR
+    out_dir.mkdir(parents=True, exist_ok=True)
+    prefix = stem if shared else f"{Path(page).stem}.{stem}"
+    file = f"{prefix}.{digest(data)[:10]}.{ext}"
+    if not (out_dir / file).exists():
+        write_compressed(out_dir / file, data)
+
+    # Versions of older builds of the same page
+    if not shared:
+        for path in out_dir.glob(f"{prefix}.*"):
+            if path.name not in variants(file):
+                path.unlink()
+    return Path(os.path.relpath(out_dir / file, directory)).as_posix()
+
+
+def prune_shared(files):
+    """Deletes the other versions of the shared assets `files` (names in SITE_ASSETS)."""
+    for file in files:
+        prefix = file.split(".", 1)[0]
+        for path in SITE_ASSETS.glob(f"{prefix}.*"):
+            if path.name not in variants(file) and ".tmp" not in path.suffixes:
+                path.unlink()
+
+
+def write_compressed(path, data):
+    """Writes `data` to `path` plus its .gz (and .br) copies."""
+    path = Path(path)
+    # Compressed copies first: the plain file marks the set as complete
+    for out, compress in _copies(path):
+        _replace(out, compress(data))
+    _replace(path, data)
+
+
+def precompress(path, manifest=None):
+    """Writes the .gz (and .br) copies of an existing output file.
+
+    With a BuildManifest, a copy is kept when it was made from the same
+    content (hash) at the same compression level.
+    """
+    path = Path(path)
+    key = manifest and digest(manifest.file_hash(path), _levels())
+    data = None
+    for out, compress in _copies(path):
+        if key and manifest.is_fresh(out, key):
+            continue
+        if data is None:
+            data = path.read_bytes()
+        _replace(out, compress(data))
+        if key:
+            manifest.mark_built(out, key)
+
+
+def variants(name):
+    """File names of `name` and its compressed copies."""
+    return {name, f"{name}.gz", f"{name}.br"}
+
+
+def minify_css(text):
+    """Drops comments and the whitespace around punctuation."""
+    text = re.sub(r"/\*.*?\*/", "", text, flags=re.DOTALL)
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"\s*([{};,>])\s*", r"\1", text)
+    return re.sub(r":\s+", ":", text).replace(";}", "}").strip()
+
+
+def minify_js(text):
+    """Drops indentation, blank lines and whole-line // comments.
+
+    Line breaks stay (no semicolon insertion surprises); the gzip and
+    brotli copies take care of the rest.
+    """
+    lines = (line.strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line and not line.startswith("//"))
+
+
+MINIFY = {"css": minify_css, "js": minify_js}
+
+
+def _levels():
+    """(gzip level, brotli quality) of this build."""
+    return (1, 4) if os.environ.get(QUICK_ENV) else (9, 11)
+
+
+def _copies(path):
+    """(path of the compressed copy, compress function) for each format."""
+    gzip_level, brotli_quality = _levels()
+    yield path.with_name(path.name + ".gz"), lambda data: gzip.compress(data, gzip_level, mtime=0)
+    if brotli is not None:
+        yield path.with_name(path.name + ".br"), lambda data: brotli.compress(data, quality=brotli_quality)
+
+
+def _replace(path, content):
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(content)
+    count("bytes_written", len(content))
+    os.replace(tmp, path)
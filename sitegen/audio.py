@@ -0,0 +1,111 @@
+# ----------------------------------------------------
+# Web audio preparation (Opus + MP3 fallback)
+# ----------------------------------------------------
+# The media folders mix .mp3, .aac, .m4a and .mkv recordings at their
+# original, often oversized bitrates, and the pages announced all of
+# them as audio/mpeg.  prepare_audio() transcodes every recording of a
+# folder with ffmpeg to a low-bitrate Opus file plus an MP3 fallback in
+# <folder>/web/, several ffmpeg processes at once.  Output names carry
+# the hash of the input, so a recording is only transcoded again when it
+# changes.  Without ffmpeg the originals are used, with their real MIME
+# type.
+# ----------------------------------------------------
+
+import os
+import shutil
+import subprocess
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from sitegen.stages import count
+
+WEB_DIR = "web"
+
+AUDIO_EXTS = (".mp3", ".aac", ".m4a", ".wav", ".ogg", ".opus", ".mkv")
+
+# None = let the browser sniff the type (no MIME type it reliably accepts)
+MIME_TYPES = {
+    ".mp3": "audio/mpeg",
+    ".aac": "audio/aac",
+    ".m4a": "audio/mp4",
+    ".wav": "audio/wav",
+    ".ogg": "audio/ogg",
+    ".opus": "audio/ogg; codecs=opus",
+    ".mkv": None,
+}
+
+# (suffix, MIME type, ffmpeg encoder arguments), in <source> order
+WEB_FORMATS = (
+    (".opus", "audio/ogg; codecs=opus", ["-c:a", "libopus", "-b:a", "48k"]),
+    (".mp3", "audio/mpeg", ["-c:a", "libmp3lame", "-b:a", "96k"]),
+)
+
+# sources   : {original name: [(path relative to the folder, MIME type), ...]}
+# transcoded: how many files ffmpeg produced this run
+Prepared = namedtuple("Prepared", "sources transcoded")
+
+
+def prepare_audio(manifest, directory, names, workers=None):
+    """Transcodes the recordings among `names` in `directory`; returns Prepared."""
+    directory = Path(directory)
+    ffmpeg = shutil.which("ffmpeg")
+    sources, jobs, keep = {}, [], set()
+    for name in names:
+        suffix = Path(name).suffix.lower()
+        if suffix not in AUDIO_EXTS:
+            continue
+        sources[name] = [(name, MIME_TYPES[suffix])]
+        if not ffmpeg:
+            continue
+
+        key = manifest.file_hash(directory / name)[:10]
+        targets = []
+        for ext, mime, args in WEB_FORMATS:
+            path = f"{WEB_DIR}/{Path(name).stem}.{key}{ext}"
+            keep.add(Path(path).name)
+            if not (directory / path).exists():
+                jobs.append((ffmpeg, directory / name, directory / path, args))
+            targets.append((path, mime))
+        sources[name] = targets + [sources[name][0]]
+
+    if jobs:
+        (directory / WEB_DIR).mkdir(exist_ok=True)
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+            done = sum(pool.map(lambda job: _transcode(*job), jobs))
+    else:
+        done = 0
+
+    # Drop formats ffmpeg failed on; the original stays as the last resort
+    for name, options in sources.items():
+        web = [s for s in options[:-1] if (directory / s[0]).exists()]
+        sources[name] = web or options[-1:]
+
+    if ffmpeg and (directory / WEB_DIR).is_dir():
+        for path in (directory / WEB_DIR).iterdir():
+            if path.name not in keep and ".tmp" not in path.suffixes:   # not another build's job in flight
+                path.unlink()
+    if done:
+        count("transcoded", done)
+    return Prepared(sources, done)
+
+
+def source_tags(prepared, name, prefix="", sep=""):
+    """<source> tags for the recording `name`, best format first."""
+    sources = prepared.sources.get(name) or [(name, MIME_TYPES.get(Path(name).suffix.lower(), "audio/mpeg"))]
+    tags = []
+    for path, mime in sources:
+        type_attr = f' type="{mime}"' if mime else ""
+        tags.append(f'<source src="{prefix}{path}"{type_attr}>')
+    return sep.join(tags)
+
+
+def _transcode(ffmpeg, src, out, args):
+    """Runs one ffmpeg job; returns True when `out` was written."""
+    tmp = out.with_name(f"{out.stem}.{os.getpid()}.tmp{out.suffix}")
+    cmd = [ffmpeg, "-nostdin", "-loglevel", "error", "-y", "-i", str(src), "-vn", *args, str(tmp)]
+    if subprocess.run(cmd).returncode != 0:
+        tmp.unlink(missing_ok=True)
+        return False
+    os.replace(tmp, out)
+    return True
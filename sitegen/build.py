@@ -0,0 +1,210 @@
+# ----------------------------------------------------
+# Site builder: every collection with one command
+# ----------------------------------------------------
+# Each collection used to be built by hand, one after another: cd into
+# its folder, run its generator.  `python -m sitegen.build` reads the
+# collections from site.json (folder, generator script, input and output
+# names, extra options) and runs their generators side by side, each in
+# its own process and folder.  The scripts shared by every page (search,
+# chunk loader) are written once to the site's assets/ folder before the
+# builds start and each media folder is listed once into the media index
+# cache, so the generators of one folder do not scan it again.  A
+# collection that fails is reported with its output; the others go on.
+#
+# --watch keeps running: a change to a collection's input, one of its
+# media files or its generator rebuilds that collection only (a change
+# to sitegen/ rebuilds all), with the fast compression levels; the
+# generators' own caches keep that to the changed records.  --serve
+# previews the site on http://localhost:<port>/ and reloads the open
+# pages after each rebuild (sitegen.serve).
+# ----------------------------------------------------
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from sitegen.assets import QUICK_ENV, prune_shared, write_asset
+from sitegen.chunks import LOADER_JS
+from sitegen.media import CACHE_DIR, MediaIndex
+from sitegen.search import SEARCH_JS
+
+ROOT = Path(__file__).resolve().parent.parent
+SITEGEN_DIR = Path(__file__).resolve().parent
+CONFIG_PATH = ROOT / "site.json"
+
+# name   : collection name from the config
+# status : "built", "failed" or "skipped" (input missing)
+# seconds: wall time of its generator
+# output : what the generator printed (stdout + stderr)
+Result = namedtuple("Result", "name status seconds output")
+
+
+def load_config(path=CONFIG_PATH):
+    """The collections of site.json, with defaults filled in."""
+    path = Path(path)
+    config = json.loads(path.read_text(encoding="utf-8"))
+    collections = []
+    for c in config["collections"]:
+        c = {"args": [], "media": [], **c}
+        c["dir"] = (path.parent / c["dir"]).resolve()
+        collections.append(c)
+    return collections
+
+
+def shared_bundle():
+    """Writes the scripts every page shares to the site's assets/; returns their file names."""
+    return [Path(write_asset(ROOT, "", name, text, shared=True)).name
+            for name, text in (("search.js", SEARCH_JS), ("loader.js", LOADER_JS))]
+
+
+def warm_media(collections):
+    """Lists every media folder once into the media index cache of its collection folder."""
+    folders = {(c["dir"], media) for c in collections for media in c["media"]}
+    for directory, media in sorted(folders):
+        MediaIndex.load(directory / media, cache_dir=directory / CACHE_DIR)
+    return len(folders)
+
+
+def build(collection):
+    """Runs the generator of one collection in its folder; returns Result."""
+    name, directory = collection["name"], collection["dir"]
+    if not (directory / collection["input"]).exists():
+        return Result(name, "skipped", 0.0, f"{collection['input']} not found in {directory}")
+
+    cmd = [sys.executable, collection["script"], "--input", collection["input"], "--output", collection["output"],
+           *collection["args"]]
+    env = {**os.environ, "PYTHONIOENCODING": "utf-8"}   # emoji output through a pipe on Windows
+    start = time.perf_counter()
+    run = subprocess.run(cmd, cwd=directory, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                         encoding="utf-8", errors="replace")
+    seconds = time.perf_counter() - start
+    return Result(name, "built" if run.returncode == 0 else "failed", seconds, run.stdout)
+
+
+def build_all(collections, jobs=None):
+    """Builds `collections` concurrently; prints each one's output as it finishes; returns [Result]."""
+    results = []
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as pool:
+        futures = [pool.submit(build, c) for c in collections]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            print(f"\n---------- {result.name}: {result.status} ({result.seconds:.1f} s) ----------")
+            print(result.output.rstrip())
+    order = [c["name"] for c in collections]
+    return sorted(results, key=lambda r: order.index(r.name))
+
+
+def summary(results):
+    """Per-collection timing table."""
+    icons = {"built": "✅", "failed": "⚠️", "skipped": "⏭️"}
+    width = max(len(r.name) for r in results)
+    lines = ["", "📊 Build summary"]
+    for r in results:
+        lines.append(f"  {icons[r.status]} {r.name:<{width}}  {r.seconds:7.1f} s  {r.status:<7}  {_headline(r)}")
+    return "\n".join(lines)
+
+
+def affected(collections, paths):
+    """The collections that a change of `paths` (resolved) makes stale."""
+    stale = []
+    for c in collections:
+        inputs = {c["dir"] / c["input"], c["dir"] / c["script"]}
+        media = {c["dir"] / m for m in c["media"]}
+        if any(p in inputs or p.parent in media or (p.parent == SITEGEN_DIR and p.suffix == ".py") for p in paths):
+            stale.append(c)
+    return stale
+
+
+def watch(collections, jobs=None, reloader=None):
+    """Rebuilds the collections affected by each change until interrupted."""
+    from sitegen.watch import Watcher
+
+    folders = {SITEGEN_DIR} | {c["dir"] for c in collections} | {c["dir"] / m for c in collections for m in c["media"]}
+    watcher = Watcher(folders)
+    print(f"👀 watching {len(watcher.directories)} folders ({watcher.mode}), Ctrl+C to stop")
+    try:
+        while True:
+            changed = watcher.wait()
+            stale = affected(collections, changed)
+            if not stale:
+                continue
+            start = time.perf_counter()
+            names = ", ".join(sorted(p.name for p in changed)[:5]) + (" …" if len(changed) > 5 else "")
+            print(f"\n🔄 {names} changed: rebuilding {', '.join(c['name'] for c in stale)}")
+            results = build_all(stale, jobs)
+            print(summary(results))
+            print(f"⏱️ rebuilt in {time.perf_counter() - start:.2f} s")
+            if reloader and any(r.status == "built" for r in results):
+                reloader.notify()
+    except KeyboardInterrupt:
+        print("\n👋 stopped watching")
+    finally:
+        watcher.stop()
+
+
+def _headline(result):
+    """The generator's ✅ line, or its last line (the error) if it failed."""
+    lines = result.output.strip().splitlines() or [""]
+    if result.status == "built":
+        return next((line for line in lines if line.startswith("✅")), lines[-1])
+    return lines[-1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Builds every collection listed in site.json")
+    parser.add_argument("names", nargs="*", help="only these collections (default: all)")
+    parser.add_argument("--config", default=CONFIG_PATH, help="collection list (default: site.json)")
+    parser.add_argument("--jobs", type=int, default=None, help="collections built at once (default: number of CPUs)")
+    parser.add_argument("--watch", action="store_true", help="keep rebuilding what a change affects")
+    parser.add_argument("--serve", action="store_true", help="preview the site, reloading pages after rebuilds")
+    parser.add_argument("--port", type=int, default=8000, help="preview server port (default: 8000)")
+    parser.add_argument("--service-worker", action="store_true", help="keep the offline service worker in the preview")
+    args = parser.parse_args(argv)
+
+    collections = load_config(args.config)
+    unknown = set(args.names) - {c["name"] for c in collections}
+    if unknown:
+        parser.error(f"unknown collection(s): {', '.join(sorted(unknown))}")
+    if args.names:
+        collections = [c for c in collections if c["name"] in args.names]
+
+    if args.watch:
+        os.environ[QUICK_ENV] = "1"   # inherited by the generators
+    start = time.perf_counter()
+    bundle = shared_bundle()
+    print(f"📦 shared assets: {', '.join(bundle)}")
+    print(f"🔍 media index: {warm_media(collections)} folders listed")
+    results = build_all(collections, args.jobs)
+    print(summary(results))
+    print(f"⏱️ {len(results)} collections in {time.perf_counter() - start:.1f} s")
+
+    # Older shared scripts can go once every page refers to the current ones
+    if not args.names and all(r.status == "built" for r in results):
+        prune_shared(bundle)
+
+    reloader = None
+    if args.serve:
+        from sitegen.serve import serve
+
+        server, reloader = serve(ROOT, args.port, service_worker=args.service_worker)
+        print(f"🌐 preview on http://localhost:{server.server_address[1]}/")
+    if args.watch:
+        watch(collections, args.jobs, reloader)
+    elif args.serve:
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+    return 1 if any(r.status == "failed" for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
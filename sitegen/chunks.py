@@ -0,0 +1,164 @@
+# ----------------------------------------------------
+# Poem bodies as on-demand JSON chunks + virtualised main pane
+# ----------------------------------------------------
+# A page that inlines every poem makes phones download and lay out the
+# whole anthology before anything is usable.  write_chunks() stores the
+# rendered poem cards as compact JSON arrays of `size` cards each in
+# <folder>/poems/, named by content hash and precompressed (gzip, brotli).
+# The page then only carries the side index plus chunk_index(), the list
+# of chunk files with the poem ids each one holds.  LOADER_JS turns the
+# main pane into a virtualised scroller: one placeholder per chunk (sized
+# by an estimate until it has been rendered), chunks fetched and rendered
+# as they approach the viewport and emptied again far away from it, and
+# #poemN deep links resolved to their chunk before scrolling.
+# ----------------------------------------------------
+
+import json
+import re
+from collections import namedtuple
+from pathlib import Path
+
+from sitegen.assets import variants, write_compressed
+from sitegen.manifest import digest
+
+CHUNK_DIR = "poems"
+CHUNK_SIZE = 50
+
+# file  : URL of the chunk, relative to the page
+# ids   : element ids of the poem cards it holds, in page order
+# height: estimated height in px of the rendered cards
+Chunk = namedtuple("Chunk", "file ids height")
+
+
+def write_chunks(directory, cards, size=CHUNK_SIZE):
+    """Writes `cards` ([(id, html), ...]) as JSON chunks; returns [Chunk]."""
+    out_dir = Path(directory) / CHUNK_DIR
+    out_dir.mkdir(parents=True, exist_ok=True)
+    chunks, keep = [], set()
+    for start in range(0, len(cards), size):
+        part = cards[start:start + size]
+        data = json.dumps([html for _, html in part], ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        name = f"chunk-{start // size + 1:04d}.{digest(data)[:10]}.json"
+        path = out_dir / name
+        if not path.exists():
+            write_compressed(path, data)
+        keep.update(variants(name))
+        chunks.append(Chunk(f"{CHUNK_DIR}/{name}", [i for i, _ in part], sum(_estimate(html) for _, html in part)))
+
+    # Chunks of an older build are not referenced any more
+    for path in out_dir.iterdir():
+        if path.name not in keep:
+            path.unlink()
+    return chunks
+
+
+def chunk_index(chunks):
+    """The chunk list as JSON, safe inside <script type="application/json">."""
+    data = [{"file": c.file, "ids": c.ids, "height": c.height} for c in chunks]
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).replace("</", "<\\/")
+
+
+def _estimate(html):
+    """Rough rendered height of a card: heading and margins plus one line per text line."""
+    lines = html.count("\n") + len(re.findall(r"<br\s*/?>", html))
+    return 120 + 28 * lines
+
+
+# fetchJson(url): the .gz copy unpacked in the browser (static hosts such
+# as GitHub Pages do not negotiate Content-Encoding), else the plain file
+FETCH_JSON_JS = """
+  async function fetchJson(url) {
+    if ("DecompressionStream" in window) {
+      try {
+        const r = await fetch(url + ".gz");
+        if (r.ok) {
+          // A server that sends Content-Encoding: gzip has the browser unpack it already
+          const encoded = (r.headers.get("Content-Encoding") || "").includes("gzip");
+          const body = encoded ? r.body : r.body.pipeThrough(new DecompressionStream("gzip"));
+          return await new Response(body).json();
+        }
+      } catch (e) { /* fall back to the plain file */ }
+    }
+    const r = await fetch(url);
+    if (!r.ok) throw new Error(url + ": HTTP " + r.status);
+    return r.json();
+  }
+"""
+
+# Expects <main id="poemContainer"> (the scrolling element) and the chunk
+# list in <script type="application/json" id="poemChunks">.
+LOADER_JS = """
+(function () {
+  const chunks = JSON.parse(document.getElementById("poemChunks").textContent);
+  const container = document.getElementById("poemContainer");
+  const where = {};    // poem id -> chunk number
+  const fetched = [];  // chunk number -> Promise of its cards
+  const shown = [];    // chunk number -> Promise, while rendered
+
+  const slots = chunks.map((chunk, i) => {
+    chunk.ids.forEach(id => { where[id] = i; });
+    const slot = document.createElement("div");
+    slot.className = "chunk";
+    slot.dataset.chunk = i;
+    slot.style.height = chunk.height + "px";
+    container.appendChild(slot);
+    return slot;
+  });
+""" + FETCH_JSON_JS + """
+  function load(i) {
+    if (!fetched[i]) {
+      fetched[i] = fetchJson(chunks[i].file).catch(err => { fetched[i] = null; throw err; });
+    }
+    return fetched[i];
+  }
+
+  function show(i) {
+    if (!shown[i]) {
+      const p = load(i).then(cards => {
+        if (shown[i] !== p) return;  // scrolled away before it arrived
+        slots[i].innerHTML = cards.join("");
+        slots[i].style.height = "";
+      }, err => {
+        if (shown[i] === p) shown[i] = null;
+        throw err;
+      });
+      shown[i] = p;
+    }
+    return shown[i];
+  }
+
+  function hide(i) {
+    if (!shown[i]) return;
+    const slot = slots[i];
+    if (!slot.style.height) slot.style.height = slot.offsetHeight + "px";  // keep its measured place
+    slot.innerHTML = "";
+    shown[i] = null;
+  }
+
+  const near = new IntersectionObserver(entries => {
+    entries.forEach(e => { if (e.isIntersecting) show(+e.target.dataset.chunk).catch(console.error); });
+  }, { root: container, rootMargin: "1500px 0px" });
+  const far = new IntersectionObserver(entries => {
+    entries.forEach(e => { if (!e.isIntersecting) hide(+e.target.dataset.chunk); });
+  }, { root: container, rootMargin: "6000px 0px" });
+  slots.forEach(slot => { near.observe(slot); far.observe(slot); });
+
+  // Deep links (#poem123): render the poem's chunk, then scroll to it
+  async function reveal() {
+    const id = decodeURIComponent(location.hash.slice(1));
+    if (!(id in where)) return;
+    await show(where[id]);
+    const el = document.getElementById(id);
+    if (el) el.scrollIntoView();
+  }
+  window.addEventListener("hashchange", () => { reveal().catch(console.error); });
+  document.addEventListener("click", e => {
+    const link = e.target.closest('a[href^="#"]');
+    if (link && link.hash === location.hash) {
+      e.preventDefault();  // same hash again: no hashchange event
+      reveal().catch(console.error);
+    }
+  });
+  reveal().catch(console.error);
+})();
+"""
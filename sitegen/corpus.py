@@ -0,0 +1,220 @@
+# ----------------------------------------------------
+# SQLite corpus: every export parsed once, queried by the generators
+# ----------------------------------------------------
+# Each generator used to re-parse its Poem*.txt export with its own
+# regex on every run.  Corpus.sync() parses an export into one SQLite
+# database (.build/corpus.sqlite): WhatsApp exports through the
+# append-only ingestion of sitegen.ingest (only the new tail is parsed,
+# the resume state lives in the `sources` table), other text files with
+# their regex, again only when the file changed.  Records get one row
+# each (timestamp, author, title, media, dance/painter tag, body) with
+# indexes on author, date and media and an FTS5 index over title, author
+# and body.  Corpus.records() returns them in the generator's record
+# shape, optionally filtered (author, date range, with media, full-text
+# match, poem numbers) by indexed queries.
+# ----------------------------------------------------
+
+import json
+import re
+import sqlite3
+import unicodedata
+from collections import namedtuple
+from datetime import datetime
+from pathlib import Path
+
+from sitegen.ingest import parse_tail
+from sitegen.manifest import BUILD_DIR, digest
+from sitegen.stages import count
+
+CORPUS_PATH = BUILD_DIR / "corpus.sqlite"
+
+# Fields of each record shape, in tuple order (records columns)
+FIELDS = {
+    "adhir": ("timestamp", "author", "title", "media_file", "image_file", "body"),
+    "adhir_pdf": ("timestamp", "title", "media_file", "body"),
+    "golpo": ("timestamp", "author", "title", "media_type", "media_file", "tag", "tag_file", "body"),
+}
+
+COLUMNS = ("timestamp", "author", "title", "media_type", "media_file", "image_file", "tag", "tag_file", "body")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    name  TEXT PRIMARY KEY,       -- <export file>.<record shape>
+    state TEXT NOT NULL           -- JSON: resume state / hash of the last parse
+);
+CREATE TABLE IF NOT EXISTS records (
+    id         INTEGER PRIMARY KEY,
+    source     TEXT NOT NULL,
+    seq        INTEGER NOT NULL,  -- position in the export, from 0
+    timestamp  TEXT NOT NULL,     -- as exported: dd/mm/yyyy, hh:mm
+    date       TEXT,              -- yyyy-mm-dd hh:mm, for date ranges
+    author     TEXT NOT NULL,
+    title      TEXT NOT NULL,
+    media_type TEXT NOT NULL,
+    media_file TEXT NOT NULL,
+    image_file TEXT NOT NULL,
+    tag        TEXT NOT NULL,     -- dance / painter
+    tag_file   TEXT NOT NULL,
+    body       TEXT NOT NULL,
+    UNIQUE (source, seq)
+);
+CREATE INDEX IF NOT EXISTS records_author ON records (source, author);
+CREATE INDEX IF NOT EXISTS records_date ON records (source, date);
+CREATE INDEX IF NOT EXISTS records_media ON records (source, seq) WHERE media_file != '' OR image_file != '';
+CREATE VIRTUAL TABLE IF NOT EXISTS records_fts USING fts5(
+    title, author, body, content='records', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS records_ai AFTER INSERT ON records BEGIN
+    INSERT INTO records_fts (rowid, title, author, body)
+    VALUES (new.id, nfc(new.title), nfc(new.author), nfc(new.body));
+END;
+CREATE TRIGGER IF NOT EXISTS records_ad AFTER DELETE ON records BEGIN
+    INSERT INTO records_fts (records_fts, rowid, title, author, body)
+    VALUES ('delete', old.id, nfc(old.title), nfc(old.author), nfc(old.body));
+END;
+"""
+
+# source      : name of the source in the database
+# count       : records of the export
+# mode        : "full", "tail" or "cached" (file unchanged, nothing parsed)
+# parsed_bytes: how much of the file was actually parsed this run
+Synced = namedtuple("Synced", "source count mode parsed_bytes")
+
+
+class Corpus:
+    """The parsed exports of one folder, in .build/corpus.sqlite."""
+
+    def __init__(self, path=CORPUS_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=60)   # the site builder runs generators side by side
+        self.db.create_function("nfc", 1, _nfc, deterministic=True)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def sync(self, path, grammar):
+        """Brings the records of a WhatsApp export up to date (tail-only parse)."""
+        path = Path(path)
+        source = f"{path.name}.{grammar.name}"
+        tail = parse_tail(path, grammar, self._state(source))
+        with self.db:
+            self._replace(source, FIELDS[grammar.name], tail.kept, tail.records, grammar.sender or "")
+            if tail.resume:
+                self._set_state(source, tail.resume)
+        count("records", len(tail.records))
+        count("bytes_parsed", tail.parsed_bytes)
+        return Synced(source, tail.kept + len(tail.records), tail.mode, tail.parsed_bytes)
+
+    def sync_pattern(self, path, name, pattern, fields):
+        """Brings the records of a text file parsed by `pattern`.findall up to date.
+
+        `fields` names the columns of the match groups (see FIELDS); the
+        file is only parsed again when its content changed.
+        """
+        path = Path(path)
+        source = f"{path.name}.{name}"
+        data = path.read_bytes()
+        key = digest(data, pattern.pattern, pattern.flags, list(fields))
+        state = self._state(source)
+        if state and state.get("hash") == key:
+            total = self.db.execute("SELECT COUNT(*) FROM records WHERE source = ?", (source,)).fetchone()[0]
+            return Synced(source, total, "cached", 0)
+
+        records = pattern.findall(data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n"))
+        with self.db:
+            self._replace(source, fields, 0, records)
+            self._set_state(source, {"hash": key, "fields": list(fields)})
+        count("records", len(records))
+        count("bytes_parsed", len(data))
+        return Synced(source, len(records), "full", len(data))
+
+    def records(self, source, author=None, since=None, until=None, media=False, match=None, numbers=None):
+        """[(number, record)] of `source` in export order; number counts from 1.
+
+        since/until: "yyyy-mm-dd" (inclusive); media: only records with a
+        media or image file; match: FTS5 query over title, author and body.
+        """
+        fields = FIELDS.get(source.rsplit(".", 1)[1]) or self._state(source)["fields"]
+        where, params = ["source = ?"], [source]
+        if author:
+            where.append("author = ?")
+            params.append(author)
+        if since:
+            where.append("date >= ?")
+            params.append(since)
+        if until:
+            where.append("date <= ?")
+            params.append(until + " ~")   # any time of that day
+        if media:
+            where.append("(media_file != '' OR image_file != '')")
+        if match:
+            where.append("id IN (SELECT rowid FROM records_fts WHERE records_fts MATCH ?)")
+            params.append(_nfc(match))
+        if numbers:
+            where.append(f"seq IN ({', '.join('?' * len(numbers))})")
+            params.extend(n - 1 for n in numbers)
+        rows = self.db.execute(
+            f"SELECT seq, {', '.join(fields)} FROM records WHERE {' AND '.join(where)} ORDER BY seq",
+            params,
+        )
+        return [(row[0] + 1, tuple(row[1:])) for row in rows]
+
+    def _state(self, source):
+        row = self.db.execute("SELECT state FROM sources WHERE name = ?", (source,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _set_state(self, source, state):
+        self.db.execute("INSERT OR REPLACE INTO sources (name, state) VALUES (?, ?)", (source, json.dumps(state)))
+
+    def _replace(self, source, fields, start, records, author=""):
+        """Replaces the records of `source` from position `start` on."""
+        self.db.execute("DELETE FROM records WHERE source = ? AND seq >= ?", (source, start))
+        rows = []
+        for seq, record in enumerate(records, start):
+            row = dict.fromkeys(COLUMNS, "")
+            row["author"] = author   # fixed sender of the export, if any
+            row.update(zip(fields, record))
+            if row["media_file"] and not row["media_type"]:
+                row["media_type"] = "audio"
+            rows.append((source, seq, _date(row["timestamp"]), *(row[c] for c in COLUMNS)))
+        self.db.executemany(
+            f"INSERT INTO records (source, seq, date, {', '.join(COLUMNS)}) VALUES ({', '.join('?' * (len(COLUMNS) + 3))})",
+            rows,
+        )
+
+
+def add_query_args(parser):
+    """--author/--since/--until/--with-media/--match/--poem options for Corpus.records()."""
+    group = parser.add_argument_group("subset", "render only some records (numbers and anchors stay the same)")
+    group.add_argument("--author", help="only records of this sender / poet")
+    group.add_argument("--since", type=iso_date, help="only records from this date on (dd/mm/yyyy or yyyy-mm-dd)")
+    group.add_argument("--until", type=iso_date, help="only records up to this date (dd/mm/yyyy or yyyy-mm-dd)")
+    group.add_argument("--with-media", action="store_true", help="only records with a media or image file")
+    group.add_argument("--match", help="only records matching this full-text (FTS5) query")
+    group.add_argument("--poem", type=int, action="append", help="only this record number (repeatable)")
+
+
+def query(args):
+    """Corpus.records() keyword arguments from add_query_args() options."""
+    return dict(author=args.author, since=args.since, until=args.until,
+                media=args.with_media, match=args.match, numbers=args.poem)
+
+
+def iso_date(text):
+    """"dd/mm/yyyy" or "yyyy-mm-dd" -> "yyyy-mm-dd"."""
+    for fmt in ("%d/%m/%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(text, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            pass
+    raise ValueError(f"not a date: {text!r}")
+
+
+def _date(timestamp):
+    m = re.match(r"(\d{2})/(\d{2})/(\d{4}), (\d{2}:\d{2})", timestamp)
+    return f"{m.group(3)}-{m.group(2)}-{m.group(1)} {m.group(4)}" if m else None
+
+
+def _nfc(text):
+    return unicodedata.normalize("NFC", text) if text else text
@@ -0,0 +1,179 @@
+# ----------------------------------------------------
+# Near-duplicate records: reposted poems with small edits
+# ----------------------------------------------------
+# Poets often post the same poem again with a corrected line or two, and
+# every copy used to be rendered.  Comparing every body with every other
+# is quadratic, so each body gets a MinHash signature over its character
+# shingles (K code points of the normalized text: Bengali needs no word
+# splitting that way) and LSH banding puts bodies whose signatures agree
+# on a whole band in the same bucket.  Only bodies sharing a bucket are
+# compared, so the work grows with the number of records, not pairs.
+#
+# The signatures use one-permutation hashing: each shingle is hashed once
+# (crc32) and lands in one of NUM_HASHES bins that keeps its smallest
+# value; empty bins borrow from the next filled one.  That is the same
+# estimate of the Jaccard similarity as NUM_HASHES separate hash functions
+# for a fraction of the work in pure Python.  With BANDS x ROWS = 16 x 8,
+# a pair at similarity 0.8 shares a bucket with 95 % probability, one at
+# 0.3 with less than 0.1 %.
+#
+# The copies of a poem are ordered by their timestamps, not their place
+# in the export: merged or re-exported chats are not always in date order.
+# ----------------------------------------------------
+
+import json
+import re
+from array import array
+import unicodedata
+import zlib
+from collections import namedtuple
+from pathlib import Path
+
+K = 5                 # shingle length, in code points
+NUM_HASHES = 128      # signature length
+BANDS, ROWS = 16, 8   # LSH banding, BANDS * ROWS == NUM_HASHES
+SIMILARITY = 0.8      # estimated Jaccard similarity from which bodies count as the same poem
+MIN_CHARS = 40        # shorter bodies (captions, audio-only posts) are never duplicates
+MAX_BUCKET = 64       # larger buckets are compared along a chain, not pairwise
+
+EMPTY = 1 << 32
+PUNCTUATION = re.compile(r"[\s।॥.,;:!?'\"“”‘’()\[\]\-–—…*_~]+")
+TIMESTAMP = re.compile(r"(\d{2})/(\d{2})/(\d{4}), (\d{2}):(\d{2})")
+
+# What each --duplicates choice renders, for the build output
+KEPT = {"latest": "the latest copy rendered", "first": "the first copy rendered", "all": "every copy rendered"}
+
+# kept  : number of the record kept
+# copies: [(number, estimated similarity to the kept one)] of the others, oldest first
+Cluster = namedtuple("Cluster", "kept copies")
+
+
+def normalize(text):
+    """NFC, lower case, punctuation and whitespace runs as one space."""
+    return PUNCTUATION.sub(" ", unicodedata.normalize("NFC", text).lower()).strip()
+
+
+def signature(text):
+    """MinHash signature (array of NUM_HASHES) of the K-shingles of `text` (normalized), None if too short."""
+    text = normalize(text)
+    if len(text) < MIN_CHARS:
+        return None
+    data = text.encode("utf-32-le")
+    width = 4 * K
+    sig = [EMPTY] * NUM_HASHES
+    for h in set(map(zlib.crc32, [data[i:i + width] for i in range(0, len(data) - width + 4, 4)])):
+        b, v = h % NUM_HASHES, h // NUM_HASHES
+        if v < sig[b]:
+            sig[b] = v
+    return array("Q", _densify(sig))   # 1 KiB, not 128 int objects
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(x == y for x, y in zip(a, b)) / NUM_HASHES
+
+
+def clusters(signatures, threshold=SIMILARITY):
+    """Groups of positions in `signatures` (None: skipped) whose bodies are near-duplicates."""
+    parent = list(range(len(signatures)))
+
+    def root(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def link(i, j):
+        if root(i) != root(j) and similarity(signatures[i], signatures[j]) >= threshold:
+            parent[root(i)] = root(j)
+
+    for band in range(BANDS):
+        buckets = {}
+        lo = band * ROWS
+        for i, sig in enumerate(signatures):
+            if sig is not None:
+                buckets.setdefault(sig[lo:lo + ROWS].tobytes(), []).append(i)
+        for members in buckets.values():
+            if len(members) <= MAX_BUCKET:
+                for n, i in enumerate(members):
+                    for j in members[n + 1:]:
+                        link(i, j)
+            else:
+                for i, j in zip(members, members[1:]):
+                    link(i, j)
+
+    groups = {}
+    for i, sig in enumerate(signatures):
+        if sig is not None:
+            groups.setdefault(root(i), []).append(i)
+    return [g for g in groups.values() if len(g) > 1]
+
+
+def dedup(records, keep="latest", threshold=SIMILARITY):
+    """Drops the near-duplicate bodies of `records` ([(number, fields)] with the body last).
+
+    keep: "latest" (the last posted copy, by timestamp), "first" or "all"
+    (nothing dropped, the clusters only reported).  Returns (records, [Cluster]).
+    """
+    signatures = [signature(fields[-1]) for _, fields in records]
+    found, drop = [], set()
+    for group in clusters(signatures, threshold):
+        group.sort(key=lambda i: (posted(records[i][1][0]), i))   # oldest first, export order among equals
+        kept = group[-1] if keep != "first" else group[0]
+        found.append(Cluster(records[kept][0], [
+            (records[i][0], round(similarity(signatures[i], signatures[kept]), 3)) for i in group if i != kept
+        ]))
+        if keep != "all":
+            drop.update(i for i in group if i != kept)
+    found.sort(key=lambda c: c.kept)
+    return [r for i, r in enumerate(records) if i not in drop], found
+
+
+def posted(timestamp):
+    """Sort key of an exported "dd/mm/yyyy, hh:mm" timestamp; () (before any date) if unreadable."""
+    m = TIMESTAMP.match(timestamp)
+    if not m:
+        return ()
+    day, month, year, hour, minute = map(int, m.groups())
+    return year, month, day, hour, minute
+
+
+def write_report(path, records, found, title=lambda fields: fields[1]):
+    """Writes the clusters as JSON: each kept record with the copies it stands for."""
+    fields_of = dict(records)
+    report = [
+        {
+            "kept": {"number": c.kept, "title": title(fields_of[c.kept]), "timestamp": fields_of[c.kept][0]},
+            "duplicates": [
+                {"number": n, "title": title(fields_of[n]), "timestamp": fields_of[n][0], "similarity": s}
+                for n, s in c.copies
+            ],
+        }
+        for c in found
+    ]
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, ensure_ascii=False, indent=1), encoding="utf-8")
+
+
+def add_dedup_args(parser):
+    """--duplicates / --duplicate-similarity options for dedup()."""
+    group = parser.add_argument_group("duplicates", "reposted poems (near-identical bodies)")
+    group.add_argument("--duplicates", choices=("latest", "first", "all"), default="latest",
+                       help="which copy of a reposted poem to render (all: every copy); default: latest")
+    group.add_argument("--duplicate-similarity", type=float, default=SIMILARITY,
+                       help=f"estimated Jaccard similarity of two bodies from which they are one poem (default: {SIMILARITY})")
+
+
+def _densify(sig):
+    """Fills the empty bins with the next filled one's value (circularly), offset by the distance."""
+    filled = [i for i, v in enumerate(sig) if v != EMPTY]
+    if len(filled) == NUM_HASHES:
+        return sig
+    nxt = filled[0] + NUM_HASHES
+    for i in range(NUM_HASHES - 1, -1, -1):
+        if sig[i] != EMPTY:
+            nxt = i
+        else:
+            sig[i] = EMPTY + (nxt - i) * EMPTY + sig[nxt % NUM_HASHES]
+    return sig
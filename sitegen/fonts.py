@@ -0,0 +1,76 @@
+# ----------------------------------------------------
+# Offline, subsetted fonts for the WeasyPrint PDF builds
+# ----------------------------------------------------
+# The PDF templates link fonts.googleapis.com for Noto Serif Bengali.
+# Build hosts without network make WeasyPrint wait for that request and
+# then fall back to a slow font substitution.  Instead the font is read
+# from the vendored fonts/ folder at the repository root (Noto Serif
+# Bengali 2.001, SIL Open Font License: fonts/OFL.txt) and cut down
+# (with fontTools) to the characters the book actually uses, keeping
+# all OpenType layout features so conjuncts still shape correctly.  The
+# subset is cached in .build/fonts/ under the hash of that character set,
+# so it is only rebuilt when a poem brings in a new character.
+# ----------------------------------------------------
+
+import unicodedata
+from pathlib import Path
+
+from sitegen.manifest import BUILD_DIR, digest
+
+ROOT = Path(__file__).resolve().parent.parent
+FONT_DIR = ROOT / "fonts"
+BENGALI_SERIF = FONT_DIR / "NotoSerifBengali-Regular.otf"
+SUBSET_DIR = BUILD_DIR / "fonts"
+
+# Characters drawn by CSS generated content (page numbers, "পৃষ্ঠা ")
+# rather than by the document text
+EXTRA_CHARS = "0123456789 পৃষ্ঠা\u200c\u200d"
+
+
+def subset_font(font_path, text, out_dir=SUBSET_DIR):
+    """Path of a subset of `font_path` covering the characters of `text`.
+
+    Returns the full font when fontTools is not installed, and None
+    when the font itself is missing.
+    """
+    font_path = Path(font_path)
+    if not font_path.exists():
+        return None
+    try:
+        from fontTools import subset
+    except ImportError:
+        return font_path
+
+    # The shaper splits two-part vowel signs (ৌ = ে + ৗ, ো = ে + া) into
+    # their canonical parts, which need glyphs of their own
+    chars = set(text + EXTRA_CHARS)
+    chars = "".join(sorted(chars | set(unicodedata.normalize("NFD", "".join(chars)))))
+    key = digest(font_path.read_bytes(), chars)[:16]
+    out_path = Path(out_dir) / f"{font_path.stem}-{key}{font_path.suffix}"
+    if out_path.exists():
+        return out_path
+
+    options = subset.Options()
+    options.layout_features = ["*"]
+    options.name_IDs = ["*"]
+    options.notdef_outline = True
+    options.hinting = False
+    font = subset.load_font(str(font_path), options)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=[ord(c) for c in chars])
+    subsetter.subset(font)
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    for old in out_path.parent.glob(f"{font_path.stem}-*{font_path.suffix}"):
+        old.unlink()
+    tmp = out_path.with_suffix(".tmp")
+    subset.save_font(font, str(tmp), options)
+    tmp.replace(out_path)
+    return out_path
+
+
+def font_face(family, font_path):
+    """@font-face rule loading `font_path` from the local disk."""
+    return f"""<style>
+  @font-face {{ font-family: '{family}'; src: url("{Path(font_path).resolve().as_uri()}"); }}
+</style>"""
@@ -0,0 +1,188 @@
+# ----------------------------------------------------
+# Responsive image derivatives (thumbnails, srcset, intrinsic sizes)
+# ----------------------------------------------------
+# The pages served full-resolution originals, even for 100-150 px
+# thumbnails, without width/height (layout shifts) or lazy loading.
+# prepare_images() writes WebP + JPEG (PNG for images with transparency)
+# copies of every image of a media folder at a few widths into
+# <folder>/sized/, several images at once (Pillow releases the GIL while
+# resizing and encoding).  File names carry the hash of the original, so
+# an image is only processed again when it changes; its intrinsic size
+# is cached in .build/images/.  picture_tag() turns the result
+# into <picture>/<img> markup with srcset, sizes, width/height,
+# loading="lazy" and decoding="async".  Without Pillow the originals
+# are used as before.
+# ----------------------------------------------------
+
+import json
+import os
+import re
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from sitegen.manifest import BUILD_DIR, digest
+from sitegen.stages import count
+
+SIZED_DIR = "sized"
+CACHE_DIR = BUILD_DIR / "images"
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".webp", ".gif")
+WIDTHS = (160, 320, 640, 1280)
+
+# width, height: intrinsic size of the original (None if unknown)
+# variants     : {MIME type: [(width, path relative to the folder), ...]},
+#                preferred format first, empty when nothing was generated
+Picture = namedtuple("Picture", "name width height variants")
+
+# pictures : {original name: Picture}
+# processed: how many originals were resized this run
+Prepared = namedtuple("Prepared", "pictures processed")
+
+
+def prepare_images(manifest, directory, names, workers=None):
+    """Generates the sized copies of the images among `names`; returns Prepared."""
+    directory = Path(directory)
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return Prepared({n: Picture(n, None, None, {}) for n in names if _is_image(n)}, 0)
+
+    sizes_path = CACHE_DIR / f"{directory.name or 'root'}-{digest(str(directory.resolve()))[:12]}.json"
+    try:
+        sizes = json.loads(sizes_path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        sizes = {}
+
+    pictures, jobs, used = {}, [], {}
+    for name in names:
+        if not _is_image(name):
+            continue
+        key = manifest.file_hash(directory / name)[:10]
+        # srcset entries are separated by commas and spaces, keep them out of the names
+        stem = re.sub(r"[\s,]+", "_", Path(name).stem) + f".{key}"
+        size = sizes.get(key)
+        if size and all((directory / p).exists() for p in _paths(_variants(stem, *size))):
+            pictures[name] = _picture(name, stem, size)
+            used[key] = size
+        else:
+            jobs.append((name, key, stem))
+
+    if jobs:
+        (directory / SIZED_DIR).mkdir(exist_ok=True)
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+            results = list(pool.map(lambda job: _render(directory, job[0], job[2]), jobs))
+        for (name, key, stem), size in zip(jobs, results):
+            if size is None:
+                pictures[name] = Picture(name, None, None, {})
+            else:
+                used[key] = size
+                pictures[name] = _picture(name, stem, size)
+
+    # Forget derivatives of images that changed or were removed
+    keep = {Path(p).name for pic in pictures.values() for p in _paths(pic.variants)}
+    if (directory / SIZED_DIR).is_dir():
+        for path in (directory / SIZED_DIR).iterdir():
+            if path.name not in keep and ".tmp" not in path.suffixes:   # not another build's job in flight
+                path.unlink()
+
+    sizes_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = sizes_path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(used), encoding="utf-8")
+    os.replace(tmp, sizes_path)
+    if jobs:
+        count("resized", len(jobs))
+    return Prepared(pictures, len(jobs))
+
+
+def picture_tag(prepared, name, prefix, alt, sizes, attrs=""):
+    """<picture> markup for image `name`; `sizes` is the CSS display width."""
+    pic = prepared.pictures.get(name) or Picture(name, None, None, {})
+    dims = f' width="{pic.width}" height="{pic.height}"' if pic.width else ""
+    lazy = ' loading="lazy" decoding="async"'
+    if not pic.variants:
+        return f'<img src="{prefix}{name}" alt="{alt}"{dims}{lazy}{attrs}>'
+
+    (best_type, best), (_, fallback) = pic.variants.items()
+    return (
+        f'<picture><source type="{best_type}" srcset="{_srcset(best, prefix)}" sizes="{sizes}">'
+        f'<img src="{image_url(prepared, name, prefix)}" srcset="{_srcset(fallback, prefix)}" sizes="{sizes}" '
+        f'alt="{alt}"{dims}{lazy}{attrs}></picture>'
+    )
+
+
+def image_url(prepared, name, prefix, width=640):
+    """Single URL of a copy of `name` at most `width` wide (e.g. for a video poster)."""
+    pic = prepared.pictures.get(name)
+    if not pic or not pic.variants:
+        return f"{prefix}{name}"
+    fallback = list(pic.variants.values())[-1]
+    fitting = [path for w, path in fallback if w <= width] or [fallback[0][1]]
+    return prefix + fitting[-1]
+
+
+def read_gallery(path):
+    """Gallery manifest: one image per line, optionally `name | alt text`; # comments."""
+    entries = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        name, _, alt = line.partition("|")
+        entries.append((name.strip(), alt.strip() or Path(name.strip()).stem))
+    return entries
+
+
+def _is_image(name):
+    return Path(name).suffix.lower() in IMAGE_EXTS
+
+
+def _variants(stem, width, height, alpha):
+    """{MIME type: [(width, path), ...]} of the copies of an original of this size."""
+    widths = sorted({w for w in WIDTHS if w < width} | {min(width, WIDTHS[-1])})
+    fallback = ("image/png", ".png") if alpha else ("image/jpeg", ".jpg")
+    return {
+        mime: [(w, f"{SIZED_DIR}/{stem}.{w}{ext}") for w in widths]
+        for mime, ext in (("image/webp", ".webp"), fallback)
+    }
+
+
+def _paths(variants):
+    return [path for copies in variants.values() for _, path in copies]
+
+
+def _picture(name, stem, size):
+    return Picture(name, size[0], size[1], _variants(stem, *size))
+
+
+def _srcset(copies, prefix):
+    return ", ".join(f"{prefix}{path} {w}w" for w, path in copies)
+
+
+def _render(directory, name, stem):
+    """Writes all copies of one original; returns [width, height, alpha] or None."""
+    from PIL import Image, ImageOps
+
+    try:
+        with Image.open(directory / name) as im:
+            im = ImageOps.exif_transpose(im)
+            alpha = im.mode in ("RGBA", "LA") or (im.mode == "P" and "transparency" in im.info)
+            im = im.convert("RGBA" if alpha else "RGB")
+            width, height = im.size
+            resized = {}
+            for mime, copies in _variants(stem, width, height, alpha).items():
+                for w, path in copies:
+                    if w not in resized:
+                        resized[w] = im if w == width else im.resize((w, max(1, round(height * w / width))), Image.LANCZOS)
+                    out = directory / path
+                    tmp = out.with_name(f"{out.stem}.{os.getpid()}.tmp{out.suffix}")
+                    if mime == "image/webp":
+                        resized[w].save(tmp, "WEBP", quality=80, method=4)
+                    elif mime == "image/jpeg":
+                        resized[w].save(tmp, "JPEG", quality=82, optimize=True, progressive=True)
+                    else:
+                        resized[w].save(tmp, "PNG", optimize=True)
+                    os.replace(tmp, out)
+    except OSError:
+        return None
+    return [width, height, alpha]
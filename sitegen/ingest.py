@@ -0,0 +1,131 @@
+# ----------------------------------------------------
+# Append-only ingestion of cumulative WhatsApp exports
+# ----------------------------------------------------
+# Each new Poem*.txt export is the previous one plus new messages at
+# the end.  After a parse we remember the byte offset of the line the
+# last record starts on (that record may still grow), a checksum of
+# everything before it, its timestamp and whether that line is a
+# message header (it is what ends the previous record).  The next run
+# verifies all of that and parses only from the offset; if the prefix
+# was edited we fall back to a full parse.  The caller keeps the state
+# and the records (sitegen.corpus: the `sources` and `records` tables).
+# ----------------------------------------------------
+
+import hashlib
+import os
+from collections import namedtuple
+from pathlib import Path
+
+from sitegen import whatsapp
+from sitegen.manifest import digest
+
+# kept   : how many records of the previous parse are still valid; the
+#          new `records` follow them
+# records: the records parsed this run
+# mode   : "full" or "tail"
+# parsed_bytes: how much of the file was actually parsed this run
+# resume : state for the next run (offset, checksum, ..., and "count",
+#          the number of records before the offset), None to keep the old one
+Tail = namedtuple("Tail", "kept records mode parsed_bytes resume")
+
+
+class _Line(str):
+    """A text line that remembers the byte offset it starts at (None if unknown)."""
+
+
+def parse_tail(path, grammar, state):
+    """Parses `path` from the resume point of `state`, or fully if the prefix changed."""
+    with open(path, "rb") as f:
+        kept, offset = 0, 0
+        if state and state.get("parser") == _parser_key(grammar) and _prefix_unchanged(f, state):
+            kept, offset = state["count"], state["offset"]
+        mode = "tail" if offset else "full"
+
+        # Parse from `offset`; the last record that starts on a clean line
+        # boundary becomes the resume point of the next run
+        f.seek(offset)
+        records = []
+        resume_offset, resume_count, resume_line = offset, kept, ""
+        for line, record in whatsapp.scan(_text_lines(f, offset), grammar):
+            if line.offset is not None:
+                resume_offset, resume_count, resume_line = line.offset, kept + len(records), line
+            records.append(record)
+        parsed_bytes = os.fstat(f.fileno()).st_size - offset
+
+        # Checksum of the new prefix = old prefix + bytes up to the new resume point
+        h = hashlib.blake2b(digest_size=16)
+        f.seek(0)
+        _hash_range(f, h, resume_offset)
+
+    resume = None
+    if resume_count < kept + len(records):
+        resume = {
+            "parser": _parser_key(grammar),
+            "offset": resume_offset,
+            "prefix_hash": h.hexdigest(),
+            "last_timestamp": records[resume_count - kept][0],
+            "header": _header(resume_line),
+            "count": resume_count,
+        }
+    return Tail(kept, records, mode, parsed_bytes, resume)
+
+
+def _parser_key(grammar):
+    """Cached records are only valid for the same grammar and parser code."""
+    return digest(list(grammar[:5]), Path(whatsapp.__file__).read_bytes())
+
+
+def _prefix_unchanged(f, state):
+    """Checks the stored prefix checksum and the timestamp at the resume offset."""
+    offset = state["offset"]
+    f.seek(0, os.SEEK_END)
+    if f.tell() < offset:
+        return False
+    f.seek(0)
+    h = hashlib.blake2b(digest_size=16)
+    _hash_range(f, h, offset)
+    if h.hexdigest() != state["prefix_hash"]:
+        return False
+    first_line = f.readline().decode("utf-8", errors="replace")
+    return state["last_timestamp"] in first_line and _header(first_line) == state["header"]
+
+
+def _header(line):
+    """The "dd/mm/yyyy, hh:mm - " a line starts with, or "" for other lines."""
+    m = whatsapp.HEADER.match(line)
+    return m.group(0) if m else ""
+
+
+def _hash_range(f, h, end):
+    """Feeds bytes [f.tell(), end) into hash `h`."""
+    remaining = end - f.tell()
+    while remaining > 0:
+        chunk = f.read(min(remaining, 1 << 20))
+        if not chunk:
+            break
+        h.update(chunk)
+        remaining -= len(chunk)
+
+
+def _text_lines(f, offset):
+    """Yields decoded lines with universal newlines, tagged with their byte offset."""
+    for raw in f:
+        text = raw.decode("utf-8")
+        if text.endswith("\r\n"):
+            text = text[:-2] + "\n"
+        if "\r" not in text:
+            line = _Line(text)
+            line.offset = offset
+            yield line
+        else:
+            # Lone "\r" also ends a line in text mode
+            pieces = text.replace("\r", "\n").split("\n")
+            for i, piece in enumerate(pieces[:-1]):
+                line = _Line(piece + "\n")
+                line.offset = offset if i == 0 else None
+                yield line
+            if pieces[-1]:
+                line = _Line(pieces[-1])
+                line.offset = None
+                yield line
+        offset += len(raw)
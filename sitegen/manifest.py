@@ -0,0 +1,124 @@
+# ----------------------------------------------------
+# Persistent build manifest for incremental rebuilds
+# ----------------------------------------------------
+# Stores, per generator script, the content hashes of its inputs
+# (source text, referenced media, the script/template itself), the
+# input key of every output it wrote and the rendered HTML fragment
+# of every record.  A rebuild with unchanged inputs does no work;
+# otherwise only records whose hash changed are rendered again.
+# ----------------------------------------------------
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from sitegen.stages import count
+
+BUILD_DIR = Path(".build")
+
+
+def digest(*parts):
+    """Short, stable hash of strings / numbers / lists / bytes."""
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, bytes):
+            data = part
+        else:
+            data = json.dumps(part, ensure_ascii=False, sort_keys=True).encode("utf-8")
+        h.update(len(data).to_bytes(8, "little"))
+        h.update(data)
+    return h.hexdigest()
+
+
+class BuildManifest:
+    """JSON manifest kept in .build/<script>.json next to the outputs."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            data = {}
+        self.files = data.get("files", {})
+        self.outputs = data.get("outputs", {})
+        self._old_fragments = data.get("fragments", {})
+        self.fragments = {}
+        self.rendered = 0
+        self.reused = 0
+
+    @classmethod
+    def for_script(cls, script):
+        return cls(BUILD_DIR / f"{Path(script).stem}.json")
+
+    # ---------- Input hashing ----------
+    def file_hash(self, path):
+        """Content hash of a file, re-read only when its size or mtime change."""
+        path = Path(path)
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+        key = str(path)
+        cached = self.files.get(key)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+        h = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        self.files[key] = [st.st_size, st.st_mtime_ns, h.hexdigest()]
+        return h.hexdigest()
+
+    def code_hash(self, script):
+        """Hash of a generator script together with the sitegen modules it renders with."""
+        modules = sorted(Path(__file__).resolve().parent.glob("*.py"))
+        return digest(self.file_hash(script), [self.file_hash(m) for m in modules])
+
+    def dir_hash(self, path):
+        """Hash of a directory listing (names, sizes, mtimes) without reading files."""
+        entries = []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.is_file():
+                        st = entry.stat()
+                        entries.append([entry.name, st.st_size, st.st_mtime_ns])
+        except FileNotFoundError:
+            pass
+        return digest(sorted(entries))
+
+    # ---------- Outputs ----------
+    def is_fresh(self, output, key):
+        """True when `output` exists and was last built from the same input key."""
+        return Path(output).exists() and self.outputs.get(str(output)) == key
+
+    def mark_built(self, output, key):
+        self.outputs[str(output)] = key
+
+    # ---------- Per-record fragments ----------
+    def fragment(self, key):
+        """Cached render for a record hash, or None if it must be rendered."""
+        value = self.fragments.get(key)
+        if value is None:
+            value = self._old_fragments.get(key)
+            if value is not None:
+                self.fragments[key] = value
+                self.reused += 1
+                count("reused")
+        return value
+
+    def store(self, key, value):
+        self.fragments[key] = value
+        self.rendered += 1
+        count("rendered")
+        return value
+
+    def save(self):
+        """Writes the manifest; fragments not used by this build are dropped."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fragments = self.fragments if self.rendered or self.reused else self._old_fragments
+        data = {"files": self.files, "outputs": self.outputs, "fragments": fragments}
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.path)
@@ -0,0 +1,120 @@
+# ----------------------------------------------------
+# Directory-scan media index
+# ----------------------------------------------------
+# The generators used to probe every candidate file name of every poem
+# with Path.exists() (explicit name, poem{idx}{ext}, title + each audio
+# extension ...), i.e. tens of thousands of stat() calls for a large
+# export, which is painfully slow on network-mounted media folders.
+# A MediaIndex lists a directory once with os.scandir and answers all
+# lookups from memory; lookups ignore case, treat spaces and
+# underscores alike and can try alternative extensions.  The listing
+# is cached in .build/media/ and reused while the directory's mtime
+# (which changes whenever a file is added, removed or renamed) is the
+# same.
+# ----------------------------------------------------
+
+import json
+import os
+import time
+import unicodedata
+from pathlib import Path
+
+from sitegen.manifest import BUILD_DIR, digest
+from sitegen.stages import count
+
+CACHE_DIR = BUILD_DIR / "media"
+
+# A listing younger than this may miss a file created within the same
+# mtime tick, so it is not written to the disk cache
+RACY_SECONDS = 2
+
+_loaded = {}
+
+
+def normalize(name):
+    """Lookup key: NFC, trimmed, lower case, spaces as underscores."""
+    return unicodedata.normalize("NFC", name).strip().lower().replace(" ", "_")
+
+
+class MediaIndex:
+    """In-memory listing of the files of one media directory."""
+
+    def __init__(self, directory, names):
+        self.directory = Path(directory)
+        self.names = sorted(names)
+        self._exact = set(self.names)
+        self._by_key = {}
+        for name in self.names:
+            self._by_key.setdefault(normalize(name), name)
+
+    @classmethod
+    def load(cls, directory, cache_dir=CACHE_DIR):
+        """Index of `directory`, from the disk cache if its mtime is unchanged."""
+        directory = Path(directory)
+        cache_path = Path(cache_dir) / f"{directory.name or 'root'}-{digest(str(directory.resolve()))[:12]}.json"
+        try:
+            mtime = directory.stat().st_mtime_ns
+        except FileNotFoundError:
+            return cls(directory, [])
+
+        try:
+            cached = json.loads(cache_path.read_text(encoding="utf-8"))
+            if cached["mtime_ns"] == mtime:
+                return cls(directory, cached["names"])
+        except (FileNotFoundError, ValueError, KeyError):
+            pass
+
+        with os.scandir(directory) as it:
+            names = [entry.name for entry in it if entry.is_file()]
+        index = cls(directory, names)
+        if time.time_ns() - mtime > RACY_SECONDS * 10**9:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = cache_path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps({"mtime_ns": mtime, "names": index.names}, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, cache_path)
+        return index
+
+    def find(self, name, exts=()):
+        """On-disk name of the file `name` refers to, or None.
+
+        Tries the exact name, then the normalized name, then (if `exts` is
+        given) the same stem with each extension of `exts` in order.
+        """
+        if not name:
+            return None
+        count("media_probes")
+        if "/" in name or "\\" in name:
+            # Not a plain file name: fall back to a real lookup
+            return name if (self.directory / name).is_file() else None
+        if name in self._exact:
+            return name
+        found = self._by_key.get(normalize(name))
+        if found or not exts:
+            return found
+        stem, ext = os.path.splitext(name)
+        if ext.lower() not in exts:
+            stem = name
+        for ext in exts:
+            found = self._by_key.get(normalize(stem + ext))
+            if found:
+                return found
+        return None
+
+    def first(self, candidates, exts=()):
+        """First of `candidates` that exists, as its on-disk name."""
+        for cand in candidates:
+            found = self.find(cand, exts)
+            if found:
+                return found
+        return None
+
+    def __contains__(self, name):
+        return self.find(name) is not None
+
+
+def media_index(directory):
+    """Shared MediaIndex per directory for the current process."""
+    key = str(Path(directory).resolve())
+    if key not in _loaded:
+        _loaded[key] = MediaIndex.load(directory)
+    return _loaded[key]
@@ -0,0 +1,236 @@
+# ----------------------------------------------------
+# Service worker: the collections readable offline
+# ----------------------------------------------------
+# Phones on a poor connection fetched the whole page again on every
+# visit.  write_service_worker() records, per page, the files it needs
+# offline (the page itself, its hashed assets, the search index and poem
+# chunks) with their content hashes in <folder>/precache.json, shared by
+# all generators of the folder, and writes <folder>/sw.js, whose VERSION
+# line is the hash of that manifest: a rebuild that changed anything
+# changes sw.js, so browsers install it again.  The worker then fetches
+# only the entries whose hash changed and drops the ones that are gone.
+# Audio and images are cached as they are played / shown, in a cache
+# bounded to MEDIA_CACHE_MB that evicts the least recently used files,
+# and audio Range requests are answered from the cached copy.
+# ----------------------------------------------------
+
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from sitegen.assets import write_compressed
+from sitegen.manifest import digest
+
+PRECACHE_FILE = "precache.json"
+WORKER_FILE = "sw.js"
+MEDIA_CACHE_MB = 200
+
+# Registers the worker; inlined at the end of each page
+REGISTER_JS = 'if ("serviceWorker" in navigator) navigator.serviceWorker.register("sw.js");'
+
+
+def write_service_worker(directory, page, urls, manifest):
+    """Precaches `page` and `urls` (relative to `directory`); returns the folder's entry count."""
+    directory = Path(directory)
+    page = Path(page).name
+    entries = {}
+    for url in [page, *urls]:
+        file_hash = manifest.file_hash(directory / url)
+        if file_hash is None:
+            raise FileNotFoundError(f"precache entry {url} not found in {directory}/ (written next to another page?)")
+        entries[url] = file_hash[:16]
+    # Other generators of the folder (site builder) update the same manifest
+    with _locked(directory / PRECACHE_FILE):
+        try:
+            pages = json.loads((directory / PRECACHE_FILE).read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            pages = {}
+        pages[page] = entries
+        # Pages of the folder that no longer exist
+        pages = {name: entries for name, entries in sorted(pages.items()) if (directory / name).exists()}
+
+        data = json.dumps(pages, ensure_ascii=False, indent=1).encode("utf-8")
+        worker = f'const VERSION = "{digest(data)[:10]}";\nconst MEDIA_LIMIT = {MEDIA_CACHE_MB << 20};\n{WORKER_JS}'
+        for name, content in ((PRECACHE_FILE, data), (WORKER_FILE, worker.encode("utf-8"))):
+            path = directory / name
+            if not path.exists() or path.read_bytes() != content:
+                write_compressed(path, content)
+    return len({url for entries in pages.values() for url in entries})
+
+
+@contextmanager
+def _locked(path, timeout=60):
+    """Holds `path`.lock, created exclusively; a lock older than `timeout` seconds is taken over."""
+    lock = Path(f"{path}.lock")
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            if time.monotonic() > deadline:
+                lock.unlink(missing_ok=True)   # left behind by a killed build
+                deadline = time.monotonic() + timeout
+            time.sleep(0.05)
+    try:
+        yield
+    finally:
+        os.close(fd)
+        lock.unlink(missing_ok=True)
+
+
+# The worker (after the VERSION / MEDIA_LIMIT lines).  Precached files are
+# stored under their absolute URL; the revisions in effect are kept in the
+# precache itself under REVISIONS, the LRU bookkeeping of the media cache
+# ({url: [bytes, last used]}) in the media cache under LRU.
+WORKER_JS = """
+const PRECACHE = "sitegen-precache";
+const MEDIA = "sitegen-media";
+const MEDIA_RE = /\\.(mp3|m4a|aac|wav|ogg|opus|webm|mp4|jpe?g|png|gif|webp|avif)$/i;
+const REVISIONS = new URL("__revisions__", self.registration.scope).href;
+const LRU = new URL("__lru__", self.registration.scope).href;
+
+let revisions = null;  // Promise of {url: revision}, the precache in effect
+
+const absolute = url => new URL(url, self.registration.scope).href;
+const json = data => new Response(JSON.stringify(data), { headers: { "Content-Type": "application/json" } });
+
+async function readJson(cache, key) {
+  const r = await cache.match(key);
+  return r ? r.json() : null;
+}
+
+// ---------- Precache: fetch only what changed since the last version ----------
+self.addEventListener("install", event => {
+  event.waitUntil((async () => {
+    const r = await fetch("precache.json", { cache: "no-cache" });
+    if (!r.ok) throw new Error("precache.json: HTTP " + r.status);
+    const wanted = {};
+    for (const entries of Object.values(await r.json())) {
+      for (const [url, revision] of Object.entries(entries)) wanted[absolute(url)] = revision;
+    }
+    const cache = await caches.open(PRECACHE);
+    const old = (await readJson(cache, REVISIONS)) || {};
+    await Promise.all(Object.keys(wanted).filter(url => old[url] !== wanted[url]).map(async url => {
+      const r = await fetch(url, { cache: "no-cache" });
+      if (!r.ok) throw new Error(url + ": HTTP " + r.status);
+      await cache.put(url, r);
+    }));
+    await cache.put(REVISIONS, json(wanted));
+    await self.skipWaiting();
+  })());
+});
+
+self.addEventListener("activate", event => {
+  event.waitUntil((async () => {
+    const cache = await caches.open(PRECACHE);
+    const wanted = (await readJson(cache, REVISIONS)) || {};
+    for (const request of await cache.keys()) {
+      if (request.url !== REVISIONS && !(request.url in wanted)) await cache.delete(request);
+    }
+    revisions = null;
+    await self.clients.claim();
+  })());
+});
+
+function precached() {
+  if (!revisions) {
+    revisions = caches.open(PRECACHE).then(cache => readJson(cache, REVISIONS)).then(r => r || {});
+  }
+  return revisions;
+}
+
+self.addEventListener("fetch", event => {
+  const request = event.request;
+  const url = new URL(request.url);
+  if (request.method !== "GET" || url.origin !== location.origin) return;
+  let key = url.origin + url.pathname;
+  if (request.mode === "navigate" && key.endsWith("/")) key += "index.html";
+
+  event.respondWith((async () => {
+    if (key in await precached()) {
+      const hit = await caches.match(key, { cacheName: PRECACHE });
+      if (hit) return hit;
+    }
+    if (MEDIA_RE.test(url.pathname)) return media(event, request, key);
+    return fetch(request);
+  })());
+});
+
+// ---------- Media: cached when first used, least recently used evicted ----------
+let lru = null;        // Promise of {url: [bytes, last used]}
+const storing = new Set();
+
+function lruState(cache) {
+  if (!lru) lru = readJson(cache, LRU).then(state => state || {});
+  return lru;
+}
+
+async function media(event, request, key) {
+  const cache = await caches.open(MEDIA);
+  const hit = await cache.match(key);
+  if (hit) {
+    event.waitUntil(touch(cache, key, null));
+    const range = request.headers.get("Range");
+    return range ? partial(hit, range) : hit;
+  }
+  // Served from the network now; a full copy is kept for next time
+  if (!storing.has(key)) {
+    storing.add(key);
+    event.waitUntil(store(cache, key).catch(() => {}).finally(() => storing.delete(key)));
+  }
+  return fetch(request);
+}
+
+async function store(cache, key) {
+  const r = await fetch(key);
+  if (r.status !== 200) return;
+  const blob = await r.blob();
+  if (blob.size > MEDIA_LIMIT / 4) return;  // would push out too much else
+  await cache.put(key, new Response(blob, { headers: r.headers }));
+  await touch(cache, key, blob.size);
+}
+
+async function touch(cache, key, size) {
+  const state = await lruState(cache);
+  if (!state[key] && size === null) return;
+  const entry = state[key] || [size, 0];
+  if (size !== null) entry[0] = size;
+  entry[1] = Date.now();
+  state[key] = entry;
+
+  let total = Object.values(state).reduce((sum, e) => sum + e[0], 0);
+  const oldest = Object.keys(state).sort((a, b) => state[a][1] - state[b][1]);
+  for (const url of oldest) {
+    if (total <= MEDIA_LIMIT) break;
+    if (url === key) continue;
+    total -= state[url][0];
+    delete state[url];
+    await cache.delete(url);
+  }
+  await cache.put(LRU, json(state));
+}
+
+// A 206 answer to `Range: bytes=a-b` cut from a full cached response
+async function partial(response, range) {
+  const blob = await response.blob();
+  const m = /^bytes=(\\d*)-(\\d*)$/.exec(range.trim());
+  if (!m || (!m[1] && !m[2])) return new Response(blob, { headers: response.headers });
+  const start = m[1] ? +m[1] : Math.max(0, blob.size - +m[2]);
+  const end = m[1] && m[2] ? Math.min(+m[2] + 1, blob.size) : blob.size;
+  if (start >= end) {
+    return new Response(null, { status: 416, headers: { "Content-Range": `bytes */${blob.size}` } });
+  }
+  return new Response(blob.slice(start, end), {
+    status: 206,
+    headers: {
+      "Content-Type": response.headers.get("Content-Type") || "application/octet-stream",
+      "Content-Range": `bytes ${start}-${end - 1}/${blob.size}`,
+      "Content-Length": String(end - start),
+      "Accept-Ranges": "bytes",
+    },
+  });
+}
+"""
@@ -0,0 +1,159 @@
+# ----------------------------------------------------
+# Chunked, parallel WeasyPrint rendering of long PDF books
+# ----------------------------------------------------
+# One HTML(...).write_pdf() over the whole anthology lays out every
+# page on a single core and keeps the full box tree in memory.  Here
+# the body is split into sections, each laid out by its own Python
+# process (`python -m sitegen.pdfbook in.html out.pdf`, so nothing of
+# the calling generator is re-run, also on Windows) into a PDF cached
+# in .build/pdf/ under the hash of its HTML.  Every section reports its
+# page count and the page of each anchor in it; from those the table of
+# contents is written with literal page numbers (target-counter cannot
+# see across documents) and front matter + sections are concatenated.
+# Merging needs pypdf (sitegen/requirements.txt); without it callers
+# fall back to one pass.
+#
+# Layout: every section is a document of its own, so each one starts on
+# a new page, where the one-pass book runs the poems on without a break.
+# That is the price of laying the sections out separately (a page shared
+# by two sections cannot be split between two processes): at most one
+# part-empty page per section.  --pdf-section-size 0 keeps the flow.
+# ----------------------------------------------------
+
+import json
+import os
+import subprocess
+import sys
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from sitegen.manifest import BUILD_DIR, digest
+from sitegen.stages import count
+
+try:
+    from pypdf import PdfWriter
+except ImportError:
+    PdfWriter = None
+
+SECTION_DIR = BUILD_DIR / "pdf"
+FRONT_PASSES = 5   # front matter layouts tried until its page count is stable
+ROOT = Path(__file__).resolve().parent.parent
+
+# path  : the section's cached PDF
+# pages : its page count
+# anchors: {id: page index inside the section}
+Section = namedtuple("Section", "path pages anchors")
+
+# sections: number of body sections, rendered: how many were laid out
+# this run (the rest came from the cache), pages: total page count
+Book = namedtuple("Book", "sections rendered pages")
+
+
+def render_file(html_path, pdf_path):
+    """Lays out one HTML file to `pdf_path` and writes its page/anchor map next to it."""
+    from weasyprint import HTML
+
+    html_path, pdf_path = Path(html_path), Path(pdf_path)
+    document = HTML(string=html_path.read_text(encoding="utf-8")).render()
+    anchors = {}
+    for number, page in enumerate(document.pages):
+        for name in page.anchors:
+            anchors.setdefault(name, number)
+
+    tmp = pdf_path.with_suffix(".pdf.tmp")
+    document.write_pdf(str(tmp))
+    os.replace(tmp, pdf_path)
+    meta = {"pages": len(document.pages), "anchors": anchors}
+    pdf_path.with_suffix(".json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+
+
+def render_sections(htmls, workers=None, cache_dir=SECTION_DIR):
+    """Renders each HTML document to its own PDF, in parallel; returns (Sections, rendered count)."""
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    sections, todo = [], []
+    for html in htmls:
+        pdf_path = cache_dir / f"{digest(html)}.pdf"
+        section = _cached(pdf_path)
+        if section is None:
+            pdf_path.with_suffix(".html").write_text(html, encoding="utf-8")
+            todo.append(pdf_path)
+        sections.append(section)
+
+    if todo:
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(ROOT), env.get("PYTHONPATH")]))
+
+        def run(pdf_path):
+            cmd = [sys.executable, "-m", "sitegen.pdfbook", str(pdf_path.with_suffix(".html")), str(pdf_path)]
+            subprocess.run(cmd, env=env, check=True)
+            pdf_path.with_suffix(".html").unlink()
+
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+            list(pool.map(run, todo))
+        sections = [s or _cached(cache_dir / f"{digest(html)}.pdf") for s, html in zip(sections, htmls)]
+    return sections, len(todo)
+
+
+def write_book(front, bodies, out_path, workers=None, cache_dir=SECTION_DIR):
+    """Renders `bodies` as sections and prepends the front matter; returns a Book.
+
+    `front(page_of)` must return the front matter HTML for a mapping of
+    anchor id -> final page number.  Its own page count shifts every
+    number, so it is re-rendered until that count is stable.  If it is
+    not stable after FRONT_PASSES layouts, nothing is written and None is
+    returned (the caller lays the book out in one pass instead).
+    """
+    if PdfWriter is None:
+        raise RuntimeError("pypdf is required to merge PDF sections (pip install pypdf)")
+    sections, rendered = render_sections(bodies, workers, cache_dir)
+
+    front_pages = 1
+    for _ in range(FRONT_PASSES):
+        page_of, start = {}, front_pages + 1
+        for section in sections:
+            for name, number in section.anchors.items():
+                page_of.setdefault(name, start + number)
+            start += section.pages
+        (front_section,), _ = render_sections([front(page_of)], 1, cache_dir)
+        if front_section.pages == front_pages:
+            break
+        front_pages = front_section.pages
+    else:
+        return None   # the index would point at the wrong pages
+
+    writer = PdfWriter()
+    for section in [front_section] + sections:
+        writer.append(str(section.path))
+    out_path = Path(out_path)
+    tmp = out_path.with_suffix(".pdf.tmp")
+    with open(tmp, "wb") as f:
+        writer.write(f)
+    count("bytes_written", tmp.stat().st_size)
+    os.replace(tmp, out_path)
+
+    _prune(cache_dir, {s.path.stem for s in [front_section] + sections})
+    return Book(len(sections), rendered, start - 1)
+
+
+def _cached(pdf_path):
+    """The Section stored at `pdf_path`, or None if it was never rendered."""
+    try:
+        meta = json.loads(pdf_path.with_suffix(".json").read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return None
+    if not pdf_path.exists():
+        return None
+    return Section(pdf_path, meta["pages"], meta["anchors"])
+
+
+def _prune(cache_dir, keep):
+    """Deletes section PDFs no longer part of the book."""
+    for path in Path(cache_dir).iterdir():
+        if path.suffix in (".pdf", ".json") and path.stem not in keep:
+            path.unlink()
+
+
+if __name__ == "__main__":
+    render_file(sys.argv[1], sys.argv[2])
@@ -0,0 +1,178 @@
+# ----------------------------------------------------
+# "Related poems": top-k TF-IDF neighbours of every record
+# ----------------------------------------------------
+# related() links each record to the K records whose words it shares
+# most.  Every text becomes a TF-IDF vector over the search tokens
+# (sitegen.search.tokenize; sublinear term frequency, smoothed IDF, unit
+# length), so the cosine similarity of two records is the dot product of
+# their vectors.  With scipy installed the vectors form a sparse matrix
+# and the similarities of BLOCK records at a time to all others come
+# from one sparse matrix product; without it the same products are
+# summed over the posting lists of each record's terms.  Either way only
+# pairs sharing a term are touched: words in one record only (they cannot
+# link two) and in more than MAX_DF of them (function words that link
+# everything) are left out of the products, not of the vector lengths.
+#
+# The lists are cached in .build/<page>.related.json per record key with
+# their scores; a subset query (sitegen.corpus.query) ranks within its own
+# records and gets a cache file of its own (cache_file), so it never
+# replaces the full collection's rows.  A rebuild computes the rows of new records and of records
+# whose neighbours are gone, and adds new records to the cached lists
+# they now belong in.  Scores drift as records come in (IDF); once the
+# record count moved by DRIFT since the last full pass, all rows are
+# computed again.
+# ----------------------------------------------------
+
+import heapq
+import json
+import math
+import os
+from pathlib import Path
+
+from sitegen.manifest import BUILD_DIR, digest
+from sitegen.search import tokenize
+from sitegen.stages import count
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    sparse = None
+
+K = 5
+BLOCK = 256       # rows per sparse matrix product (its result is nearly dense: BLOCK x records)
+MAX_DF = 0.1      # share of the records a term may appear in and still link them
+DRIFT = 0.1       # record count change that recomputes every row
+DIGITS = 6        # scores are rounded, so both backends rank alike
+
+
+def related(docs, cache_path, k=K):
+    """[[position of a neighbour, ...]] for `docs` ([(key, text)], keys unique), best first."""
+    keys = [key for key, _ in docs]
+    position = {key: i for i, key in enumerate(keys)}
+    cache = _load(cache_path, k)
+    rows = cache["rows"]
+    full = not rows or abs(len(docs) - cache["full"]) > DRIFT * max(cache["full"], 1)
+    if full:
+        rows, cache["full"] = {}, len(docs)
+
+    # Rows to compute: new records, and records that lost a neighbour
+    stale = [i for i, key in enumerate(keys) if key not in rows or any(n not in position for n, _ in rows[key])]
+    new = {i for i in stale if keys[i] not in rows}
+    if stale:
+        vectors = _vectors([text for _, text in docs])
+        fresh = set(stale)
+        for i, top, pairs in _products(vectors, stale, k):
+            rows[keys[i]] = _best((keys[j], s) for j, s in top if j != i)[:k]
+            if i in new and not full:
+                # The new record may now belong in the lists of the others
+                for j, s in pairs:
+                    if j != i and j not in fresh:
+                        rows[keys[j]] = _best([*rows[keys[j]], (keys[i], s)])[:k]
+        count("related_rows", len(stale))
+
+    cache["rows"] = {key: rows[key] for key in keys}
+    _save(cache_path, cache)
+    return [[position[n] for n, _ in rows[key]] for key in keys]
+
+
+def cache_file(page, subset=None):
+    """.build/<page>.related.json, or .build/<page>.<query hash>.related.json for a subset query."""
+    scope = {name: value for name, value in (subset or {}).items() if value}
+    suffix = f".{digest(scope)[:12]}" if scope else ""
+    return BUILD_DIR / f"{Path(page).stem}{suffix}.related.json"
+
+
+def _best(pairs):
+    """(key, score) pairs, highest score first (key order among equals)."""
+    return sorted(([key, round(score, DIGITS)] for key, score in pairs), key=lambda p: (-p[1], p[0]))
+
+
+# ---------- TF-IDF vectors ----------
+def _vectors(texts):
+    """[{term: weight}] of unit length, restricted to the terms that can link two records."""
+    counts = []
+    df = {}
+    for text in texts:
+        tf = {}
+        for term in tokenize(text):
+            tf[term] = tf.get(term, 0) + 1
+        counts.append(tf)
+        for term in tf:
+            df[term] = df.get(term, 0) + 1
+
+    n = len(texts)
+    idf = {term: math.log((1 + n) / (1 + d)) + 1 for term, d in df.items()}
+    limit = max(MAX_DF * n, 2)   # small collections: words of two records still link them
+    vectors = []
+    for tf in counts:
+        weights = {term: (1 + math.log(c)) * idf[term] for term, c in tf.items()}
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        vectors.append({term: w / norm for term, w in weights.items() if 1 < df[term] <= limit})
+    return vectors
+
+
+def _products(vectors, rows, k):
+    """(row, top, pairs) for each of `rows`: its similarity to every vector sharing a term with it.
+
+    pairs: (other, cosine similarity), lazily; top: those of them scoring
+    at least the (k+1)-th best score (the row itself included, ties kept).
+    """
+    if sparse is not None:
+        yield from _products_sparse(vectors, rows, k)
+        return
+    postings = {}
+    for j, vector in enumerate(vectors):
+        for term, w in vector.items():
+            postings.setdefault(term, []).append((j, w))
+    for i in rows:
+        scores = {}
+        for term, w in vectors[i].items():
+            for j, wj in postings[term]:
+                scores[j] = scores.get(j, 0.0) + w * wj
+        scores = {j: round(s, DIGITS) for j, s in scores.items()}
+        floor = heapq.nlargest(k + 1, scores.values())[-1] if len(scores) > k + 1 else 0.0
+        yield i, [(j, s) for j, s in scores.items() if s >= floor], iter(scores.items())
+
+
+def _products_sparse(vectors, rows, k):
+    columns = {}
+    indptr, indices, data = [0], [], []
+    for vector in vectors:
+        for term, w in vector.items():
+            indices.append(columns.setdefault(term, len(columns)))
+            data.append(w)
+        indptr.append(len(indices))
+    matrix = sparse.csr_matrix((data, indices, indptr), shape=(len(vectors), max(len(columns), 1)))
+    transposed = matrix.T.tocsr()
+    for start in range(0, len(rows), BLOCK):
+        block = rows[start:start + BLOCK]
+        product = (matrix[np.array(block)] @ transposed).tocsr()
+        for n, i in enumerate(block):
+            lo, hi = product.indptr[n], product.indptr[n + 1]
+            others, scores = product.indices[lo:hi], np.round(product.data[lo:hi], DIGITS)
+            keep = scores >= np.partition(scores, -(k + 1))[-(k + 1)] if len(scores) > k + 1 else slice(None)
+            yield i, list(zip(others[keep].tolist(), scores[keep].tolist())), _pairs(others, scores)
+
+
+def _pairs(others, scores):
+    yield from zip(others.tolist(), scores.tolist())   # converted only for the rows that need them
+
+
+# ---------- Cache ----------
+def _load(path, k):
+    try:
+        cache = json.loads(Path(path).read_text(encoding="utf-8"))
+        if cache["k"] == k and cache["max_df"] == MAX_DF:
+            return cache
+    except (FileNotFoundError, ValueError, KeyError):
+        pass
+    return {"k": k, "max_df": MAX_DF, "full": 0, "rows": {}}
+
+
+def _save(path, cache):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(cache, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
@@ -0,0 +1,66 @@
+# ----------------------------------------------------
+# Precompiled templates streamed to the output file
+# ----------------------------------------------------
+# The generators used to grow the page with `html += ...` and
+# `main_content += f"""..."""` per poem, copying the ever longer string
+# each time (quadratic in the corpus size) and holding the page twice
+# before write_text().  A Template is parsed once into literal/field
+# pairs (str.format syntax, so `{{`/`}}` are literal braces).  Field
+# values may be strings or iterables of strings (e.g. the list of index
+# entries); write_page() streams them through a buffered writer straight
+# into the output file, so the page is never assembled in memory.
+# ----------------------------------------------------
+
+import os
+from pathlib import Path
+from string import Formatter
+
+from sitegen.stages import count
+
+BUFFER_SIZE = 1 << 16
+
+
+class Template:
+    """A str.format-style template, parsed once into literal/field pairs."""
+
+    def __init__(self, source):
+        self.parts = []
+        for literal, field, spec, conversion in Formatter().parse(source):
+            if spec or conversion:
+                raise ValueError(f"template field {{{field}}} must be a plain name")
+            self.parts.append((literal, field))
+        self.fields = {field for _, field in self.parts if field is not None}
+
+    def render(self, **values):
+        """The filled-in template as one string."""
+        return "".join(self.chunks(values))
+
+    def stream(self, write, **values):
+        """Feeds the filled-in template to `write` chunk by chunk."""
+        for chunk in self.chunks(values):
+            write(chunk)
+
+    def chunks(self, values):
+        for literal, field in self.parts:
+            if literal:
+                yield literal
+            if field is None:
+                continue
+            value = values[field]
+            if isinstance(value, str):
+                yield value
+            elif isinstance(value, (int, float)):
+                yield str(value)
+            else:
+                yield from value
+
+
+def write_page(path, template, **values):
+    """Streams `template` into `path` (replaced atomically once complete)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8", buffering=BUFFER_SIZE) as f:
+        template.stream(f.write, **values)
+    count("bytes_written", tmp.stat().st_size)
+    os.replace(tmp, path)
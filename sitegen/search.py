@@ -0,0 +1,159 @@
+# ----------------------------------------------------
+# Prebuilt full-text search index for the sidebar search box
+# ----------------------------------------------------
+# filterPoems() used to walk every sidebar link on each keystroke and only
+# matched titles.  write_search_index() builds an inverted index over the
+# titles, poets and bodies at build time: text is NFC-normalised (so the
+# two spellings of য় / ড় / ঢ় agree), lower-cased, stripped of ZWJ/ZWNJ and
+# split into runs of Bengali / Latin letters and digits, which keeps vowel
+# signs, virama and nukta inside their word.  The sorted term list and the
+# delta-encoded posting lists are stored as small JSON (+ gzip/brotli) in
+# <folder>/search/.  SEARCH_JS loads it on first use and answers queries
+# with a binary search per query word (every word is a prefix, all words
+# must match), debounced, touching only the links of the old and new hits.
+# ----------------------------------------------------
+
+import json
+import re
+import unicodedata
+from pathlib import Path
+
+from sitegen.assets import variants, write_compressed
+from sitegen.chunks import FETCH_JSON_JS
+from sitegen.manifest import digest
+
+SEARCH_DIR = "search"
+
+# Keep in sync with TOKEN / tokens() in SEARCH_JS
+TOKEN_RE = re.compile(r"[0-9a-z\u00c0-\u024f\u0980-\u09ff]+")
+JOINERS_RE = re.compile(r"[\u200c\u200d]")
+TAG_RE = re.compile(r"<[^>]+>")
+
+
+def tokenize(text):
+    """Search terms of `text` (HTML tags are ignored)."""
+    text = unicodedata.normalize("NFC", TAG_RE.sub(" ", text)).lower()
+    return TOKEN_RE.findall(JOINERS_RE.sub("", text))
+
+
+def build_index(docs):
+    """Index of `docs` ([(element id, text), ...]) as a JSON-ready dict."""
+    postings = {}
+    for n, (_, text) in enumerate(docs):
+        for term in set(tokenize(text)):
+            postings.setdefault(term, []).append(n)
+
+    terms = sorted(postings)
+    return {
+        "docs": [doc_id for doc_id, _ in docs],
+        "terms": terms,
+        # document numbers, each stored as the gap to the previous one
+        "postings": [[n - prev for prev, n in zip([0] + docs_of[:-1], docs_of)]
+                     for docs_of in (postings[t] for t in terms)],
+    }
+
+
+def write_search_index(directory, page, docs):
+    """Writes the index of `docs` for `page`; returns its URL relative to the page."""
+    out_dir = Path(directory) / SEARCH_DIR
+    out_dir.mkdir(parents=True, exist_ok=True)
+    data = json.dumps(build_index(docs), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    stem = Path(page).stem
+    name = f"{stem}.{digest(data)[:10]}.json"
+    if not (out_dir / name).exists():
+        write_compressed(out_dir / name, data)
+
+    # Indexes of older builds of the same page
+    for path in out_dir.glob(f"{stem}.*"):
+        if path.name not in variants(name):
+            path.unlink()
+    return f"{SEARCH_DIR}/{name}"
+
+
+# Replaces the old filterPoems(); expects <input id="searchBox"
+# data-index="search/....json" onkeyup="filterPoems()"> and sidebar links
+# <a href="#id"> inside .index.  Falls back to matching the link text when
+# the index cannot be loaded.
+SEARCH_JS = """
+(function () {
+  const box = document.getElementById("searchBox");
+  const list = document.querySelector(".index");
+  const TOKEN = /[0-9a-z\\u00c0-\\u024f\\u0980-\\u09ff]+/g;
+  let index = null, links = null, hits = [], timer = 0;
+
+  const style = document.createElement("style");
+  style.textContent = ".index.searching a:not(.hit) { display: none; }";
+  document.head.appendChild(style);
+""" + FETCH_JSON_JS + """
+  function tokens(text) {
+    return text.normalize("NFC").toLowerCase().replace(/[\\u200c\\u200d]/g, "").match(TOKEN) || [];
+  }
+
+  function load() {
+    if (!index) {
+      index = fetchJson(box.dataset.index).then(data => {
+        links = {};
+        list.querySelectorAll('a[href^="#"]').forEach(a => { links[a.getAttribute("href").slice(1)] = a; });
+        return data;
+      }).catch(err => { index = null; throw err; });
+    }
+    return index;
+  }
+
+  // Documents containing a term that starts with `prefix`
+  function lookup(data, prefix) {
+    const terms = data.terms;
+    let lo = 0, hi = terms.length;
+    while (lo < hi) {
+      const mid = (lo + hi) >> 1;
+      if (terms[mid] < prefix) lo = mid + 1; else hi = mid;
+    }
+    const found = new Set();
+    for (let t = lo; t < terms.length && terms[t].startsWith(prefix); t++) {
+      let n = 0;
+      for (const gap of data.postings[t]) { n += gap; found.add(n); }
+    }
+    return found;
+  }
+
+  function mark(matches) {
+    hits.forEach(a => a.classList.remove("hit"));
+    hits = matches;
+    hits.forEach(a => a.classList.add("hit"));
+    list.classList.add("searching");
+  }
+
+  function search(data, query) {
+    const words = tokens(query);
+    if (!words.length) {
+      list.classList.remove("searching");
+      return;
+    }
+    let found = null;
+    for (const word of words) {
+      const docs = lookup(data, word);
+      found = found ? new Set([...found].filter(n => docs.has(n))) : docs;
+      if (!found.size) break;
+    }
+    mark([...found].map(n => links[data.docs[n]]).filter(Boolean));
+  }
+
+  // Old behaviour: link text only
+  function scan(query) {
+    const q = query.toLowerCase();
+    mark(q ? [...list.querySelectorAll("a")].filter(a => a.textContent.toLowerCase().includes(q)) : []);
+    if (!q) list.classList.remove("searching");
+  }
+
+  function run() {
+    const query = box.value;
+    load().then(data => search(data, query), () => scan(query));
+  }
+
+  window.filterPoems = function () {
+    clearTimeout(timer);
+    timer = setTimeout(run, 150);
+  };
+  box.addEventListener("focus", () => { load().catch(() => {}); }, { once: true });
+})();
+"""
@@ -0,0 +1,261 @@
+# ----------------------------------------------------
+# Local preview server for the generated pages
+# ----------------------------------------------------
+# Pages opened as file:// URLs cannot fetch their JSON chunks or search
+# index, and browsers seek poorly in audio that is not served with HTTP
+# Range support.  serve() starts a small threaded HTTP server on the site
+# folder that answers Range requests (206, for audio and video seeking),
+# revalidates with ETag / Last-Modified (304), sends the precompressed
+# .br / .gz copy of a file when the browser accepts it (compressing other
+# text on the fly) and injects a live-reload script into every page: an
+# EventSource on RELOAD_PATH that reloads the page whenever Reloader.
+# notify() is called after a rebuild.  The pages' service worker would
+# answer from its cache instead of the fresh build, so the preview
+# serves no sw.js and unregisters old workers, unless asked to keep it.
+# ----------------------------------------------------
+
+import gzip
+import re
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from functools import partial
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from sitegen.assets import brotli
+from sitegen.offline import WORKER_FILE
+
+RELOAD_PATH = "/__sitegen/reload"
+PING_SECONDS = 15
+COMPRESSIBLE = re.compile(r"^(text/|application/(json|javascript|xml)|image/svg)")
+
+RELOAD_JS = """<script>
+(function () {
+  if (%s && "serviceWorker" in navigator) {
+    navigator.serviceWorker.getRegistrations().then(list => list.forEach(r => r.unregister()));
+  }
+  new EventSource("%s").onmessage = () => location.reload();
+})();
+</script>
+"""
+
+
+class Reloader:
+    """Tells the open pages to reload after a rebuild."""
+
+    def __init__(self):
+        self.version = 0
+        self.changed = threading.Condition()
+
+    def notify(self):
+        with self.changed:
+            self.version += 1
+            self.changed.notify_all()
+
+    def wait(self, version, timeout):
+        """The version after `version`, or `version` again after `timeout` seconds."""
+        with self.changed:
+            self.changed.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+
+class PreviewHandler(SimpleHTTPRequestHandler):
+    extensions_map = {
+        **SimpleHTTPRequestHandler.extensions_map,
+        ".js": "text/javascript", ".json": "application/json", ".mp3": "audio/mpeg", ".m4a": "audio/mp4",
+        ".opus": "audio/ogg", ".webp": "image/webp", ".mp4": "video/mp4", ".pdf": "application/pdf",
+    }
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def log_message(self, format, *args):
+        pass   # the builder prints what matters
+
+    def _serve(self, send_body):
+        url = urlsplit(self.path)
+        if url.path == RELOAD_PATH:
+            return self._events()
+        path = Path(self.translate_path(self.path))
+        if path.is_dir():
+            if not url.path.endswith("/"):
+                self.send_response(HTTPStatus.MOVED_PERMANENTLY)
+                self.send_header("Location", url.path + "/" + (f"?{url.query}" if url.query else ""))
+                self.send_header("Content-Length", "0")
+                return self.end_headers()
+            if not (path / "index.html").is_file():
+                return super().do_GET() if send_body else super().do_HEAD()   # folder listing
+            path = path / "index.html"
+        if not path.is_file() or (path.name == WORKER_FILE and not self.server.service_worker):
+            return self.send_error(HTTPStatus.NOT_FOUND)
+
+        st = path.stat()
+        ctype = self.guess_type(str(path))
+        if ctype.startswith("text/") or ctype in ("application/json", "text/javascript"):
+            ctype += "; charset=utf-8"
+        accept = self.headers.get("Accept-Encoding", "")
+
+        # Representation: page with the reload script, precompressed copy or the file itself
+        data, source, encoding = None, path, None
+        live = ctype.startswith("text/html")
+        if live:
+            encoding = _pick(accept, ("br", "gzip") if brotli is not None else ("gzip",))
+            data = _encode(self._inject(path.read_bytes()), encoding)
+        elif not self.headers.get("Range"):
+            for coding, suffix in (("br", ".br"), ("gzip", ".gz")):
+                copy = path.with_name(path.name + suffix)
+                if _pick(accept, (coding,)) and _fresh(copy, st):
+                    source, encoding = copy, coding
+                    break
+            else:
+                if COMPRESSIBLE.match(ctype) and st.st_size < 1 << 24 and _pick(accept, ("gzip",)):
+                    data, encoding = _encode(path.read_bytes(), "gzip"), "gzip"
+        tag = ("-live" if live else "") + {"br": "-br", "gzip": "-gz"}.get(encoding, "")
+        etag = f'"{st.st_size:x}-{st.st_mtime_ns:x}{tag}"'
+
+        if self._not_modified(etag, st.st_mtime):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self._validators(etag, st)
+            return self.end_headers()
+
+        size = len(data) if data is not None else source.stat().st_size
+        start, end = 0, size
+        status = HTTPStatus.OK
+        if data is None and encoding is None:
+            byte_range = self._range(etag, st, size)
+            if byte_range == "invalid":
+                self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                return self.end_headers()
+            if byte_range:
+                start, end = byte_range
+                status = HTTPStatus.PARTIAL_CONTENT
+
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(end - start))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Vary", "Accept-Encoding")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        if status == HTTPStatus.PARTIAL_CONTENT:
+            self.send_header("Content-Range", f"bytes {start}-{end - 1}/{size}")
+        self._validators(etag, st)
+        self.end_headers()
+        if not send_body:
+            return
+        if data is not None:
+            self.wfile.write(data)
+            return
+        with open(source, "rb") as f:
+            f.seek(start)
+            _copy(f, self.wfile, end - start)
+
+    def _validators(self, etag, st):
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", formatdate(st.st_mtime, usegmt=True))
+        self.send_header("Cache-Control", "no-cache")   # always revalidate: the next build may change it
+
+    def _not_modified(self, etag, mtime):
+        match = self.headers.get("If-None-Match")
+        if match is not None:
+            return match.strip() == "*" or etag in [t.strip() for t in match.split(",")]
+        since = self.headers.get("If-Modified-Since")
+        if since:
+            try:
+                return int(mtime) <= parsedate_to_datetime(since).timestamp()
+            except (TypeError, ValueError):
+                pass
+        return False
+
+    def _range(self, etag, st, size):
+        """(start, end) of a satisfiable single Range, None for the whole file, "invalid" otherwise."""
+        header = self.headers.get("Range")
+        if not header:
+            return None
+        if_range = self.headers.get("If-Range")
+        if if_range and if_range.strip() != etag and if_range.strip() != formatdate(st.st_mtime, usegmt=True):
+            return None   # changed since: the whole new file
+        m = re.fullmatch(r"\s*bytes=(\d*)-(\d*)\s*", header)
+        if not m or not (m.group(1) or m.group(2)):
+            return None   # several ranges or another unit: the whole file
+        if m.group(1):
+            start = int(m.group(1))
+            end = min(int(m.group(2)) + 1, size) if m.group(2) else size
+        else:
+            start, end = max(0, size - int(m.group(2))), size
+        return (start, end) if start < end else "invalid"
+
+    def _inject(self, page):
+        script = (RELOAD_JS % ("false" if self.server.service_worker else "true", RELOAD_PATH)).encode("utf-8")
+        at = page.rfind(b"</body>")
+        return page[:at] + script + page[at:] if at >= 0 else page + script
+
+    def _events(self):
+        """Server-sent events: one message per rebuild, comments as keep-alive."""
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        reloader = self.server.reloader
+        version = reloader.version
+        try:
+            while True:
+                new = reloader.wait(version, PING_SECONDS)
+                self.wfile.write(b"data: reload\n\n" if new != version else b": ping\n\n")
+                self.wfile.flush()
+                version = new
+        except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError):
+            pass
+
+
+def serve(root, port=8000, host="127.0.0.1", service_worker=False):
+    """Starts the preview server on `root` in a background thread; returns (server, Reloader)."""
+    server = ThreadingHTTPServer((host, port), partial(PreviewHandler, directory=str(root)))
+    server.daemon_threads = True
+    server.reloader = Reloader()
+    server.service_worker = service_worker
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.reloader
+
+
+def _pick(accept, codings):
+    """First of `codings` the Accept-Encoding header allows (q > 0)."""
+    allowed = {}
+    for part in accept.split(","):
+        name, _, params = part.strip().partition(";")
+        q = re.search(r"q\s*=\s*([0-9.]+)", params)
+        allowed[name.strip().lower()] = float(q.group(1)) if q else 1.0
+    for coding in codings:
+        if allowed.get(coding, allowed.get("*", 0)) > 0:
+            return coding
+    return None
+
+
+def _encode(data, coding):
+    if coding == "br":
+        return brotli.compress(data, quality=4)
+    return gzip.compress(data, 6) if coding == "gzip" else data
+
+
+def _fresh(copy, st):
+    """True if the compressed `copy` exists and was written with (or after) the file."""
+    try:
+        return copy.stat().st_mtime_ns >= st.st_mtime_ns - 10**9
+    except FileNotFoundError:
+        return False
+
+
+def _copy(src, dst, length):
+    while length > 0:
+        chunk = src.read(min(length, 1 << 16))
+        if not chunk:
+            break
+        dst.write(chunk)
+        length -= len(chunk)
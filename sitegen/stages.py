@@ -0,0 +1,299 @@
+# ----------------------------------------------------
+# Per-stage time, memory and counts of a generator run
+# ----------------------------------------------------
+# The generators are top-level scripts; they call stage("parse"),
+# stage("render"), ... where a new stage begins (the running one ends
+# there, the last one at exit).  A stage entered again adds to its total.
+# Each stage records its wall and CPU time (this process and, separately,
+# the child processes it waited for: WeasyPrint workers, ffmpeg), its
+# peak memory and the counters that sitegen and the generators add with
+# count(): records parsed, media probes, audio files transcoded, images
+# resized, bytes written, PDF pages, fragments rendered / reused.  The
+# generators print only what these counters do not say.
+#
+# report() prints the counters at the end of a build.  With --profile
+# (add_profile_args / start_profile) it also prints the per-stage table
+# and writes everything as JSON to .build/<page>.metrics.json;
+# --profile-python adds a cProfile of the run (hottest functions in the
+# summary, full stats next to the JSON for snakeviz / pstats) and
+# --profile-memory traces Python allocations (tracemalloc): the Python
+# heap peak of each stage and the largest allocation sites.  When the
+# SITEGEN_STAGES environment variable names a file, the stages are
+# written there as JSON at exit (benchmarks/bench_generators.py).
+#
+# Peak RSS: on Linux the high-water mark is reset at the start of each
+# stage (/proc/self/clear_refs), so it is the peak of that stage alone;
+# elsewhere it is the process peak up to the end of the stage (`scope`
+# says which).  Child processes are reported as their largest peak so far.
+# ----------------------------------------------------
+
+import atexit
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+ENV_VAR = "SITEGEN_STAGES"
+TOP_FUNCTIONS = 15
+TOP_ALLOCATIONS = 10
+
+# How report() names the counters (others are shown by their key)
+LABELS = {
+    "records": "records parsed",
+    "bytes_parsed": "parsed",
+    "media_probes": "media probes",
+    "bytes_written": "written",
+    "pdf_pages": "PDF pages",
+    "rendered": "rendered",
+    "reused": "reused from the last build",
+    "with_audio": "with audio",
+    "duplicates": "reposts dropped",
+    "related_rows": "related lists computed",
+    "transcoded": "audio files transcoded",
+    "resized": "images resized",
+}
+
+_stages = {}      # name -> {"seconds", "cpu_seconds", "children_cpu_seconds", "peak_rss_mib", ..., "counts"}
+_current = None   # (name, wall, cpu, children cpu at its start)
+_profile = None   # {"path", "cprofile", "tracemalloc"} while profiling
+
+
+def stage(name):
+    """Ends the running stage (if any) and starts `name`."""
+    global _current
+    now = _clock()
+    if _current:
+        _finish(now)
+    scope = "stage" if _reset_peak() else "process"
+    if _tracing():
+        import tracemalloc
+        tracemalloc.reset_peak()
+    _stages.setdefault(name, {"seconds": 0.0, "cpu_seconds": 0.0, "children_cpu_seconds": 0.0,
+                              "peak_rss_mib": None, "children_peak_rss_mib": None, "scope": scope, "counts": {}})
+    _current = (name, *now)
+
+
+def count(name, n=1):
+    """Adds `n` to the counter `name` of the running stage."""
+    if _current:
+        counts = _stages[_current[0]]["counts"]
+        counts[name] = counts.get(name, 0) + n
+
+
+def results():
+    """Ends the running stage; returns {stage: metrics} in the order the stages started."""
+    global _current
+    if _current:
+        _finish(_clock())
+        _current = None
+    return {name: {**m, "counts": dict(m["counts"])} for name, m in _stages.items()}
+
+
+def totals():
+    """Counters summed over the stages."""
+    counts = {}
+    for m in _stages.values():
+        for name, n in m["counts"].items():
+            counts[name] = counts.get(name, 0) + n
+    return counts
+
+
+# ---------- Profiling ----------
+def add_profile_args(parser):
+    """Adds --profile, --profile-python and --profile-memory to a generator's options."""
+    group = parser.add_argument_group("profiling")
+    group.add_argument("--profile", nargs="?", const="", metavar="FILE",
+                       help="per-stage time, memory and counts: a summary, and JSON in FILE "
+                            "(default: .build/<page>.metrics.json)")
+    group.add_argument("--profile-python", action="store_true",
+                       help="also profile the Python functions (cProfile); implies --profile")
+    group.add_argument("--profile-memory", action="store_true",
+                       help="also trace Python allocations (tracemalloc, slower); implies --profile")
+
+
+def start_profile(args, page):
+    """Starts profiling as the options of add_profile_args() ask; `page` names the metrics file."""
+    global _profile
+    if args.profile is None and not (args.profile_python or args.profile_memory):
+        return
+    from sitegen.manifest import BUILD_DIR   # sitegen.manifest counts through this module
+
+    path = Path(args.profile) if args.profile else BUILD_DIR / f"{Path(page).stem}.metrics.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    _profile = {"path": path, "page": Path(page).name, "cprofile": None, "tracemalloc": args.profile_memory}
+    if args.profile_memory:
+        import tracemalloc
+        tracemalloc.start()
+    if args.profile_python:
+        import cProfile
+        _profile["cprofile"] = cProfile.Profile()
+        _profile["cprofile"].enable()
+
+
+def report():
+    """Prints the counters (and, when profiling, the stage table); writes the metrics file."""
+    global _profile
+    if _profile and _profile["cprofile"]:
+        _profile["cprofile"].disable()   # not the report itself
+    stages = results()
+    counts = totals()
+    if counts:
+        print("📊 " + ", ".join(_describe(name, n) for name, n in counts.items()))
+    if not _profile:
+        return
+    metrics = _metrics(stages, counts)
+    width = max(len(name) for name in ["stage", *stages])
+    print(f"\n⏱️ Profile of {_profile['page']}")
+    print(f"  {'stage':<{width}}  {'wall s':>8}  {'cpu s':>8}  {'child s':>8}  {'peak MiB':>8}  counts")
+    for name, m in stages.items():
+        print(f"  {name:<{width}}  {m['seconds']:8.3f}  {m['cpu_seconds']:8.3f}  {m['children_cpu_seconds']:8.3f}"
+              f"  {m['peak_rss_mib'] or 0:8.1f}  {', '.join(f'{k} {v}' for k, v in m['counts'].items())}")
+    print(f"  {'total':<{width}}  {metrics['seconds']:8.3f}  {metrics['cpu_seconds']:8.3f}"
+          f"  {metrics['children_cpu_seconds']:8.3f}  {metrics['peak_rss_mib'] or 0:8.1f}")
+    for f in metrics.get("functions", [])[:5]:
+        print(f"  🐍 {f['cumulative_seconds']:8.3f} s  {f['calls']:>8} calls  {f['function']}")
+    for a in metrics.get("allocations", [])[:5]:
+        print(f"  🧠 {a['mib']:8.2f} MiB  {a['blocks']:>8} blocks  {a['where']}")
+    _write_metrics(metrics)
+    print(f"  📝 metrics: {_profile['path']}" + (f", {_profile['path'].with_suffix('.prof')}" if _profile["cprofile"] else ""))
+    _profile = None   # written; nothing left for exit
+
+
+def _metrics(stages, counts):
+    """The metrics file: run totals, stages, counters and the profilers' findings."""
+    metrics = {
+        "page": _profile["page"],
+        "argv": sys.argv[1:],
+        "seconds": round(sum(m["seconds"] for m in stages.values()), 6),
+        "cpu_seconds": round(sum(m["cpu_seconds"] for m in stages.values()), 6),
+        "children_cpu_seconds": round(sum(m["children_cpu_seconds"] for m in stages.values()), 6),
+        "peak_rss_mib": max((m["peak_rss_mib"] for m in stages.values() if m["peak_rss_mib"]), default=None),
+        "counts": counts,
+        "stages": stages,
+    }
+    profiler = _profile["cprofile"]
+    if profiler:
+        import pstats
+        profiler.disable()   # (again) when the build exits early
+        profiler.dump_stats(_profile["path"].with_suffix(".prof"))
+        stats = pstats.Stats(profiler).stats
+        top = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_FUNCTIONS]
+        metrics["functions"] = [
+            {"function": f"{Path(file).name}:{line}({func})", "calls": calls, "own_seconds": round(own, 6),
+             "cumulative_seconds": round(cumulative, 6)}
+            for (file, line, func), (_, calls, own, cumulative, _) in top
+        ]
+    if _tracing():
+        import tracemalloc
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "*/cProfile.py"),
+        ])
+        top = snapshot.statistics("lineno")[:TOP_ALLOCATIONS]
+        metrics["allocations"] = [
+            {"where": f"{Path(s.traceback[0].filename).name}:{s.traceback[0].lineno}",
+             "mib": round(s.size / 2**20, 3), "blocks": s.count}
+            for s in top
+        ]
+        tracemalloc.stop()
+    return metrics
+
+
+def _write_metrics(metrics):
+    _profile["path"].write_text(json.dumps(metrics, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def _describe(name, n):
+    if name.startswith("bytes"):
+        return f"{_size(n)} {LABELS.get(name, name)}"
+    return f"{n} {LABELS.get(name, name)}"
+
+
+def _size(n):
+    for unit in ("bytes", "KiB", "MiB"):
+        if n < 1024 or unit == "MiB":
+            return f"{n} {unit}" if unit == "bytes" else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+# ---------- Measuring ----------
+def _clock():
+    """(wall, CPU, children's CPU) seconds."""
+    t = os.times()
+    return time.perf_counter(), t.user + t.system, t.children_user + t.children_system
+
+
+def _finish(now):
+    name, wall, cpu, children = _current
+    m = _stages[name]
+    m["seconds"] = round(m["seconds"] + now[0] - wall, 6)
+    m["cpu_seconds"] = round(m["cpu_seconds"] + now[1] - cpu, 6)
+    m["children_cpu_seconds"] = round(m["children_cpu_seconds"] + now[2] - children, 6)
+    m["peak_rss_mib"] = _max(m["peak_rss_mib"], _peak_rss())
+    m["children_peak_rss_mib"] = _max(m["children_peak_rss_mib"], _children_peak_rss())
+    if _tracing():
+        import tracemalloc
+        m["python_peak_mib"] = _max(m.get("python_peak_mib"), round(tracemalloc.get_traced_memory()[1] / 2**20, 1))
+
+
+def _tracing():
+    return bool(_profile and _profile["tracemalloc"])
+
+
+def _max(a, b):
+    return b if a is None else a if b is None else max(a, b)
+
+
+def _reset_peak():
+    """Resets the kernel's peak RSS of this process (Linux); False if not possible."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss():
+    """Peak resident set size in MiB (None if unknown)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return round(psutil.Process().memory_info().peak_wset / 2**20, 1)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (2**20 if sys.platform == "darwin" else 1024), 1)
+
+
+def _children_peak_rss():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(peak / (2**20 if sys.platform == "darwin" else 1024), 1) if peak else None
+
+
+@atexit.register
+def _dump():
+    # A build that stopped early (nothing to rebuild, an error) still leaves its metrics
+    if _profile:
+        stages = results()
+        _write_metrics(_metrics(stages, totals()))
+    path = os.environ.get(ENV_VAR)
+    if not path or not _stages:
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results(), f, indent=2)
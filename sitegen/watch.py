@@ -0,0 +1,112 @@
+# ----------------------------------------------------
+# File watcher for the site builder's watch mode
+# ----------------------------------------------------
+# Watcher.wait() blocks until files in the watched folders change and
+# returns their paths.  With the optional `watchdog` package the OS
+# reports the changes (inotify on Linux, ReadDirectoryChangesW on
+# Windows, FSEvents on macOS); without it the folders are listed every
+# POLL_SECONDS and compared by size and mtime.  Changes arriving within
+# SETTLE_SECONDS of each other (an editor saving in several steps, a
+# batch of copied recordings) are returned together.  Folders are
+# watched without their subfolders, so generated copies (audio/web/,
+# image/sized/) and .build/ never wake the builder.
+# ----------------------------------------------------
+
+import os
+import queue
+import time
+from pathlib import Path
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+POLL_SECONDS = 0.25
+SETTLE_SECONDS = 0.15
+EVENTS = {"created", "modified", "moved", "deleted"}   # not "opened"/"closed": the builds read the inputs
+
+
+class Watcher:
+    """Changes to the files directly inside `directories`."""
+
+    def __init__(self, directories):
+        self.directories = sorted({Path(d).resolve() for d in directories if Path(d).is_dir()})
+        self.changes = queue.Queue()
+        self.observer = None
+        if Observer is not None:
+            self.observer = Observer()
+            handler = _Handler(self.changes)
+            for directory in self.directories:
+                self.observer.schedule(handler, str(directory), recursive=False)
+            self.observer.start()
+        else:
+            self.snapshot = self._scan()
+
+    @property
+    def mode(self):
+        return "watchdog" if self.observer else f"polling every {POLL_SECONDS} s"
+
+    def wait(self):
+        """Blocks until something changed; returns the set of changed paths."""
+        changed = {self._next()}
+        while True:
+            try:
+                changed.add(self._next(SETTLE_SECONDS))
+            except queue.Empty:
+                return changed
+
+    def stop(self):
+        if self.observer:
+            self.observer.stop()
+            self.observer.join()
+
+    def _next(self, timeout=None):
+        """The next changed path (queue.Empty after `timeout` seconds)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self.observer:
+                return self.changes.get(timeout=timeout)
+            try:
+                return self.changes.get_nowait()
+            except queue.Empty:
+                pass
+            if deadline is not None and time.monotonic() >= deadline:
+                raise queue.Empty
+            time.sleep(POLL_SECONDS if timeout is None else min(POLL_SECONDS, timeout))
+            self._poll()
+
+    def _poll(self):
+        snapshot = self._scan()
+        for path in snapshot.keys() | self.snapshot.keys():
+            if snapshot.get(path) != self.snapshot.get(path):
+                self.changes.put(path)
+        self.snapshot = snapshot
+
+    def _scan(self):
+        """{path: (size, mtime)} of the files in the watched folders."""
+        files = {}
+        for directory in self.directories:
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        if entry.is_file():
+                            st = entry.stat()
+                            files[Path(entry.path)] = (st.st_size, st.st_mtime_ns)
+            except FileNotFoundError:
+                pass
+        return files
+
+
+if Observer is not None:
+    class _Handler(FileSystemEventHandler):
+        def __init__(self, changes):
+            self.changes = changes
+
+        def on_any_event(self, event):
+            if event.is_directory or event.event_type not in EVENTS:
+                return
+            for path in (event.src_path, getattr(event, "dest_path", "")):
+                if path:
+                    self.changes.put(Path(os.fsdecode(path)).resolve())
@@ -0,0 +1,211 @@
+# ----------------------------------------------------
+# Streaming parser for WhatsApp chat exports (Poem*.txt)
+# ----------------------------------------------------
+# The generators used to load the whole export and run one DOTALL
+# regex with a lazy body + lookahead per message.  This module walks
+# the file line by line instead and yields exactly the tuples that
+# `pattern.findall(raw_text)` returns, one record at a time.
+# ----------------------------------------------------
+
+import re
+from collections import namedtuple
+
+TIMESTAMP = r"\d{2}/\d{2}/\d{4}, \d{2}:\d{2}"
+
+# A line that starts a new message ("dd/mm/yyyy, hh:mm - ")
+HEADER = re.compile(TIMESTAMP + " - ")
+
+QUOTES = "\"'"
+
+# name          : short id, used for cache file names
+# sender        : None = any sender (`.*?:`), or a fixed sender string
+# capture_sender: emit the sender as its own field (adhir, golpo exports)
+# loose         : `:\s*` ... `\s*\n` around the title instead of `: ?` ... `\n`
+# media         : ((tags, capture_tag), ...) optional `tag:value` lines
+# pattern       : the original regex, kept as the reference behaviour
+Grammar = namedtuple("Grammar", "name sender capture_sender loose media pattern")
+
+
+# 76_Batch_DVAS/generate_poem_html_adhir.py
+ADHIR = Grammar(
+    name="adhir",
+    sender=None,
+    capture_sender=True,
+    loose=False,
+    media=((("audio",), False), (("image",), False)),
+    pattern=re.compile(
+        r"(\d{2}/\d{2}/\d{4}, \d{2}:\d{2}) - (.*?): ?[\"']?(.*?)[\"']?\n"
+        r"(?:(?:audio):(.*?)\n)?"
+        r"(?:(?:image):(.*?)\n)?"
+        r"\n?(.*?)(?=\n\d{2}/\d{2}/\d{4}, \d{2}:\d{2} - |\Z)",
+        re.DOTALL
+    ),
+)
+
+# 76_Batch_DVAS/generate_poem_html_adhir_audio_pdf.py
+ADHIR_PDF = Grammar(
+    name="adhir_pdf",
+    sender="+91 79809 33948",
+    capture_sender=False,
+    loose=True,
+    media=((("audio",), False),),
+    pattern=re.compile(
+        r"(\d{2}/\d{2}/\d{4}, \d{2}:\d{2}) - \+91 79809 33948:\s*[\"']?(.*?)[\"']?\s*\n"
+        r"(?:audio:(.*?)\n)?"
+        r"\n?(.*?)(?=\n\d{2}/\d{2}/\d{4}, \d{2}:\d{2} - |\Z)",
+        re.DOTALL
+    ),
+)
+
+# family/generate_golpo_html_gen.py
+GOLPO = Grammar(
+    name="golpo",
+    sender=None,
+    capture_sender=True,
+    loose=False,
+    media=((("audio", "video", "image", "pdf"), True), (("dance", "painter"), True)),
+    pattern=re.compile(
+        r"(\d{2}/\d{2}/\d{4}, \d{2}:\d{2}) - (.*?): ?[\"']?(.*?)[\"']?\n"
+        r"(?:(audio|video|image|pdf):(.*?)\n)?"
+        r"(?:(dance|painter):(.*?)\n)?"
+        r"\n?(.*?)(?=\n\d{2}/\d{2}/\d{4}, \d{2}:\d{2} - |\Z)",
+        re.DOTALL
+    ),
+)
+
+
+def read_records(path, grammar=ADHIR):
+    """Yields the records of a chat export file, reading it once."""
+    with open(path, "r", encoding="utf-8") as f:
+        yield from iter_records(f, grammar)
+
+
+def iter_records(lines, grammar=ADHIR):
+    """Yields findall-compatible tuples from an iterable of text lines."""
+    for _, record in scan(lines, grammar):
+        yield record
+
+
+def scan(lines, grammar=ADHIR):
+    """Like iter_records, but yields (line the record starts on, record)."""
+    sender = re.escape(grammar.sender) + ":" if grammar.sender else ""
+    start = re.compile(f"({TIMESTAMP}) - {sender}")
+
+    it = iter(lines)
+    line = next(it, None)
+    while line is not None:
+        m = start.search(line)
+        if m is None:
+            line = next(it, None)
+            continue
+        start_line = line
+        record, line = _parse_record(it, line, m, grammar)
+        if record is None:
+            return
+        yield start_line, record
+
+
+def _parse_record(it, line, m, g):
+    """Parses one message starting at match `m`; returns (record, next line)."""
+    fields = [m.group(1)]
+
+    # ---------- Sender (up to the first colon, may span lines) ----------
+    if g.sender:
+        colon = m.end() - 1
+    else:
+        pos = m.end()
+        sender = []
+        colon = line.find(":", pos)
+        while colon < 0:
+            sender.append(line[pos:])
+            line = next(it, None)
+            if line is None:
+                return None, None
+            pos = 0
+            colon = line.find(":")
+        sender.append(line[pos:colon])
+        if g.capture_sender:
+            fields.append("".join(sender))
+
+    # ---------- Title ----------
+    crossed = False
+    if g.loose:
+        # `\s*` after the colon runs over blank lines
+        pos = colon + 1
+        while True:
+            rest = line[pos:]
+            if rest and not rest.isspace():
+                break
+            if not line.endswith("\n"):
+                break
+            crossed = True
+            line, pos = next(it, None), 0
+            if line is None:
+                break
+        if line is None or not line.endswith("\n"):
+            # No newline after the title: the regex backtracks to the last
+            # newline it skipped, giving an empty title and the rest as body
+            if not crossed:
+                return None, None
+            fields.append("")
+            fields.extend("" for _ in _media_fields(g))
+            fields.append(line or "")
+            return tuple(fields), None
+        x = pos + len(rest) - len(rest.lstrip())
+        if line[x] in QUOTES:
+            x += 1
+        title = line[x:-1].rstrip()
+        line = next(it, None)
+        while line is not None and line.endswith("\n") and line.isspace():
+            line = next(it, None)
+    else:
+        if not line.endswith("\n"):
+            return None, None
+        s = colon + 1
+        if line[s] == " ":
+            s += 1
+        if line[s] in QUOTES:
+            s += 1
+        title = line[s:-1]
+        line = next(it, None)
+    if title and title[-1] in QUOTES:
+        title = title[:-1]
+    fields.append(title)
+
+    # ---------- Optional `tag:value` lines ----------
+    for tags, capture in g.media:
+        tag = value = ""
+        if line is not None and line.endswith("\n"):
+            for t in tags:
+                if line.startswith(t + ":"):
+                    tag, value = t, line[len(t) + 1:-1]
+                    line = next(it, None)
+                    break
+        if capture:
+            fields.append(tag)
+        fields.append(value)
+
+    if line == "\n":
+        line = next(it, None)
+
+    # ---------- Body (until the next "dd/mm/yyyy, hh:mm - " line) ----------
+    body = []
+    if line is not None:
+        body.append(line)
+        line = next(it, None)
+        while line is not None and not HEADER.match(line):
+            body.append(line)
+            line = next(it, None)
+    text = "".join(body)
+    if line is not None:
+        text = text[:-1]
+    fields.append(text)
+    return tuple(fields), line
+
+
+def _media_fields(g):
+    """Field slots produced by the optional media lines."""
+    for _, capture in g.media:
+        if capture:
+            yield "tag"
+        yield "value"
@@ -13,6 +13,12 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from dashdata.filters import FilterIndex
+from dashdata.table import paged_table
 
 # ------------------------------------------
 # PAGE CONFIGURATION
@@ -199,8 +205,15 @@ data_path = os.path.join(BASE_DIR, "data", "marks.csv")
 def load_data(path):
     return pd.read_csv(path)
 
+# Row ids per Discipline / Gender value, built once per data set
+# (`key` names it: the file path or the upload)
+@st.cache_resource(max_entries=4)
+def load_filters(key, _data):
+    return FilterIndex(_data, ["Discipline", "Gender"])
+
 try:
     data = load_data(data_path)
+    data_key = data_path
 except Exception as e:
     st.error(f"❌ Error loading data: {e}")
     st.stop()
@@ -213,11 +226,13 @@ if uploaded_file:
         data = pd.read_csv(uploaded_file)
     else:
         data = pd.read_excel(uploaded_file)
+    data_key = uploaded_file.file_id
     st.success(f"✅ Loaded file: {uploaded_file.name}")
 
 # ------------------------------------------
 # FILTERS
 # ------------------------------------------
+filters = load_filters(data_key, data)
 with st.sidebar.expander("🔍 Filters", expanded=True):
     if "Discipline" in data.columns:
         disciplines = sorted(data["Discipline"].dropna().unique())
@@ -225,15 +240,18 @@ with st.sidebar.expander("🔍 Filters", expanded=True):
     else:
         selected_discipline = "All"
 
-    filtered_data = data.copy()
-    if selected_discipline != "All":
-        filtered_data = filtered_data[filtered_data["Discipline"] == selected_discipline]
+    # Rows from the filter index: no copy, no scan per filter
+    selections = {"Discipline": selected_discipline}
+    selection = filters.select(selections)
 
-    if "Gender" in filtered_data.columns:
-        genders = sorted(filtered_data["Gender"].dropna().unique())
+    if "Gender" in data.columns:
+        genders = filters.present("Gender", selection)
         selected_gender = st.multiselect("Select Gender(s)", genders, default=genders)
         if selected_gender:
-            filtered_data = filtered_data[filtered_data["Gender"].isin(selected_gender)]
+            selections["Gender"] = selected_gender
+            selection = filters.select(selections)
+
+    filtered_data = selection.take(data)
 
 # ------------------------------------------
 # SUMMARY METRICS
@@ -250,7 +268,7 @@ col3.metric("Average Overall Marks", f"{avg_score:.2f}")
 # DATA PREVIEW
 # ------------------------------------------
 st.subheader("📄 Data Preview")
-st.dataframe(filtered_data, use_container_width=True, height=400)
+paged_table(data, selection, key="marks", file_name="students_filtered.csv", height=400)
 
 # ------------------------------------------
 # AVERAGE MARKS BY SUBJECT
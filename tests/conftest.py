@@ -0,0 +1,8 @@
+# python -m pytest tests
+# The tests import sitegen/ and dashdata/ from the repository root, like the generators and dashboards do
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
@@ -0,0 +1,85 @@
+# Corpus: WhatsApp exports in SQLite, filtered like the generators' --author/--since/... options
+
+import argparse
+
+import pytest
+
+from sitegen.corpus import Corpus, add_query_args, query
+from sitegen.whatsapp import ADHIR, GOLPO
+
+ADHIR_EXPORT = """\
+18/02/2026, 00:00 - +91 79809 33948: উড়ছে পাখি
+audio:pakhi.mp3
+
+উড়ছে পাখি মনের সুখে,
+নীল আকাশের বুকে।
+19/02/2026, 08:30 - Sunil C: "নদী"
+
+নদী চলে আপন মনে।
+20/02/2026, 21:15 - +91 79809 33948: বসন্ত
+image:basanta.jpg
+
+বসন্ত এসেছে দ্বারে।
+"""
+
+APPENDED = """\
+21/02/2026, 07:00 - Sunil C: ভোর
+
+ভোরের আলো।
+"""
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    corpus = Corpus(tmp_path / "corpus.sqlite")
+    yield corpus
+    corpus.close()
+
+
+def options(*argv):
+    parser = argparse.ArgumentParser()
+    add_query_args(parser)
+    return query(parser.parse_args(argv))
+
+
+def test_adhir_records_keep_their_sender(tmp_path, corpus):
+    export = tmp_path / "Poem.txt"
+    export.write_text(ADHIR_EXPORT, encoding="utf-8")
+    source = corpus.sync(export, ADHIR).source
+
+    assert corpus.records(source) == [
+        (1, ("18/02/2026, 00:00", "+91 79809 33948", "উড়ছে পাখি", "pakhi.mp3", "", "উড়ছে পাখি মনের সুখে,\nনীল আকাশের বুকে।")),
+        (2, ("19/02/2026, 08:30", "Sunil C", "নদী", "", "", "নদী চলে আপন মনে।")),
+        (3, ("20/02/2026, 21:15", "+91 79809 33948", "বসন্ত", "", "basanta.jpg", "বসন্ত এসেছে দ্বারে।\n")),
+    ]
+
+
+def test_author_option_filters_adhir_export(tmp_path, corpus):
+    export = tmp_path / "Poem.txt"
+    export.write_text(ADHIR_EXPORT, encoding="utf-8")
+    source = corpus.sync(export, ADHIR).source
+
+    assert [n for n, _ in corpus.records(source, **options("--author", "+91 79809 33948"))] == [1, 3]
+    assert [n for n, _ in corpus.records(source, **options("--author", "Sunil C"))] == [2]
+    assert corpus.records(source, **options("--author", "nobody")) == []
+    assert [n for n, _ in corpus.records(source, **options("--author", "Sunil C", "--since", "20/02/2026"))] == []
+    assert [n for n, _ in corpus.records(source, **options("--match", "Sunil"))] == [2]   # FTS over author too
+
+
+def test_appended_tail_keeps_sender(tmp_path, corpus):
+    export = tmp_path / "Poem.txt"
+    export.write_text(ADHIR_EXPORT, encoding="utf-8")
+    corpus.sync(export, ADHIR)
+    with open(export, "a", encoding="utf-8") as f:
+        f.write(APPENDED)
+    synced = corpus.sync(export, ADHIR)
+
+    assert synced.mode == "tail" and synced.count == 4
+    assert [n for n, _ in corpus.records(synced.source, **options("--author", "Sunil C"))] == [2, 4]
+
+
+def test_golpo_author_is_the_captured_sender(tmp_path, corpus):
+    export = tmp_path / "Poem3.txt"
+    export.write_text("01/01/2024, 10:00 - অমিতাভ : গল্প\n\nএকটি গল্প।\n", encoding="utf-8")
+    source = corpus.sync(export, GOLPO).source
+    assert [n for n, _ in corpus.records(source, **options("--author", "অমিতাভ "))] == [1]
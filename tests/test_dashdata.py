@@ -0,0 +1,177 @@
+# Dashboard engines against the pandas they replaced: masks, groupby sums, unique values
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+from dashdata.cube import GapCube
+from dashdata.filters import ALL, DENSE, FilterIndex, Selection
+from dashdata.hierarchy import Hierarchy
+
+FILTERS = ["Program Tag", "Department", "Faculty", "Program Name"]
+TAG_SHARES = [0.7, 0.2, 0.08, 0.02]   # dense and sparse tags (DENSE = 1/32)
+
+
+def intake(rng, programmes, years=4, missing=0.0, categorical=True):
+    """Melted intake rows typed like load_intake(): each programme in one tag, department and faculty."""
+    year_names = [f"Gap {y}-{y + 1 - 2000}" for y in range(2020, 2020 + years)]
+    tag = rng.choice(len(TAG_SHARES), programmes, p=TAG_SHARES)
+    department = rng.integers(0, 12, programmes)
+    frame = pd.DataFrame({
+        "Program Tag": np.tile([f"T{t}" for t in tag], years),
+        "Program Name": np.tile([f"P{p}" for p in range(programmes)], years),
+        "Department": np.tile([f"D{d}" for d in department], years),
+        "Faculty": np.tile([f"F{d % 4}" for d in department], years),
+        "Year": np.repeat(year_names, programmes),
+        "Gap": rng.integers(-20, 60, programmes * years).astype(np.int8),
+    })
+    if missing:
+        frame["Department"] = frame["Department"].mask(rng.random(len(frame)) < missing)
+    if categorical:
+        for column in FILTERS:
+            frame[column] = frame[column].astype("category")
+    frame["Year"] = pd.Categorical(frame["Year"], categories=year_names, ordered=True)
+    return frame
+
+
+def values(frame, column):
+    return sorted(str(v) for v in frame[column].dropna().unique())
+
+
+def random_selections(rng, frame, columns, lists=True):
+    """{column: 'All', None, a value, a list of values (maybe empty or unknown)}, biased towards rows that exist."""
+    row = frame.iloc[int(rng.integers(len(frame)))]
+    selections = {}
+    for column in columns:
+        r = rng.random()
+        if r < 0.35:
+            selections[column] = ALL
+        elif r < 0.45:
+            selections[column] = None if lists else ALL
+        elif r < 0.75 or not lists:
+            selections[column] = str(row[column]) if pd.notna(row[column]) else ALL
+        elif r < 0.8:
+            selections[column] = []
+        else:
+            options = values(frame, column) + ["not in the data"]
+            selections[column] = list(rng.choice(options, int(rng.integers(1, len(options) + 1)), replace=False))
+    return selections
+
+
+def mask(frame, selections):
+    """The == / isin masks the dashboards applied."""
+    keep = np.ones(len(frame), dtype=bool)
+    for column, wanted in selections.items():
+        if wanted is None or (isinstance(wanted, str) and wanted == ALL):
+            continue
+        keep &= frame[column].isin(wanted if isinstance(wanted, list) else [wanted]).to_numpy()
+    return keep
+
+
+# ---------- FilterIndex ----------
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("categorical", [True, False])
+def test_select_and_present(seed, categorical):
+    rng = np.random.default_rng(seed)
+    frame = intake(rng, int(rng.integers(40, 250)), missing=0.05, categorical=categorical)
+    index = FilterIndex(frame, [*FILTERS, "Year"])
+    kinds = set()
+    for _ in range(60):
+        selections = random_selections(rng, frame, [*FILTERS, "Year"])
+        selection = index.select(selections)
+        expected = np.flatnonzero(mask(frame, selections))
+        kinds.add("bits" if selection.bits is not None else "rows")
+
+        assert len(selection) == len(expected)
+        assert selection.take(frame).equals(frame.iloc[expected])
+        assert np.array_equal(selection.rows(), expected)
+        for column in FILTERS:
+            assert index.present(column, selection) == values(frame.iloc[expected], column)
+    assert kinds == {"bits", "rows"}   # both the sparse (row ids) and the dense (bitmap) path
+    assert index.select({column: ALL for column in FILTERS}).everything
+    assert index.present("Department") == values(frame, "Department")
+
+
+def test_select_at_the_dense_boundary():
+    n = 1024
+    limit = int(DENSE * n)
+    for size in (limit - 1, limit, limit + 1):
+        column = np.where(np.arange(n) % (n // size) == 0, "few", "many")[:n]
+        column[np.flatnonzero(column == "few")[size:]] = "many"
+        frame = pd.DataFrame({"c": pd.Categorical(column), "d": np.arange(n) % 3})
+        index = FilterIndex(frame, ["c", "d"])
+        for selections in ({"c": "few"}, {"c": "few", "d": 1}, {"c": "many", "d": [0, 2]}):
+            selection = index.select(selections)
+            assert (selection.bits is None) == (len(np.flatnonzero(mask(frame, {"c": selections["c"]}))) <= DENSE * n)
+            assert np.array_equal(selection.rows(), np.flatnonzero(mask(frame, selections)))
+
+
+# ---------- Selection ----------
+def windows(rng, total):
+    """(start, stop) pairs: whole, empty, past the end, on and around byte edges, random."""
+    edges = [0, 1, 7, 8, 9, 15, 16, 17, total - 1, total, total + 5]
+    pairs = [(0, total), (0, 0), (total, total + 10), (3, 2)]
+    pairs += [(a, b) for a in edges for b in edges if 0 <= a]
+    pairs += [tuple(sorted(rng.integers(0, total + 2, 2))) for _ in range(10)]
+    return [(int(a), int(b)) for a, b in pairs if a >= 0 and b >= 0]
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("share", [0.001, DENSE / 2, DENSE, 2 * DENSE, 0.5, 1.0])
+def test_page_and_take(seed, share):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(1, 3000))
+    hit = rng.random(n) < share
+    rows = np.flatnonzero(hit)
+    frame = pd.DataFrame({"i": np.arange(n), "label": [f"r{i}" for i in range(n)]})
+
+    for start, stop in windows(rng, len(rows)):
+        # Fresh selections: rows() would cache the ids and page() then slices them
+        for selection in (Selection(n, rows=rows), Selection(n, bits=np.packbits(hit))):
+            assert np.array_equal(selection.page(start, stop), rows[start:stop])
+            assert selection.take(frame, start, stop).equals(frame.iloc[rows[start:stop]])
+    for start, stop in windows(rng, n):
+        everything = Selection(n)
+        assert np.array_equal(everything.page(start, stop), np.arange(n)[start:stop])
+        assert everything.take(frame, start, stop).equals(frame.iloc[start:stop])
+
+    dense = Selection(n, bits=np.packbits(hit))
+    assert len(dense) == len(rows)
+    assert np.array_equal(dense.rows(), rows)
+
+
+# ---------- GapCube ----------
+@pytest.mark.parametrize("seed", range(4))
+def test_cube_sums(seed):
+    rng = np.random.default_rng(seed)
+    frame = intake(rng, int(rng.integers(5, 150)), years=int(rng.integers(1, 5)))
+    cube = GapCube(frame)
+    years = list(frame["Year"].cat.categories)
+    for _ in range(80):
+        selections = random_selections(rng, frame, FILTERS, lists=False)
+        if rng.random() < 0.1:
+            selections["Department"] = "not in the data"
+        chosen = None if rng.random() < 0.4 else [str(y) for y in rng.choice(years, int(rng.integers(0, len(years) + 1)), replace=False)]
+        rows = frame[mask(frame, {**selections, "Year": chosen if chosen is not None else ALL})]
+        expected = rows.groupby(["Program Tag", "Year"], observed=True)["Gap"].sum().reset_index()
+
+        result = cube.chart_data(selections, chosen)
+        if expected.empty:
+            assert result.empty
+        else:
+            # pandas keeps int8 when every group is one row: compare the sums, not their width
+            pd.testing.assert_frame_equal(result.astype({"Gap": "int64"}), expected.astype({"Gap": "int64"}))
+
+
+# ---------- Hierarchy ----------
+@pytest.mark.parametrize("seed", range(4))
+def test_hierarchy_cascades(seed):
+    rng = np.random.default_rng(seed)
+    frame = intake(rng, int(rng.integers(5, 300)))
+    hierarchy = Hierarchy(frame, FILTERS)
+    for _ in range(60):
+        selections = random_selections(rng, frame, FILTERS, lists=False)
+        for column in FILTERS:
+            others = {c: v for c, v in selections.items() if c != column}
+            assert hierarchy.options(column, selections) == [ALL] + values(frame[mask(frame, others)], column)
@@ -0,0 +1,37 @@
+# Near-duplicate records: which copy of a reposted poem is kept
+
+from sitegen.dedup import dedup, posted
+
+BODY = "নদী চলে আপন মনে, পাহাড় থেকে সাগরের পানে,\nদুই কূলে তার সবুজ গ্রাম, ঢেউয়ে ঢেউয়ে গানের টান।"
+EDITED = BODY.replace("সবুজ", "সোনালি")
+OTHER = "বসন্ত এসেছে দ্বারে, কোকিল ডাকে বারে বারে,\nফুলে ফুলে ভরা বন, আনন্দে নাচে মন।"
+
+# Merged export: the corrected repost (18/09) comes before the first post (05/09)
+OUT_OF_ORDER = [
+    (1, ("18/09/2025, 21:40", "নদী", EDITED)),
+    (2, ("10/09/2025, 08:00", "বসন্ত", OTHER)),
+    (3, ("05/09/2025, 07:15", "নদী", BODY)),
+]
+
+
+def test_latest_by_timestamp_not_export_order():
+    kept, found = dedup(OUT_OF_ORDER, keep="latest")
+    assert [n for n, _ in kept] == [1, 2]
+    assert [(c.kept, [n for n, _ in c.copies]) for c in found] == [(1, [3])]
+
+
+def test_first_by_timestamp():
+    kept, found = dedup(OUT_OF_ORDER, keep="first")
+    assert [n for n, _ in kept] == [2, 3]
+    assert found[0].kept == 3
+
+
+def test_all_keeps_every_copy():
+    kept, found = dedup(OUT_OF_ORDER, keep="all")
+    assert kept == OUT_OF_ORDER
+    assert found[0].kept == 1
+
+
+def test_posted():
+    assert posted("05/09/2025, 23:59") < posted("18/09/2025, 00:00") < posted("01/01/2026, 00:00")
+    assert posted("not a date") == ()
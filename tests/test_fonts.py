@@ -0,0 +1,54 @@
+# The subsetted PDF font shapes Bengali text exactly as the full vendored font
+
+import pytest
+
+pytest.importorskip("fontTools")
+hb = pytest.importorskip("uharfbuzz")
+
+from fontTools.ttLib import TTFont
+
+from conftest import ROOT
+from sitegen.corpus import FIELDS
+from sitegen.fonts import BENGALI_SERIF, subset_font
+from sitegen.whatsapp import ADHIR, read_records
+
+# Conjuncts, reph, two-part vowel signs (ো ৌ: split by the shaper) and page-number text
+SAMPLES = ["ক্ষমা", "মন্ত্র", "স্ত্রী", "কর্ম", "ক্রমে", "শক্তি", "কৌতূক", "পৌষ", "তোমার", "পৃষ্ঠা ১২"]
+
+
+def shaper(path):
+    font = hb.Font(hb.Face(path.read_bytes()))
+    names = TTFont(path).getGlyphOrder()
+
+    def shape(text):
+        buf = hb.Buffer()
+        buf.add_str(text)
+        buf.guess_segment_properties()
+        hb.shape(font, buf, {})
+        return [(names[g.codepoint], p.x_advance, p.x_offset, p.y_offset)
+                for g, p in zip(buf.glyph_infos, buf.glyph_positions)]
+    return shape
+
+
+def poem_text():
+    """Titles and bodies of Poem.txt, unpacked by field name (zip is strict: a new layout fails loudly)."""
+    for record in read_records(ROOT / "76_Batch_DVAS" / "Poem.txt", ADHIR):
+        fields = dict(zip(FIELDS["adhir"], record, strict=True))
+        yield f"{fields['title']}\n{fields['body']}"
+
+
+def test_font_is_vendored():
+    assert BENGALI_SERIF.exists()
+    assert (BENGALI_SERIF.parent / "OFL.txt").exists()
+
+
+@pytest.mark.parametrize("text", [
+    "\n".join(SAMPLES),
+    "\n".join(poem_text()),
+], ids=["samples", "Poem.txt"])
+def test_subset_shapes_like_full_font(tmp_path, text):
+    subset = subset_font(BENGALI_SERIF, text, tmp_path)
+    assert subset.stat().st_size < BENGALI_SERIF.stat().st_size
+    full, small = shaper(BENGALI_SERIF), shaper(subset)
+    for line in filter(str.strip, text.splitlines()):
+        assert small(line) == full(line), line
@@ -0,0 +1,29 @@
+# Service worker precache: entries are hashed relative to the page's folder
+
+import json
+
+import pytest
+
+from sitegen.manifest import BuildManifest
+from sitegen.offline import PRECACHE_FILE, WORKER_FILE, write_service_worker
+
+
+def test_precache_next_to_the_page(tmp_path):
+    site = tmp_path / "out"
+    (site / "assets").mkdir(parents=True)
+    (site / "x.html").write_text("<html></html>", encoding="utf-8")
+    (site / "assets" / "x.style.css").write_text("body{}", encoding="utf-8")
+    manifest = BuildManifest(tmp_path / "manifest.json")
+
+    assert write_service_worker(site, "x.html", ["assets/x.style.css"], manifest) == 2
+    pages = json.loads((site / PRECACHE_FILE).read_text(encoding="utf-8"))
+    assert set(pages["x.html"]) == {"x.html", "assets/x.style.css"}
+    assert (site / WORKER_FILE).exists()
+
+
+def test_missing_precache_entry(tmp_path):
+    (tmp_path / "x.html").write_text("<html></html>", encoding="utf-8")
+    manifest = BuildManifest(tmp_path / "manifest.json")
+
+    with pytest.raises(FileNotFoundError, match="assets/x.style.css"):
+        write_service_worker(tmp_path, "x.html", ["assets/x.style.css"], manifest)
@@ -0,0 +1,57 @@
+# write_book(): front matter page numbers, with the WeasyPrint layouts replaced by blank pypdf pages
+
+import pytest
+
+pypdf = pytest.importorskip("pypdf")
+
+from sitegen import pdfbook
+from sitegen.pdfbook import Section, write_book
+
+
+def blank_pdf(path, pages):
+    writer = pypdf.PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=595, height=842)
+    with open(path, "wb") as f:
+        writer.write(f)
+    return path
+
+
+@pytest.fixture
+def layouts(tmp_path, monkeypatch):
+    """Fake render_sections: bodies are "<pages>:<anchor>", the front matter's page count comes from `front_pages`."""
+    front_pages = []
+
+    def render_sections(htmls, workers=None, cache_dir=None):
+        sections = []
+        for n, html in enumerate(htmls):
+            if isinstance(html, dict):   # the front matter: its page_of
+                pages = front_pages.pop(0) if len(front_pages) > 1 else front_pages[0]
+                sections.append(Section(blank_pdf(tmp_path / f"front{len(front_pages)}.pdf", pages), pages, {}))
+            else:
+                pages, anchor = html.split(":")
+                path = blank_pdf(tmp_path / f"section{n}.pdf", int(pages))
+                sections.append(Section(path, int(pages), {anchor: int(pages) - 1}))
+        return sections, len(htmls)
+
+    monkeypatch.setattr(pdfbook, "render_sections", render_sections)
+    monkeypatch.setattr(pdfbook, "_prune", lambda cache_dir, keep: None)
+    return front_pages
+
+
+def test_front_matter_page_count_settles(tmp_path, layouts):
+    layouts.extend([2, 2])   # one page assumed, two laid out, then stable
+    seen = []
+    out = tmp_path / "book.pdf"
+    book = write_book(lambda page_of: seen.append(page_of) or page_of, ["3:a", "2:b"], out, cache_dir=tmp_path)
+
+    assert book == pdfbook.Book(sections=2, rendered=2, pages=7)
+    assert seen[-1] == {"a": 5, "b": 7}   # pages 1-2 front matter, 3-5 section a, 6-7 section b
+    assert len(pypdf.PdfReader(out).pages) == 7
+
+
+def test_unsettled_front_matter_writes_nothing(tmp_path, layouts):
+    layouts.extend([2, 3] * pdfbook.FRONT_PASSES)   # every layout disagrees with the one before
+    out = tmp_path / "book.pdf"
+    assert write_book(lambda page_of: page_of, ["3:a"], out, cache_dir=tmp_path) is None
+    assert not out.exists()
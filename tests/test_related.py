@@ -0,0 +1,35 @@
+# Related records: a subset query caches its neighbour lists apart from the full build
+
+import argparse
+
+from sitegen.corpus import add_query_args, query
+from sitegen.related import cache_file, related
+
+WORDS = ["নদী", "পাখি", "আকাশ", "মেঘ", "বৃষ্টি", "ফুল", "চাঁদ", "রাত"]
+DOCS = [(f"poem{i}", " ".join(WORDS[(i + j) % len(WORDS)] for j in range(3))) for i in range(12)]
+
+
+def options(*argv):
+    parser = argparse.ArgumentParser()
+    add_query_args(parser)
+    return query(parser.parse_args(argv))
+
+
+def test_cache_file_per_query():
+    full = cache_file("out/index.html", options())
+    assert full.name == "index.related.json"
+    assert cache_file("index.html") == full
+    one, other = cache_file("index.html", options("--poem", "3")), cache_file("index.html", options("--author", "x"))
+    assert len({full, one, other}) == 3
+    assert cache_file("index.html", options("--poem", "3")) == one
+
+
+def test_subset_run_keeps_the_full_cache(tmp_path):
+    full_path = tmp_path / cache_file("index.html", options())
+    subset_path = tmp_path / cache_file("index.html", options("--poem", "3", "--poem", "4"))
+    expected = related(DOCS, full_path)
+    cached = full_path.read_text(encoding="utf-8")
+
+    related(DOCS[3:5], subset_path)
+    assert full_path.read_text(encoding="utf-8") == cached
+    assert related(DOCS, full_path) == expected
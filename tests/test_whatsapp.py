@@ -0,0 +1,47 @@
+# The streaming parser against the regex it replaced (pattern.findall over the whole export)
+
+import pytest
+
+from conftest import ROOT
+from sitegen.whatsapp import ADHIR, ADHIR_PDF, GOLPO, iter_records, read_records
+
+GRAMMARS = [ADHIR, ADHIR_PDF, GOLPO]
+EXPORTS = [ROOT / "76_Batch_DVAS" / "Poem.txt", ROOT / "family" / "Poem3.txt", ROOT / "family" / "Poem4.txt"]
+
+# Messages the sample exports do not have: no trailing newline, a sender over two
+# lines, blank lines after the title, quoted titles, media lines, CRLF line ends
+EDGE_CASES = [
+    "01/01/2024, 10:00 - A: title\n\nbody",
+    "01/01/2024, 10:00 - A: title\nbody\n02/01/2024, 11:00 - B: next\n\nsecond body\n",
+    "01/01/2024, 10:00 - A\nB: title\n\nbody\n",
+    "01/01/2024, 10:00 - +91 79809 33948:   \n\n  'title'  \n\nbody\n",
+    "01/01/2024, 10:00 - +91 79809 33948: title",
+    "01/01/2024, 10:00 - +91 79809 33948: \"title\"\naudio:a b.mp3\n\nbody\n",
+    "01/01/2024, 10:00 - A: \"title\"\naudio:x.mp3\nimage:y.jpg\n\nbody\nmore\n",
+    "01/01/2024, 10:00 - A: title\nvideo:v.mp4\ndance:d.jpg\nbody\n",
+    "01/01/2024, 10:00 - A: title\npainter:p.jpg\n\n\nbody\n\n",
+    "01/01/2024, 10:00 - A: title\r\naudio:x.mp3\r\n\r\nbody\r\n",
+    "preamble\n01/01/2024, 10:00 - A: title\nbody\n",
+    "01/01/2024, 10:00 - A title without a colon\n",
+    "",
+]
+
+
+@pytest.mark.parametrize("grammar", GRAMMARS, ids=lambda g: g.name)
+@pytest.mark.parametrize("path", EXPORTS, ids=lambda p: p.name)
+def test_sample_exports_match_regex(path, grammar):
+    with open(path, "r", encoding="utf-8") as f:
+        expected = grammar.pattern.findall(f.read())
+    assert list(read_records(path, grammar)) == expected
+
+
+@pytest.mark.parametrize("grammar", GRAMMARS, ids=lambda g: g.name)
+@pytest.mark.parametrize("text", EDGE_CASES)
+def test_edge_cases_match_regex(text, grammar):
+    text = text.replace("\r\n", "\n")   # as read in text mode
+    assert list(iter_records(text.splitlines(keepends=True), grammar)) == grammar.pattern.findall(text)
+
+
+def test_sample_exports_have_records():
+    assert len(list(read_records(EXPORTS[0], ADHIR))) > 400
+    assert list(read_records(EXPORTS[1], GOLPO))